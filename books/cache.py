@@ -0,0 +1,95 @@
+import uuid
+from urllib.parse import urlencode
+from django.conf import settings
+from django.db import transaction
+from library_service.cache import DjangoCache, LRUCache
+
+CATALOGUE_TOKEN_KEY = "books:catalogue"
+
+
+class CatalogueCache:
+    """
+    Cache of serialized ``BookViewSet`` responses.
+
+    Keys embed version tokens: list entries carry the catalogue token and
+    detail entries the token of their book. Invalidation replaces the
+    tokens, so a response computed before a write and stored after it
+    lands under a key nobody will look up again.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def _token(self, key):
+        token = self.backend.get(key)
+        if token is None:
+            token = uuid.uuid4().hex
+            self.backend.set(key, token, timeout=None)
+        return token
+
+    def list_key(self, query_params):
+        params = urlencode(sorted(query_params.lists()), doseq=True)
+        return f"books:list:{self._token(CATALOGUE_TOKEN_KEY)}:{params}"
+
+    def detail_key(self, book_id):
+        token = self._token(f"books:book:{book_id}")
+        return f"books:detail:{book_id}:{token}"
+
+    def get(self, key):
+        data = self.backend.get(key)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def set(self, key, data):
+        self.backend.set(key, data)
+
+    def invalidate_books(self, book_ids):
+        """
+        Drop cached responses that may contain ``book_ids``, now and again
+        once the surrounding transaction commits.
+        """
+        book_ids = list(book_ids)
+        self._invalidate(book_ids)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._invalidate(book_ids))
+
+    def _invalidate(self, book_ids):
+        self.backend.delete(CATALOGUE_TOKEN_KEY)
+        for book_id in book_ids:
+            self.backend.delete(f"books:book:{book_id}")
+
+    def clear(self):
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def build_catalogue_cache():
+    config = settings.BOOK_CATALOGUE_CACHE
+    if config["BACKEND"] == "django":
+        backend = DjangoCache(
+            alias=config["CACHE_ALIAS"],
+            timeout=config["TIMEOUT"],
+            key_prefix="library:",
+        )
+    else:
+        backend = LRUCache(
+            max_entries=config["MAX_ENTRIES"], timeout=config["TIMEOUT"]
+        )
+    return CatalogueCache(backend)
+
+
+catalogue_cache = build_catalogue_cache()
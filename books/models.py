@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 
 
 class Book(models.Model):
@@ -12,5 +14,51 @@ class Book(models.Model):
     inventory = models.IntegerField()
     daily_fee = models.DecimalField(max_digits=6, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Trigram indexes on UPPER(...) match the SQL Django emits for
+            # ``icontains``/``istartswith``, so both substring and prefix
+            # searches avoid a sequential scan.
+            GinIndex(
+                OpClass(Upper("title"), name="gin_trgm_ops"),
+                name="book_title_trgm_idx",
+            ),
+            GinIndex(
+                OpClass(Upper("author"), name="gin_trgm_ops"),
+                name="book_author_trgm_idx",
+            ),
+            models.Index(fields=["title", "id"], name="book_title_id_idx"),
+            models.Index(
+                fields=["author", "id"], name="book_author_id_idx"
+            ),
+            models.Index(
+                fields=["cover", "daily_fee"], name="book_cover_fee_idx"
+            ),
+            models.Index(fields=["daily_fee"], name="book_daily_fee_idx"),
+            models.Index(
+                fields=["id"],
+                condition=models.Q(inventory__gt=0),
+                name="book_available_idx",
+            ),
+        ]
+
+    # Shown wherever a borrowing embeds its book; see books.signals.
+    BORROWING_FIELDS = ("title", "author", "cover", "daily_fee")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        book = super().from_db(db, field_names, values)
+        book._loaded = dict(zip(field_names, values))
+        return book
+
+    def borrowing_fields_changed(self, update_fields=None):
+        """Whether a save changes what borrowings show of this book."""
+        loaded = getattr(self, "_loaded", None)
+        return any(
+            loaded is None or loaded.get(name) != getattr(self, name)
+            for name in self.BORROWING_FIELDS
+            if update_fields is None or name in update_fields
+        )
+
     def __str__(self):
         return self.title
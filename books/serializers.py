@@ -1,8 +1,37 @@
 from rest_framework import serializers
 from books.models import Book
+from core.serializers import FastReadSerializerMixin
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(
+    FastReadSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Book
         fields = ["id", "title", "author", "cover", "inventory", "daily_fee"]
+
+
+class BookFilterSerializer(serializers.Serializer):
+    title = serializers.CharField(required=False)
+    title_startswith = serializers.CharField(required=False)
+    author = serializers.CharField(required=False)
+    author_startswith = serializers.CharField(required=False)
+    cover = serializers.ChoiceField(
+        choices=Book.CoverType.choices, required=False
+    )
+    available = serializers.BooleanField(required=False, allow_null=True)
+    min_fee = serializers.DecimalField(
+        max_digits=6, decimal_places=2, required=False
+    )
+    max_fee = serializers.DecimalField(
+        max_digits=6, decimal_places=2, required=False
+    )
+
+    def validate(self, attrs):
+        min_fee = attrs.get("min_fee")
+        max_fee = attrs.get("max_fee")
+        if min_fee is not None and max_fee is not None and min_fee > max_fee:
+            raise serializers.ValidationError(
+                "min_fee must not exceed max_fee."
+            )
+        return attrs
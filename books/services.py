@@ -0,0 +1,11 @@
+from books.cache import catalogue_cache
+from core.versions import bump_versions
+
+
+def touch_books(book_ids):
+    """
+    Record that ``book_ids`` changed: drop their cached catalogue
+    responses and advance the ``books`` version used for ETags.
+    """
+    catalogue_cache.invalidate_books(book_ids)
+    bump_versions("books")
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from books.models import Book
+from books.services import touch_books
+from borrowings.models import Borrowing
+from borrowings.services import bump_borrowing_versions
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def book_changed(sender, instance, **kwargs):
+    touch_books([instance.pk])
+
+
+@receiver(post_save, sender=Book)
+def book_edited(sender, instance, created, update_fields, **kwargs):
+    # Borrowings embed the book's details, so their readers' ETags change.
+    if not created and instance.borrowing_fields_changed(update_fields):
+        bump_borrowing_versions(
+            Borrowing.objects.filter(book=instance)
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+    instance._loaded = {
+        name: getattr(instance, name) for name in Book.BORROWING_FIELDS
+    }
@@ -1,10 +1,16 @@
+from unittest import skipUnless
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
+from books.cache import catalogue_cache
 from books.models import Book
 from books.serializers import BookSerializer
+from borrowings.services import borrow_book
+from core.versions import bump_versions
+from library_service.cache import LRUCache
 
 BOOK_URL = reverse("books:book-list")
 
@@ -110,3 +116,235 @@ class AdminBookTests(TestCase):
         url = detail_url(book.id)
         res = self.client.delete(url)
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class CatalogueCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        self.book = sample_book()
+        catalogue_cache.clear()
+
+    def test_repeated_list_served_from_cache(self):
+        self.client.get(BOOK_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(BOOK_URL)
+        self.assertEqual(res["X-Cache"], "HIT")
+        self.assertEqual(res.data[0]["id"], self.book.id)
+
+    def test_query_params_are_part_of_key(self):
+        self.client.get(BOOK_URL, {"a": "1", "b": "2"})
+        res = self.client.get(BOOK_URL, {"b": "2", "a": "1"})
+        self.assertEqual(res["X-Cache"], "HIT")
+        res = self.client.get(BOOK_URL, {"a": "2"})
+        self.assertEqual(res["X-Cache"], "MISS")
+
+    def test_book_save_invalidates(self):
+        other_book = sample_book(title="Other")
+        self.client.get(BOOK_URL)
+        self.client.get(detail_url(other_book.id))
+        self.book.title = "Renamed"
+        self.book.save()
+        res = self.client.get(BOOK_URL)
+        self.assertEqual(res["X-Cache"], "MISS")
+        titles = {book["id"]: book["title"] for book in res.data}
+        self.assertEqual(titles[self.book.id], "Renamed")
+        res = self.client.get(detail_url(other_book.id))
+        self.assertEqual(res["X-Cache"], "HIT")
+
+    def test_borrowing_invalidates_inventory(self):
+        self.client.get(detail_url(self.book.id))
+        borrow_book(self.user, self.book, "2025-01-20")
+        res = self.client.get(detail_url(self.book.id))
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["inventory"], 19)
+
+    def test_padded_id_shares_the_detail_entry(self):
+        self.client.get(f"{BOOK_URL}0{self.book.id}/")
+        self.book.title = "Renamed"
+        self.book.save()
+        res = self.client.get(f"{BOOK_URL}0{self.book.id}/")
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["title"], "Renamed")
+        res = self.client.get(detail_url(self.book.id))
+        self.assertEqual(res["X-Cache"], "HIT")
+
+    def test_non_numeric_id_not_found(self):
+        res = self.client.get(f"{BOOK_URL}abc/")
+        self.assertEqual(res.status_code, 404)
+
+    def test_stats(self):
+        self.client.get(BOOK_URL)
+        self.client.get(BOOK_URL)
+        stats = catalogue_cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+
+class BookConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.book = sample_book()
+        catalogue_cache.clear()
+
+    def test_matching_etag_skips_queryset(self):
+        res = self.client.get(BOOK_URL)
+        etag = res["ETag"]
+        catalogue_cache.clear()
+        with self.assertNumQueries(1):
+            res = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_book_change_changes_etag(self):
+        etag = self.client.get(detail_url(self.book.id))["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.title = "Renamed"
+            self.book.save()
+        res = self.client.get(
+            detail_url(self.book.id), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertIn("Last-Modified", res)
+
+    def test_etag_depends_on_query(self):
+        etag = self.client.get(BOOK_URL)["ETag"]
+        res = self.client.get(BOOK_URL, {"page": 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cached_body_keeps_its_etag(self):
+        """A version bump another worker made is not paired with the
+        body this worker still caches."""
+        etag = self.client.get(BOOK_URL)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_versions("books")
+        with self.assertNumQueries(0):
+            res = self.client.get(BOOK_URL)
+        self.assertEqual(res["X-Cache"], "HIT")
+        self.assertEqual(res["ETag"], etag)
+        catalogue_cache.clear()
+        res = self.client.get(BOOK_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+
+class BookFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.dune = sample_book(
+            title="Dune", author="Frank Herbert", daily_fee=2.50
+        )
+        self.war = sample_book(
+            title="War and Peace",
+            author="Leo Tolstoy",
+            cover="SOFT",
+            inventory=0,
+        )
+        self.anna = sample_book(
+            title="Anna Karenina", author="Leo Tolstoy", daily_fee=0.50
+        )
+        catalogue_cache.clear()
+
+    def get_ids(self, **params):
+        res = self.client.get(BOOK_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [book["id"] for book in res.data]
+
+    def test_filter_by_title_and_author(self):
+        self.assertEqual(self.get_ids(title="and"), [self.war.id])
+        self.assertEqual(self.get_ids(title_startswith="du"), [self.dune.id])
+        self.assertEqual(
+            self.get_ids(author="tolstoy"), [self.war.id, self.anna.id]
+        )
+        self.assertEqual(self.get_ids(author_startswith="tol"), [])
+
+    def test_filter_by_cover_and_availability(self):
+        self.assertEqual(self.get_ids(cover="SOFT"), [self.war.id])
+        self.assertEqual(
+            self.get_ids(available="true"), [self.dune.id, self.anna.id]
+        )
+        self.assertEqual(self.get_ids(available="false"), [self.war.id])
+
+    def test_filter_by_fee_range(self):
+        self.assertEqual(
+            self.get_ids(min_fee="1.00", max_fee="3"),
+            [self.dune.id, self.war.id],
+        )
+
+    def test_ordering(self):
+        self.assertEqual(
+            self.get_ids(ordering="-daily_fee"),
+            [self.dune.id, self.war.id, self.anna.id],
+        )
+
+    def test_invalid_filters_rejected(self):
+        res = self.client.get(BOOK_URL, {"cover": "PAPER"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(BOOK_URL, {"min_fee": 5, "max_fee": 1})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipUnless(connection.vendor == "postgresql", "Postgres query plans")
+class BookIndexPlanTests(TestCase):
+    """
+    The test tables are tiny, so sequential scans are disabled for the
+    transaction to check that a suitable index exists at all.
+    """
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        self.assertNotIn("Seq Scan", plan)
+
+    def test_title_substring_uses_trigram_index(self):
+        self.assertUsesIndex(
+            Book.objects.filter(title__icontains="une"),
+            "book_title_trgm_idx",
+        )
+
+    def test_author_prefix_uses_trigram_index(self):
+        self.assertUsesIndex(
+            Book.objects.filter(author__istartswith="tol"),
+            "book_author_trgm_idx",
+        )
+
+    def test_available_uses_partial_index(self):
+        self.assertUsesIndex(
+            Book.objects.filter(inventory__gt=0).order_by("id"),
+            "book_available_idx",
+        )
+
+    def test_fee_range_uses_index(self):
+        self.assertUsesIndex(
+            Book.objects.filter(daily_fee__gte=1, daily_fee__lte=3),
+            "book_daily_fee_idx",
+        )
+
+
+class LRUCacheTests(TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["hits"], 3)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_entries_expire(self):
+        cache = LRUCache(timeout=0)
+        cache.set("a", 1)
+        cache.set("b", 2, timeout=None)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
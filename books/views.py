@@ -1,10 +1,149 @@
-from rest_framework import viewsets
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework import filters, status, viewsets
+from rest_framework.response import Response
+from books.cache import catalogue_cache
 from books.models import Book
 from books.permissions import IsAdminOrReadOnly
-from books.serializers import BookSerializer
+from books.serializers import BookFilterSerializer, BookSerializer
+from core.mixins import ConditionalGetMixin, FastListMixin
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(
+    ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet
+):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAdminOrReadOnly]
+    version_keys = ("books",)
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ["title", "author", "daily_fee", "inventory", "id"]
+    ordering = ["id"]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != "list":
+            return queryset
+        serializer = BookFilterSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        if "title" in params:
+            queryset = queryset.filter(title__icontains=params["title"])
+        if "title_startswith" in params:
+            queryset = queryset.filter(
+                title__istartswith=params["title_startswith"]
+            )
+        if "author" in params:
+            queryset = queryset.filter(author__icontains=params["author"])
+        if "author_startswith" in params:
+            queryset = queryset.filter(
+                author__istartswith=params["author_startswith"]
+            )
+        if "cover" in params:
+            queryset = queryset.filter(cover=params["cover"])
+        if params.get("available") is True:
+            queryset = queryset.filter(inventory__gt=0)
+        if params.get("available") is False:
+            queryset = queryset.filter(inventory__lte=0)
+        if "min_fee" in params:
+            queryset = queryset.filter(daily_fee__gte=params["min_fee"])
+        if "max_fee" in params:
+            queryset = queryset.filter(daily_fee__lte=params["max_fee"])
+        return queryset
+
+    def cached_response(self, request, key, respond):
+        """
+        Answer from the catalogue cache, or with ``respond()`` and cache
+        that. Entries keep the versions their body was built from, so a
+        hit needs no query and is never paired with a newer ETag.
+        """
+        cached = catalogue_cache.get(key)
+        if cached is not None:
+            data, versions = cached
+            self.set_versions(*versions)
+            not_modified = self.get_not_modified_response(request)
+            if not_modified is not None:
+                return not_modified
+            return Response(data, headers={"X-Cache": "HIT"})
+        # Read the versions before the body: a write in between leaves an
+        # older ETag on a newer body, never the reverse.
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        response = respond()
+        if response.status_code == status.HTTP_200_OK:
+            catalogue_cache.set(key, (response.data, self.versions))
+        response["X-Cache"] = "MISS"
+        return response
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "title",
+                type=str,
+                description="Filter by title substring (ex. ?title=dune)",
+                required=False,
+            ),
+            OpenApiParameter(
+                "title_startswith",
+                type=str,
+                description="Filter by title prefix",
+                required=False,
+            ),
+            OpenApiParameter(
+                "author",
+                type=str,
+                description="Filter by author substring",
+                required=False,
+            ),
+            OpenApiParameter(
+                "author_startswith",
+                type=str,
+                description="Filter by author prefix (ex. ?author_startswith=tol)",
+                required=False,
+            ),
+            OpenApiParameter(
+                "cover",
+                type=str,
+                description="Filter by cover type",
+                required=False,
+                enum=["HARD", "SOFT"],
+            ),
+            OpenApiParameter(
+                "available",
+                type=bool,
+                description="Only books with copies in stock (ex. ?available=true)",
+                required=False,
+            ),
+            OpenApiParameter(
+                "min_fee",
+                type=float,
+                description="Minimum daily fee",
+                required=False,
+            ),
+            OpenApiParameter(
+                "max_fee",
+                type=float,
+                description="Maximum daily fee",
+                required=False,
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request,
+            catalogue_cache.list_key(request.query_params),
+            lambda: super(BookViewSet, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        def respond():
+            return super(BookViewSet, self).retrieve(request, *args, **kwargs)
+
+        # "05" and "5" are the same book, which invalidation knows as 5.
+        try:
+            book_id = int(kwargs["pk"])
+        except ValueError:
+            return respond()
+        return self.cached_response(
+            request, catalogue_cache.detail_key(book_id), respond
+        )
@@ -1,5 +1,40 @@
 from django.contrib import admin
-from borrowings.models import Borrowing
+from borrowings.models import Borrowing, OverdueScanRun, UserBorrowingStats
 
 
 admin.site.register(Borrowing)
+
+
+@admin.register(OverdueScanRun)
+class OverdueScanRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "scan_date",
+        "since",
+        "status",
+        "shards_done",
+        "shards",
+        "rows",
+        "messages",
+        "started_at",
+        "duration",
+    )
+    list_filter = ("status",)
+    readonly_fields = [
+        field.name for field in OverdueScanRun._meta.fields
+    ]
+
+
+@admin.register(UserBorrowingStats)
+class UserBorrowingStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        "user",
+        "active_borrowings",
+        "total_borrowings",
+        "pending_payments",
+        "pending_amount",
+        "updated_at",
+    )
+    search_fields = ("user__email",)
+    readonly_fields = [
+        field.name for field in UserBorrowingStats._meta.fields
+    ]
@@ -0,0 +1,84 @@
+from django.db.models import Exists, OuterRef
+from borrowings.models import Borrowing
+from borrowings.overdue import MESSAGE_LIMIT
+from payments.models import Payment
+
+HISTORY_HEADER = "📖 Your borrowings:\n"
+
+
+def history_queryset(user):
+    """
+    ``user``'s borrowings with their book and an ``is_paid`` flag, for a
+    single query. ``user`` may be a user instance or its id.
+    """
+    paid = Payment.objects.filter(
+        borrowing=OuterRef("pk"),
+        type_field=Payment.TypeField.PAYMENT,
+        status=Payment.Status.PAID,
+    )
+    return (
+        Borrowing.objects.filter(user=user)
+        .select_related("book")
+        .annotate(is_paid=Exists(paid))
+        .order_by("-borrow_date", "-id")
+    )
+
+
+def borrowing_history(user):
+    return list(history_queryset(user))
+
+
+async def aborrowing_history(user):
+    return [borrowing async for borrowing in history_queryset(user)]
+
+
+def format_active(borrowing):
+    book = borrowing.book
+    return (
+        "📌 <b>You have a new borrowing:</b>\n"
+        f"Book Title: {book.title}\n"
+        f"Author: {book.author}\n"
+        f"Expected return date: {borrowing.expected_return_date}\n"
+        f"Price per day: {book.daily_fee} USD\n\n"
+    )
+
+
+def format_entry(borrowing):
+    return_status = "returned" if borrowing.is_returned else "not returned"
+    return (
+        f"- {borrowing.book.title}\n"
+        f"  Return status: {return_status}\n"
+        f"  Payment: {'paid' if borrowing.is_paid else 'not paid'}\n\n"
+    )
+
+
+def build_history_messages(borrowings, per_message=25, limit=MESSAGE_LIMIT):
+    """
+    Render the /borrowings reply, active borrowings first, split into
+    messages of at most ``per_message`` blocks and ``limit`` characters.
+    """
+    blocks = [
+        format_active(borrowing)
+        for borrowing in borrowings
+        if not borrowing.is_returned
+    ]
+    entries = [format_entry(borrowing) for borrowing in borrowings]
+    if entries:
+        entries[0] = HISTORY_HEADER + entries[0]
+    blocks.extend(entries)
+
+    messages = []
+    current = ""
+    count = 0
+    for block in blocks:
+        if current and (
+            count >= per_message or len(current) + len(block) > limit
+        ):
+            messages.append(current.strip())
+            current = ""
+            count = 0
+        current += block
+        count += 1
+    if current:
+        messages.append(current.strip())
+    return messages
@@ -0,0 +1,29 @@
+import time
+from django.core.management import BaseCommand
+from borrowings.models import UserBorrowingStats
+from borrowings.stats import refresh_borrowing_stats
+
+
+class Command(BaseCommand):
+    help = (  # noqa: VNE003
+        "Recount UserBorrowingStats from borrowings and payments, e.g. "
+        "after bulk loads that bypass the services."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="user_ids",
+            help="Only rebuild this user id; repeatable.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        refresh_borrowing_stats(options["user_ids"])
+        count = UserBorrowingStats.objects.count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt stats, {count} rows, "
+            f"in {time.monotonic() - started:.2f} s"
+        ))
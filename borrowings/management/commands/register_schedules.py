@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+from django_q.models import Schedule
+
+
+class Command(BaseCommand):
+    help = "Create or update the periodic tasks run by qcluster."  # noqa: VNE003
+
+    def handle(self, *args, **options):
+        schedules = {
+            "overdue-scan": (
+                "borrowings.tasks.run_overdue_scan",
+                settings.OVERDUE_SCAN["CRON"],
+            ),
+            "accrue-fines": (
+                "payments.fines.accrue_fines",
+                settings.FINE_ACCRUAL_CRON,
+            ),
+            "apply-stripe-events": (
+                "payments.tasks.apply_stripe_events",
+                settings.STRIPE_WEBHOOK["CRON"],
+            ),
+        }
+        for name, (func, cron) in schedules.items():
+            schedule, created = Schedule.objects.update_or_create(
+                name=name,
+                defaults={
+                    "func": func,
+                    "schedule_type": Schedule.CRON,
+                    "cron": cron,
+                },
+            )
+            action = "Created" if created else "Updated"
+            self.stdout.write(
+                self.style.SUCCESS(f"{action} {schedule.name}: {schedule.cron}")
+            )
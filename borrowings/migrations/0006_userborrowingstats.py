@@ -0,0 +1,53 @@
+# Generated by Django 5.2.2 on 2026-10-17 22:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowings", "0005_overduescanrun"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserBorrowingStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="borrowing_stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "active_borrowings",
+                    models.PositiveIntegerField(default=0),
+                ),
+                (
+                    "total_borrowings",
+                    models.PositiveIntegerField(default=0),
+                ),
+                (
+                    "pending_payments",
+                    models.PositiveIntegerField(default=0),
+                ),
+                (
+                    "pending_amount",
+                    models.DecimalField(
+                        decimal_places=2, default=0, max_digits=12
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "user borrowing stats",
+            },
+        ),
+    ]
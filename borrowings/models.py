@@ -16,9 +16,86 @@ class Borrowing(models.Model):
         related_name="borrowing"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-borrow_date", "-id"],
+                name="borrowing_date_id_idx",
+            ),
+            models.Index(
+                fields=["user", "-borrow_date", "-id"],
+                name="borrowing_user_date_id_idx",
+            ),
+            models.Index(
+                fields=["expected_return_date"],
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_overdue_idx",
+            ),
+        ]
+
     @property
     def is_returned(self):
         return self.actual_return_date is not None
 
     def __str__(self):
         return f"{self.user} borrowed {self.book.title}"
+
+
+class OverdueScanRun(models.Model):
+    """One scheduled overdue scan, split into id-range shards."""
+
+    class Status(models.TextChoices):
+        RUNNING = "RUNNING", "Running"
+        SUCCEEDED = "SUCCEEDED", "Succeeded"
+        FAILED = "FAILED", "Failed"
+
+    scan_date = models.DateField()
+    since = models.DateField(null=True, blank=True)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.RUNNING
+    )
+    shards = models.PositiveIntegerField(default=0)
+    shards_done = models.PositiveIntegerField(default=0)
+    claimed_shards = models.JSONField(default=list, blank=True)
+    rows = models.PositiveIntegerField(default=0)
+    messages = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.DurationField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-started_at"]
+
+    def __str__(self):
+        return f"Overdue scan {self.scan_date} ({self.status})"
+
+
+class UserBorrowingStats(models.Model):
+    """
+    Per-user borrowing and payment totals, kept in step with every write
+    by ``borrowings.stats.refresh_borrowing_stats``. A missing row means
+    the user has never borrowed anything.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="borrowing_stats",
+    )
+    active_borrowings = models.PositiveIntegerField(default=0)
+    total_borrowings = models.PositiveIntegerField(default=0)
+    pending_payments = models.PositiveIntegerField(default=0)
+    pending_amount = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "user borrowing stats"
+
+    def __str__(self):
+        return (
+            f"{self.user}: {self.active_borrowings} active, "
+            f"{self.pending_payments} pending payments"
+        )
@@ -0,0 +1,95 @@
+import datetime
+import html
+import time
+from typing import NamedTuple
+from borrowings.models import Borrowing
+
+# Telegram rejects messages longer than 4096 characters.
+MESSAGE_LIMIT = 4096
+ALERT_HEADER = "<b>Overdue borrowing alert!</b>"
+NO_OVERDUE_MESSAGE = "📢 No borrowings overdue today!"
+
+
+class OverdueRow(NamedTuple):
+    id: int  # noqa: VNE003
+    expected_return_date: datetime.date
+    user_email: str
+    book_title: str
+
+
+class OverdueScan(NamedTuple):
+    date: datetime.date
+    rows: list
+    duration: float
+
+    @property
+    def count(self):
+        return len(self.rows)
+
+
+def overdue_queryset(today, since=None, id_range=None):
+    """
+    Borrowings overdue on ``today``. ``since`` keeps only those that
+    became overdue on or after that date, ``id_range`` is a half-open
+    ``(start, end)`` slice of ids.
+    """
+    queryset = Borrowing.objects.filter(
+        expected_return_date__lt=today,
+        actual_return_date__isnull=True,
+    )
+    if since is not None:
+        queryset = queryset.filter(expected_return_date__gte=since)
+    if id_range is not None:
+        queryset = queryset.filter(id__gte=id_range[0], id__lt=id_range[1])
+    return queryset
+
+
+def scan_overdue(today=None, since=None, id_range=None):
+    """
+    Fetch every overdue borrowing with the columns the alerts need in a
+    single query served by ``borrowing_overdue_idx``.
+    """
+    if today is None:
+        today = datetime.date.today()
+    started = time.perf_counter()
+    rows = [
+        OverdueRow(*row)
+        for row in overdue_queryset(today, since, id_range)
+        .order_by("expected_return_date", "id")
+        .values_list("id", "expected_return_date", "user__email", "book__title")
+    ]
+    return OverdueScan(today, rows, time.perf_counter() - started)
+
+
+def format_alert(row):
+    """One alert, escaped for ``parse_mode="HTML"``."""
+    return (
+        f"User: {html.escape(row.user_email)}\n"
+        f"Book: {html.escape(row.book_title)}\n"
+        f"Expected return: {html.escape(str(row.expected_return_date))}"
+    )
+
+
+def build_messages(rows, batch_size=20, limit=MESSAGE_LIMIT):
+    """
+    Group alerts into messages of at most ``batch_size`` borrowings and
+    ``limit`` characters.
+    """
+    if not rows:
+        return [NO_OVERDUE_MESSAGE]
+    messages = []
+    current = []
+    length = len(ALERT_HEADER)
+    for row in rows:
+        alert = format_alert(row)
+        if current and (
+            len(current) >= batch_size
+            or length + len(alert) + 2 > limit
+        ):
+            messages.append("\n\n".join([ALERT_HEADER, *current]))
+            current = []
+            length = len(ALERT_HEADER)
+        current.append(alert)
+        length += len(alert) + 2
+    messages.append("\n\n".join([ALERT_HEADER, *current]))
+    return messages
@@ -0,0 +1,7 @@
+from library_service.pagination import KeysetCursorPagination
+
+
+class BorrowingCursorPagination(KeysetCursorPagination):
+    ordering = ("-borrow_date", "-id")
+    page_size = 50
+    max_page_size = 200
@@ -1,9 +1,18 @@
 from rest_framework import serializers
 from books.serializers import BookSerializer
 from borrowings.models import Borrowing
+from borrowings.services import (
+    BOOK_UNAVAILABLE,
+    BookUnavailable,
+    borrow_book,
+)
+from core.metrics import BORROW_SECONDS, BORROWS, track
+from core.serializers import FastReadSerializerMixin
 
 
-class BorrowingSerializer(serializers.ModelSerializer):
+class BorrowingSerializer(
+    FastReadSerializerMixin, serializers.ModelSerializer
+):
     book = BookSerializer(read_only=True)
 
     class Meta:
@@ -25,20 +34,35 @@ class CreateBorrowingSerializer(serializers.ModelSerializer):
 
     def validate_book(self, book):
         if book.inventory <= 0:
-            raise serializers.ValidationError(
-                "The book is currently unavailable."
-            )
+            raise serializers.ValidationError(BOOK_UNAVAILABLE)
         return book
 
     def create(self, validated_data):
-        book = validated_data["book"]
-        book.inventory -= 1
-        book.save()
-        borrowing = Borrowing.objects.create(**validated_data)
-        return borrowing
+        with track(BORROWS, BORROW_SECONDS) as outcome:
+            try:
+                return borrow_book(**validated_data)
+            except BookUnavailable:
+                outcome.value = "unavailable"
+                raise serializers.ValidationError(
+                    {"book": [BOOK_UNAVAILABLE]}
+                )
 
 
 class ReturnBorrowingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Borrowing
         fields = ["actual_return_date"]
+
+
+class BulkBorrowingSerializer(serializers.Serializer):
+    books = serializers.ListField(
+        child=serializers.IntegerField(), min_length=1, max_length=100
+    )
+    expected_return_date = serializers.DateField()
+
+
+class BulkReturnBorrowingSerializer(serializers.Serializer):
+    borrowings = serializers.ListField(
+        child=serializers.IntegerField(), min_length=1, max_length=100
+    )
+    actual_return_date = serializers.DateField(required=False)
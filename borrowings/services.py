@@ -0,0 +1,212 @@
+import datetime
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, When
+from books.models import Book
+from books.services import touch_books
+from borrowings.models import Borrowing
+from borrowings.stats import refresh_borrowing_stats
+from core.versions import bump_versions
+from payments.fines import charge_returns
+
+
+class BookUnavailable(Exception):
+    pass
+
+
+class BorrowingAlreadyReturned(Exception):
+    pass
+
+
+BOOK_NOT_FOUND = "Book not found."
+BOOK_UNAVAILABLE = "The book is currently unavailable."
+BORROWING_NOT_FOUND = "Borrowing not found."
+BORROWING_ALREADY_RETURNED = "This borrowing has already been returned."
+
+
+def bump_borrowing_versions(user_ids):
+    bump_versions(
+        "borrowings",
+        *(f"borrowings:user:{user_id}" for user_id in set(user_ids)),
+    )
+
+
+def borrow_book(user, book, expected_return_date):
+    """
+    Take one copy of ``book`` off the shelf and record the borrowing.
+
+    The stock is decremented with a single guarded ``UPDATE`` so two
+    concurrent checkouts can never both take the last copy, and the
+    ``Borrowing`` insert shares its transaction.
+    """
+    with transaction.atomic():
+        taken = Book.objects.filter(
+            pk=book.pk, inventory__gt=0
+        ).update(inventory=F("inventory") - 1)
+        if not taken:
+            raise BookUnavailable
+        touch_books([book.pk])
+        return Borrowing.objects.create(
+            user=user, book=book, expected_return_date=expected_return_date
+        )
+
+
+def return_borrowing(borrowing_id, actual_return_date=None):
+    """
+    Mark a borrowing as returned and put the copy back on the shelf.
+
+    Raises ``Borrowing.DoesNotExist`` for an unknown id and
+    ``BorrowingAlreadyReturned`` if someone else returned it first.
+    """
+    if actual_return_date is None:
+        actual_return_date = datetime.date.today()
+    with transaction.atomic():
+        returned = Borrowing.objects.filter(
+            pk=borrowing_id, actual_return_date__isnull=True
+        ).update(actual_return_date=actual_return_date)
+        if not returned:
+            if Borrowing.objects.filter(pk=borrowing_id).exists():
+                raise BorrowingAlreadyReturned
+            raise Borrowing.DoesNotExist
+        borrowing = Borrowing.objects.select_related("book", "user").get(
+            pk=borrowing_id
+        )
+        Book.objects.filter(pk=borrowing.book_id).update(
+            inventory=F("inventory") + 1
+        )
+        touch_books([borrowing.book_id])
+        bump_borrowing_versions([borrowing.user_id])
+        charge_returns([borrowing], actual_return_date)
+        refresh_borrowing_stats([borrowing.user_id])
+    borrowing.book.refresh_from_db(fields=["inventory"])
+    return borrowing
+
+
+def _shift_inventory(deltas):
+    """Apply ``{book_id: delta}`` to ``Book.inventory`` in one statement."""
+    if not deltas:
+        return
+    touch_books(deltas)
+    Book.objects.filter(pk__in=deltas).update(
+        inventory=Case(
+            *[
+                When(pk=book_id, then=F("inventory") + delta)
+                for book_id, delta in deltas.items()
+            ],
+            default=F("inventory"),
+            output_field=IntegerField(),
+        )
+    )
+
+
+def bulk_borrow_books(user, book_ids, expected_return_date):
+    """
+    Borrow one copy per entry of ``book_ids`` (repeats take several copies).
+
+    Returns ``(book_id, borrowing, error)`` per requested id, in request
+    order. Items that cannot be served are reported instead of aborting
+    the whole cart. The books are locked in primary key order so
+    overlapping carts cannot deadlock.
+    """
+    with transaction.atomic():
+        books = {
+            book.pk: book
+            for book in Book.objects.select_for_update()
+            .filter(pk__in=set(book_ids))
+            .order_by("pk")
+        }
+        taken = Counter()
+        outcomes = []
+        for book_id in book_ids:
+            book = books.get(book_id)
+            if book is None:
+                outcomes.append((book_id, BOOK_NOT_FOUND))
+            elif book.inventory - taken[book_id] <= 0:
+                outcomes.append((book_id, BOOK_UNAVAILABLE))
+            else:
+                taken[book_id] += 1
+                outcomes.append((book_id, None))
+
+        _shift_inventory(
+            {book_id: -count for book_id, count in taken.items()}
+        )
+        borrowings = iter(Borrowing.objects.bulk_create([
+            Borrowing(
+                user=user,
+                book=books[book_id],
+                expected_return_date=expected_return_date,
+            )
+            for book_id, error in outcomes
+            if error is None
+        ]))
+        if taken:
+            bump_borrowing_versions([user.pk])
+            refresh_borrowing_stats([user.pk])
+
+    for book_id, count in taken.items():
+        books[book_id].inventory -= count
+    return [
+        (book_id, None if error else next(borrowings), error)
+        for book_id, error in outcomes
+    ]
+
+
+def bulk_return_borrowings(borrowing_ids, actual_return_date=None):
+    """
+    Return every borrowing in ``borrowing_ids`` with one ``UPDATE`` per
+    table. Returns ``(borrowing_id, borrowing, error)`` per requested id,
+    in request order.
+    """
+    if actual_return_date is None:
+        actual_return_date = datetime.date.today()
+    with transaction.atomic():
+        borrowings = {
+            borrowing.pk: borrowing
+            for borrowing in Borrowing.objects
+            .select_for_update(of=("self",))
+            .select_related("book", "user")
+            .filter(pk__in=set(borrowing_ids))
+            .order_by("pk")
+        }
+        returned = set()
+        outcomes = []
+        for borrowing_id in borrowing_ids:
+            borrowing = borrowings.get(borrowing_id)
+            if borrowing is None:
+                outcomes.append((borrowing_id, None, BORROWING_NOT_FOUND))
+            elif borrowing.is_returned or borrowing_id in returned:
+                outcomes.append(
+                    (borrowing_id, None, BORROWING_ALREADY_RETURNED)
+                )
+            else:
+                returned.add(borrowing_id)
+                outcomes.append((borrowing_id, borrowing, None))
+
+        Borrowing.objects.filter(pk__in=returned).update(
+            actual_return_date=actual_return_date
+        )
+        if returned:
+            bump_borrowing_versions(
+                borrowings[pk].user_id for pk in returned
+            )
+            for pk in returned:
+                borrowings[pk].actual_return_date = actual_return_date
+            charge_returns(
+                [borrowings[pk] for pk in returned], actual_return_date
+            )
+            refresh_borrowing_stats(
+                borrowings[pk].user_id for pk in returned
+            )
+        _shift_inventory(
+            Counter(borrowings[pk].book_id for pk in returned)
+        )
+        inventory = dict(
+            Book.objects.filter(
+                pk__in={borrowings[pk].book_id for pk in returned}
+            ).values_list("pk", "inventory")
+        )
+
+    for borrowing_id in returned:
+        borrowing = borrowings[borrowing_id]
+        borrowing.book.inventory = inventory[borrowing.book_id]
+    return outcomes
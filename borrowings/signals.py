@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from borrowings.models import Borrowing
+from borrowings.services import bump_borrowing_versions
+from borrowings.stats import deleted_with_user, refresh_borrowing_stats
+
+
+@receiver(post_save, sender=Borrowing)
+@receiver(post_delete, sender=Borrowing)
+def borrowing_changed(sender, instance, origin=None, **kwargs):
+    bump_borrowing_versions([instance.user_id])
+    if not deleted_with_user(origin):
+        refresh_borrowing_stats([instance.user_id])
@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from borrowings.models import Borrowing, UserBorrowingStats
+from payments.models import Payment
+
+STAT_FIELDS = (
+    "active_borrowings",
+    "total_borrowings",
+    "pending_payments",
+    "pending_amount",
+)
+
+
+def refresh_borrowing_stats(user_ids=None):
+    """
+    Recount the ``UserBorrowingStats`` of ``user_ids``, or of every user
+    when ``None``, from their borrowings and payments.
+
+    Call it in the transaction that changed them. The rows are upserted
+    and locked in id order first, so the recount, a separate statement,
+    sees every concurrent change to the same users that committed while
+    it waited.
+    """
+    tables = {
+        "stats": UserBorrowingStats._meta.db_table,
+        "user": get_user_model()._meta.db_table,
+        "borrowing": Borrowing._meta.db_table,
+        "payment": Payment._meta.db_table,
+    }
+    params = {"pending": Payment.Status.PENDING}
+    where = ""
+    if user_ids is not None:
+        params["user_ids"] = sorted(set(user_ids))
+        if not params["user_ids"]:
+            return
+        where = "WHERE u.id = ANY(%(user_ids)s)"
+    columns = ", ".join(STAT_FIELDS)
+    # Callers are already in a transaction; no savepoint is needed.
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        if user_ids is not None:
+            cursor.execute(
+                f"""
+                INSERT INTO {tables["stats"]}
+                    (user_id, {columns}, updated_at)
+                SELECT u.id, 0, 0, 0, 0, now()
+                FROM {tables["user"]} AS u
+                {where}
+                ORDER BY u.id
+                ON CONFLICT (user_id)
+                DO UPDATE SET updated_at = EXCLUDED.updated_at
+                """,
+                params,
+            )
+        updates = ", ".join(
+            f"{field} = EXCLUDED.{field}" for field in STAT_FIELDS
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {tables["stats"]} (user_id, {columns}, updated_at)
+            SELECT u.id, b.active, b.total, p.pending, p.amount, now()
+            FROM {tables["user"]} AS u
+            CROSS JOIN LATERAL (
+                SELECT
+                    COUNT(*) FILTER (
+                        WHERE actual_return_date IS NULL
+                    ) AS active,
+                    COUNT(*) AS total
+                FROM {tables["borrowing"]}
+                WHERE user_id = u.id
+            ) AS b
+            CROSS JOIN LATERAL (
+                SELECT
+                    COUNT(*) AS pending,
+                    COALESCE(SUM(pay.money_to_pay), 0) AS amount
+                FROM {tables["payment"]} AS pay
+                JOIN {tables["borrowing"]} AS pb ON pb.id = pay.borrowing_id
+                WHERE pb.user_id = u.id AND pay.status = %(pending)s
+            ) AS p
+            {where}
+            ON CONFLICT (user_id) DO UPDATE SET {updates}, updated_at = now()
+            """,
+            params,
+        )
+
+
+def deleted_with_user(origin):
+    """
+    Whether a ``post_delete`` with this ``origin`` cascades from deleting
+    a user, whose stats row goes with it.
+    """
+    if isinstance(origin, QuerySet):
+        return origin.model is get_user_model()
+    return isinstance(origin, get_user_model())
+
+
+def borrowing_stats(user_id):
+    """``user_id``'s stats row, or an unsaved all-zero one."""
+    return (
+        UserBorrowingStats.objects.filter(user_id=user_id).first()
+        or UserBorrowingStats(user_id=user_id)
+    )
+
+
+async def aborrowing_stats(user_id):
+    return (
+        await UserBorrowingStats.objects.filter(user_id=user_id).afirst()
+        or UserBorrowingStats(user_id=user_id)
+    )
@@ -0,0 +1,145 @@
+import datetime
+import logging
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+from django_q.tasks import async_task
+from borrowings.models import OverdueScanRun
+from borrowings.overdue import build_messages, overdue_queryset, scan_overdue
+from telegram.delivery import BotAPISender, deliver
+
+logger = logging.getLogger(__name__)
+
+
+def last_watermark():
+    """Scan date of the latest successful run, ``None`` before the first."""
+    return (
+        OverdueScanRun.objects.filter(status=OverdueScanRun.Status.SUCCEEDED)
+        .order_by("-scan_date")
+        .values_list("scan_date", flat=True)
+        .first()
+    )
+
+
+def shard_ranges(today, since, shard_size):
+    """Split the ids of the rows to scan into ``[start, end)`` ranges."""
+    bounds = overdue_queryset(today, since).aggregate(
+        first=Min("id"), last=Max("id")
+    )
+    if bounds["first"] is None:
+        return []
+    return [
+        (start, min(start + shard_size, bounds["last"] + 1))
+        for start in range(bounds["first"], bounds["last"] + 1, shard_size)
+    ]
+
+
+def run_overdue_scan(today=None):
+    """
+    Scheduled entry point: scan borrowings that became overdue since the
+    last successful run, one queued task per id-range shard.
+    """
+    config = settings.OVERDUE_SCAN
+    if today is None:
+        today = datetime.date.today()
+    since = last_watermark()
+    if since is not None and since >= today:
+        logger.info(f"Overdue scan for {today} already done")
+        return None
+
+    ranges = shard_ranges(today, since, config["SHARD_SIZE"])
+    run = OverdueScanRun.objects.create(
+        scan_date=today, since=since, shards=len(ranges)
+    )
+    if not ranges:
+        notify(build_messages([]))
+        complete_run(run.id)
+    for id_range in ranges:
+        async_task(
+            "borrowings.tasks.scan_overdue_shard",
+            run.id,
+            id_range,
+            group=f"overdue-scan-{run.id}",
+            sync=config["SYNC"],
+        )
+    return run
+
+
+def claim_shard(run_id, id_range):
+    """
+    Record that a task took the shard starting at ``id_range[0]``, and
+    return the run, or ``None`` if the shard was already claimed.
+    """
+    with transaction.atomic():
+        run = OverdueScanRun.objects.select_for_update().get(pk=run_id)
+        if id_range[0] in run.claimed_shards:
+            return None
+        run.claimed_shards.append(id_range[0])
+        run.save(update_fields=["claimed_shards"])
+    return run
+
+
+def scan_overdue_shard(run_id, id_range):
+    """
+    Scan and notify one shard. A shard runs at most once: the broker
+    retries unacknowledged tasks, and a retry must not send the alerts
+    or count the shard again. Its rows are picked up by the next run,
+    since a failed run does not move the watermark.
+    """
+    run = claim_shard(run_id, id_range)
+    if run is None:
+        logger.info(f"Overdue scan {run_id} shard {id_range} already ran")
+        return
+    try:
+        scan = scan_overdue(run.scan_date, run.since, id_range)
+        messages = build_messages(scan.rows) if scan.rows else []
+        notify(messages)
+    except Exception:
+        OverdueScanRun.objects.filter(pk=run_id).update(
+            status=OverdueScanRun.Status.FAILED,
+            shards_done=F("shards_done") + 1,
+        )
+        complete_run(run_id)
+        raise
+    logger.info(
+        f"Overdue scan {run_id} shard {id_range}: {scan.count} borrowings "
+        f"in {scan.duration * 1000:.1f} ms"
+    )
+    OverdueScanRun.objects.filter(pk=run_id).update(
+        shards_done=F("shards_done") + 1,
+        rows=F("rows") + scan.count,
+        messages=F("messages") + len(messages),
+    )
+    complete_run(run_id)
+
+
+def complete_run(run_id):
+    """Close the run once its last shard has reported back."""
+    with transaction.atomic():
+        run = OverdueScanRun.objects.select_for_update().get(pk=run_id)
+        if run.finished_at is not None or run.shards_done < run.shards:
+            return
+        run.finished_at = timezone.now()
+        run.duration = run.finished_at - run.started_at
+        if run.status == OverdueScanRun.Status.RUNNING:
+            run.status = OverdueScanRun.Status.SUCCEEDED
+        run.save()
+
+
+def notify(messages):
+    config = settings.TELEGRAM_BOT
+    if not messages or not config["TOKEN"] or not config["CHAT_ID"]:
+        return
+    async_to_sync(_deliver)(config, messages)
+
+
+async def _deliver(config, messages):
+    sender = BotAPISender(config["TOKEN"], base_url=config["API_URL"])
+    try:
+        return await deliver(
+            sender, config["CHAT_ID"], messages, parse_mode="HTML"
+        )
+    finally:
+        await sender.close()
@@ -1,13 +1,48 @@
+import datetime
+import json
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import StringIO
+from threading import Barrier
+from unittest import mock, skipUnless
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from books.models import Book
 from books.tests import sample_book
-from borrowings.models import Borrowing
+from borrowings.history import borrowing_history, build_history_messages
+from borrowings.models import Borrowing, OverdueScanRun, UserBorrowingStats
+from borrowings.stats import borrowing_stats
+from borrowings import tasks
+from borrowings.tasks import run_overdue_scan, shard_ranges
+from borrowings.overdue import (
+    ALERT_HEADER,
+    NO_OVERDUE_MESSAGE,
+    OverdueRow,
+    build_messages,
+    overdue_queryset,
+    scan_overdue,
+)
 from borrowings.serializers import BorrowingSerializer
+from payments.models import Payment
+from borrowings.services import (
+    BookUnavailable,
+    BorrowingAlreadyReturned,
+    borrow_book,
+    bulk_return_borrowings,
+    return_borrowing,
+)
 
 BORROWING_URL = reverse("borrowings:borrowings-list-create")
+BULK_BORROWING_URL = reverse("borrowings:borrowings-bulk-create")
+BULK_RETURN_URL = reverse("borrowings:borrowings-bulk-return")
 
 
 def sample_borrowing(**params) -> Borrowing:
@@ -27,6 +62,39 @@ def detail_url(borrowing_id):
     return reverse("borrowings:borrowing-detail", args=[borrowing_id])
 
 
+def return_url(borrowing_id):
+    return reverse("borrowings:return-borrowing", args=[borrowing_id])
+
+
+def hammer(action, args_list, workers):
+    """
+    Run ``action(*args)`` for every entry of ``args_list`` from ``workers``
+    threads released at the same moment. Returns the outcomes in order
+    and the elapsed wall time in seconds.
+    """
+    barrier = Barrier(workers)
+
+    def run(chunk):
+        barrier.wait()
+        outcomes = []
+        try:
+            for args in chunk:
+                try:
+                    outcomes.append(action(*args))
+                except Exception as error:
+                    outcomes.append(error)
+        finally:
+            connection.close()
+        return outcomes
+
+    chunks = [args_list[i::workers] for i in range(workers)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run, chunks))
+    elapsed = time.perf_counter() - start
+    return [outcome for chunk in results for outcome in chunk], elapsed
+
+
 class UnauthenticatedBorrowingAPITests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -73,18 +141,18 @@ class AuthenticatedBorrowingAPITests(TestCase):
         self.client.force_login(self.user)
         res = self.client.get(BORROWING_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 3)
-        for borrowing in res.data:
+        self.assertEqual(len(res.data["results"]), 3)
+        for borrowing in res.data["results"]:
             self.assertEqual(borrowing["user"], self.user.id)
 
     def test_authenticated_user_can_filter_active_borrowings(self):
         self.client.force_login(self.user)
         res = self.client.get(BORROWING_URL, {"is_active": "true"})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 3)
+        self.assertEqual(len(res.data["results"]), 3)
         res = self.client.get(BORROWING_URL, {"is_active": "false"})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 0)
+        self.assertEqual(len(res.data["results"]), 0)
 
 
 class AdminBorrowingTests(TestCase):
@@ -111,20 +179,535 @@ class AdminBorrowingTests(TestCase):
         self.client.force_login(self.admin)
         res = self.client.get(BORROWING_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 4)
+        self.assertEqual(len(res.data["results"]), 4)
 
     def test_admin_user_filters_by_user_id(self):
         self.client.force_login(self.admin)
         res = self.client.get(BORROWING_URL, {"user_id": self.user.id})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 3)
-        self.assertEqual(res.data[0]["user"], self.user.id)
+        self.assertEqual(len(res.data["results"]), 3)
+        self.assertEqual(res.data["results"][0]["user"], self.user.id)
 
     def test_is_active_filter(self):
         self.client.force_login(self.admin)
         res = self.client.get(BORROWING_URL, {"is_active": "true"})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 3)
+        self.assertEqual(len(res.data["results"]), 3)
         res = self.client.get(BORROWING_URL, {"is_active": "false"})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_cursor_pagination_walks_all_pages(self):
+        self.client.force_login(self.admin)
+        res = self.client.get(BORROWING_URL, {"page_size": 3})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data["previous"])
+        first_page = [borrowing["id"] for borrowing in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        second_page = [borrowing["id"] for borrowing in res.data["results"]]
+        self.assertIsNone(res.data["next"])
+        expected = list(
+            Borrowing.objects.order_by(
+                "-borrow_date", "-id"
+            ).values_list("id", flat=True)
+        )
+        self.assertEqual(first_page + second_page, expected)
+        res = self.client.get(res.data["previous"])
+        self.assertEqual(
+            [borrowing["id"] for borrowing in res.data["results"]],
+            first_page
+        )
+
+    def test_invalid_cursor(self):
+        self.client.force_login(self.admin)
+        res = self.client.get(BORROWING_URL, {"cursor": "invalid"})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_streaming_export(self):
+        res = self.client.get(
+            BORROWING_URL, {"format": "json-stream", "page_size": 1}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        data = json.loads(b"".join(res.streaming_content))
+        borrowings = Borrowing.objects.order_by("-borrow_date", "-id")
+        self.assertEqual(
+            data, BorrowingSerializer(borrowings, many=True).data
+        )
+
+    async def test_streaming_export_under_asgi(self):
+        await self.async_client.aforce_login(self.admin)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            res = await self.async_client.get(
+                BORROWING_URL, {"format": "json-stream"}
+            )
+            self.assertTrue(res.is_async)
+            data = json.loads(
+                b"".join([part async for part in res.streaming_content])
+            )
+        self.assertEqual(caught, [])
+        borrowings = Borrowing.objects.order_by("-borrow_date", "-id")
+        self.assertEqual(data, await sync_to_async(
+            lambda: BorrowingSerializer(borrowings, many=True).data
+        )())
+
+    def test_streaming_export_staff_only(self):
+        self.client.force_authenticate(self.user)
+        res = self.client.get(BORROWING_URL, {"format": "json-stream"})
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ReturnBorrowingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@admin.test", password="testpassword", is_staff=True,
+        )
+        self.borrowing = sample_borrowing(user=self.admin)
+        self.client.force_authenticate(self.admin)
+
+    def test_return_restores_inventory(self):
+        res = self.client.post(
+            return_url(self.borrowing.id), {"actual_return_date": "2025-01-15"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["actual_return_date"], "2025-01-15")
+        self.assertEqual(res.data["book"]["inventory"], 21)
+        self.borrowing.book.refresh_from_db()
+        self.assertEqual(self.borrowing.book.inventory, 21)
+
+    def test_return_twice_rejected(self):
+        self.client.post(return_url(self.borrowing.id))
+        res = self.client.post(return_url(self.borrowing.id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.borrowing.book.refresh_from_db()
+        self.assertEqual(self.borrowing.book.inventory, 21)
+
+    def test_return_unknown_borrowing(self):
+        res = self.client.post(return_url(self.borrowing.id + 100))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_create_borrowing_out_of_stock(self):
+        book = sample_book(inventory=0)
+        res = self.client.post(
+            BORROWING_URL,
+            {"expected_return_date": "2025-01-20", "book": book.id}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Borrowing.objects.filter(book=book).exists())
+
+
+class BulkBorrowingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@admin.test", password="testpassword", is_staff=True,
+        )
+        self.client.force_authenticate(self.admin)
+
+    def test_bulk_borrow_partial_failure(self):
+        book = sample_book(inventory=2)
+        empty_book = sample_book(inventory=0)
+        payload = {
+            "books": [book.id, empty_book.id, book.id, book.id, 0],
+            "expected_return_date": "2025-01-20",
+        }
+        res = self.client.post(BULK_BORROWING_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result["status"] for result in res.data["results"]],
+            ["ok", "failed", "ok", "failed", "failed"],
+        )
+        last_borrowing = res.data["results"][2]["borrowing"]
+        self.assertEqual(last_borrowing["book"]["inventory"], 0)
+        self.assertIsNotNone(last_borrowing["borrow_date"])
+        book.refresh_from_db()
+        self.assertEqual(book.inventory, 0)
+        self.assertEqual(Borrowing.objects.filter(user=self.admin).count(), 2)
+
+    def test_bulk_borrow_query_count_is_constant(self):
+        books = [sample_book() for _ in range(10)]
+        payload = {
+            "books": [book.id for book in books],
+            "expected_return_date": "2025-01-20",
+        }
+        # Includes the two statements refreshing UserBorrowingStats.
+        with self.assertNumQueries(7):
+            res = self.client.post(
+                BULK_BORROWING_URL, payload, format="json"
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_bulk_return(self):
+        first = sample_borrowing(user=self.admin)
+        second = sample_borrowing(user=self.admin, book=first.book)
+        returned = sample_borrowing(
+            user=self.admin, actual_return_date="2025-01-12"
+        )
+        payload = {
+            "borrowings": [first.id, second.id, returned.id, first.id],
+            "actual_return_date": "2025-01-15",
+        }
+        res = self.client.post(BULK_RETURN_URL, payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result["status"] for result in res.data["results"]],
+            ["ok", "ok", "failed", "failed"],
+        )
+        first.book.refresh_from_db()
+        self.assertEqual(first.book.inventory, 22)
+        self.assertEqual(
+            Borrowing.objects.filter(
+                actual_return_date="2025-01-15"
+            ).count(),
+            2,
+        )
+
+
+class BorrowingConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email="other@test.test", password="otherpassword"
+        )
+        self.borrowing = sample_borrowing(user=self.user)
+        self.client.force_authenticate(self.user)
+
+    def test_matching_etag_returns_304(self):
+        etag = self.client.get(BORROWING_URL)["ETag"]
+        with self.assertNumQueries(1):
+            res = self.client.get(BORROWING_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_own_return_changes_etag(self):
+        etag = self.client.get(BORROWING_URL)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            return_borrowing(self.borrowing.id)
+        res = self.client.get(BORROWING_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_other_users_borrowing_keeps_etag(self):
+        etag = self.client.get(BORROWING_URL)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Borrowing.objects.create(
+                user=self.other_user,
+                book=self.borrowing.book,
+                expected_return_date="2025-01-20",
+            )
+        res = self.client.get(BORROWING_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_checkout_elsewhere_keeps_etag(self):
+        etag = self.client.get(BORROWING_URL)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            borrow_book(self.other_user, sample_book(), "2025-01-20")
+            borrow_book(self.other_user, self.borrowing.book, "2025-01-20")
+        res = self.client.get(BORROWING_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_book_edit_changes_etag(self):
+        etag = self.client.get(BORROWING_URL)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.borrowing.book.title = "Renamed"
+            self.borrowing.book.save()
+        res = self.client.get(BORROWING_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("inventory", res.data["results"][0]["book"])
+
+    def test_book_stock_edit_keeps_etag(self):
+        etag = self.client.get(BORROWING_URL)["ETag"]
+        book = Book.objects.get(pk=self.borrowing.book_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            book.inventory += 5
+            book.save()
+            book.save(update_fields=["inventory"])
+        res = self.client.get(BORROWING_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class OverdueScanTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        self.late = [
+            sample_borrowing(user=self.user, expected_return_date=date)
+            for date in ("2025-01-12", "2025-01-11", "2025-01-13")
+        ]
+        sample_borrowing(user=self.user, expected_return_date="2025-01-20")
+        sample_borrowing(
+            user=self.user,
+            expected_return_date="2025-01-12",
+            actual_return_date="2025-01-14",
+        )
+
+    def test_scan_is_one_query(self):
+        with self.assertNumQueries(1):
+            scan = scan_overdue(datetime.date(2025, 1, 15))
+        self.assertEqual(scan.count, 3)
+        self.assertEqual(
+            [row.id for row in scan.rows],
+            [self.late[1].id, self.late[0].id, self.late[2].id],
+        )
+        self.assertEqual(scan.rows[0].user_email, self.user.email)
+        self.assertEqual(scan.rows[0].book_title, "Sample book")
+
+    def test_messages_are_batched(self):
+        rows = scan_overdue(datetime.date(2025, 1, 15)).rows
+        messages = build_messages(rows, batch_size=2)
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(messages[0].count("User:"), 2)
+        self.assertEqual(messages[1].count("User:"), 1)
+        messages = build_messages(rows, limit=120)
+        self.assertEqual(len(messages), 3)
+        self.assertEqual(build_messages([]), [NO_OVERDUE_MESSAGE])
+
+    def test_alerts_are_html_escaped(self):
+        row = OverdueRow(
+            1, datetime.date(2025, 1, 12), "a&b@test.test", "<Dune> & co"
+        )
+        [message] = build_messages([row])
+        self.assertIn("Book: &lt;Dune&gt; &amp; co", message)
+        self.assertIn("User: a&amp;b@test.test", message)
+        self.assertTrue(message.startswith(ALERT_HEADER))
+
+    @skipUnless(connection.vendor == "postgresql", "Postgres query plans")
+    def test_scan_uses_partial_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = overdue_queryset(datetime.date(2025, 1, 15)).explain()
+        self.assertIn("borrowing_overdue_idx", plan)
+
+
+def run_task_inline(name, *args, **options):
+    """Stand-in for ``async_task`` that runs ``borrowings.tasks`` inline."""
+    getattr(tasks, name.rsplit(".", 1)[1])(*args)
+
+
+@override_settings(OVERDUE_SCAN={"CRON": "0 8 * * *", "SHARD_SIZE": 2, "SYNC": False})
+@mock.patch("borrowings.tasks.async_task", run_task_inline)
+class OverdueScanScheduleTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        self.late = [
+            sample_borrowing(user=self.user, expected_return_date=date)
+            for date in ("2025-01-11", "2025-01-12", "2025-01-13")
+        ]
+        self.due_soon = sample_borrowing(
+            user=self.user, expected_return_date="2025-01-15"
+        )
+
+    def test_shards_cover_all_overdue_ids(self):
+        ranges = shard_ranges(datetime.date(2025, 1, 15), None, 2)
+        self.assertEqual(len(ranges), 2)
+        self.assertEqual(ranges[0][0], self.late[0].id)
+        self.assertEqual(ranges[-1][1], self.late[-1].id + 1)
+
+    def test_runs_record_history_and_watermark(self):
+        first = run_overdue_scan(datetime.date(2025, 1, 15))
+        first.refresh_from_db()
+        self.assertEqual(first.status, OverdueScanRun.Status.SUCCEEDED)
+        self.assertEqual((first.shards, first.shards_done), (2, 2))
+        self.assertEqual(first.rows, 3)
+        self.assertIsNotNone(first.duration)
+
+        self.assertIsNone(run_overdue_scan(datetime.date(2025, 1, 15)))
+
+        second = run_overdue_scan(datetime.date(2025, 1, 16))
+        second.refresh_from_db()
+        self.assertEqual(second.since, datetime.date(2025, 1, 15))
+        self.assertEqual(second.rows, 1)
+        self.assertEqual(
+            list(OverdueScanRun.objects.values_list("id", flat=True)),
+            [second.id, first.id],
+        )
+
+    def test_retried_shard_is_not_repeated(self):
+        with mock.patch(
+            "borrowings.tasks.notify", side_effect=[None, RuntimeError]
+        ) as notify:
+            with self.assertRaises(RuntimeError):
+                run_overdue_scan(datetime.date(2025, 1, 15))
+            run = OverdueScanRun.objects.get()
+            last = shard_ranges(run.scan_date, None, 2)[1]
+            tasks.scan_overdue_shard(run.id, last)
+        run.refresh_from_db()
+        self.assertEqual(notify.call_count, 2)
+        self.assertEqual((run.shards, run.shards_done), (2, 2))
+        self.assertEqual(run.status, OverdueScanRun.Status.FAILED)
+
+
+class BorrowingHistoryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+
+    def add_history(self, size):
+        for i in range(size):
+            borrowing = sample_borrowing(
+                user=self.user,
+                actual_return_date="2025-01-15" if i % 2 else None,
+            )
+            if i % 3 == 0:
+                Payment.objects.create(
+                    borrowing=borrowing,
+                    type_field=Payment.TypeField.PAYMENT,
+                    status=Payment.Status.PAID,
+                    money_to_pay=4,
+                )
+
+    def test_query_count_does_not_grow_with_history(self):
+        self.add_history(3)
+        with self.assertNumQueries(1):
+            build_history_messages(borrowing_history(self.user))
+        self.add_history(40)
+        with self.assertNumQueries(1):
+            history = borrowing_history(self.user)
+            build_history_messages(history)
+        self.assertEqual(len(history), 43)
+        self.assertEqual(
+            sum(borrowing.is_paid for borrowing in history), 15
+        )
+
+    def test_long_history_split_across_messages(self):
+        self.add_history(30)
+        history = borrowing_history(self.user)
+        messages = build_history_messages(history, per_message=10)
+        self.assertEqual(len(messages), 5)
+        self.assertEqual(
+            sum(message.count("Return status:") for message in messages), 30
+        )
+        messages = build_history_messages(history, limit=500)
+        self.assertTrue(all(len(message) <= 500 for message in messages))
+
+    def test_empty_history(self):
+        self.assertEqual(build_history_messages([]), [])
+
+
+class UserBorrowingStatsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        self.book = sample_book()
+        self.today = datetime.date.today()
+
+    def stats(self):
+        stats = borrowing_stats(self.user.id)
+        return (
+            stats.active_borrowings,
+            stats.total_borrowings,
+            stats.pending_payments,
+            stats.pending_amount,
+        )
+
+    def borrow(self):
+        return borrow_book(
+            self.user, self.book, self.today + datetime.timedelta(days=10)
+        )
+
+    def test_no_row_reads_as_zero(self):
+        self.assertEqual(self.stats(), (0, 0, 0, 0))
+
+    def test_borrow_and_return(self):
+        first = self.borrow()
+        second = self.borrow()
+        self.assertEqual(self.stats(), (2, 2, 0, 0))
+        return_borrowing(first.id, self.today + datetime.timedelta(days=12))
+        # 10 days of rental plus 2 overdue days at twice the daily fee.
+        self.assertEqual(self.stats(), (1, 2, 2, Decimal("14.00")))
+        bulk_return_borrowings([second.id], self.today)
+        self.assertEqual(self.stats(), (0, 2, 3, Decimal("15.00")))
+
+    def test_paid_payment_leaves_pending_totals(self):
+        borrowing = self.borrow()
+        return_borrowing(borrowing.id, self.today)
+        payment = Payment.objects.get(borrowing=borrowing)
+        payment.status = Payment.Status.PAID
+        payment.save()
+        self.assertEqual(self.stats(), (0, 1, 0, 0))
+
+    def test_rebuild_command(self):
+        Borrowing.objects.bulk_create(
+            Borrowing(
+                user=self.user,
+                book=self.book,
+                expected_return_date=self.today,
+            )
+            for _ in range(3)
+        )
+        self.assertEqual(self.stats(), (0, 0, 0, 0))
+        call_command("rebuild_borrowing_stats", stdout=StringIO())
+        self.assertEqual(self.stats(), (3, 3, 0, 0))
+
+    def test_deleting_user_deletes_stats(self):
+        self.borrow()
+        self.user.delete()
+        self.assertFalse(UserBorrowingStats.objects.exists())
+
+
+class ConcurrentInventoryTests(TransactionTestCase):
+    workers = 8
+    attempts = 40
+    inventory = 15
+    min_throughput = 10
+
+    def setUp(self):
+        self.book = sample_book(inventory=self.inventory)
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f"user{i}@test.test", password="testpassword"
+            )
+            for i in range(self.workers)
+        ]
+
+    def test_concurrent_borrow_and_return_conserve_inventory(self):
+        outcomes, elapsed = hammer(
+            borrow_book,
+            [
+                (self.users[i % self.workers], self.book, "2025-01-20")
+                for i in range(self.attempts)
+            ],
+            self.workers,
+        )
+        borrowed = [
+            outcome for outcome in outcomes
+            if isinstance(outcome, Borrowing)
+        ]
+        rejected = [
+            outcome for outcome in outcomes
+            if isinstance(outcome, BookUnavailable)
+        ]
+        self.assertEqual(len(borrowed), self.inventory)
+        self.assertEqual(len(rejected), self.attempts - self.inventory)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, 0)
+        self.assertEqual(
+            Borrowing.objects.filter(book=self.book).count(), self.inventory
+        )
+        self.assertGreater(self.attempts / elapsed, self.min_throughput)
+
+        outcomes, elapsed = hammer(
+            return_borrowing,
+            [(borrowing.id,) for borrowing in borrowed] * 2,
+            self.workers,
+        )
+        returned = [
+            outcome for outcome in outcomes
+            if isinstance(outcome, Borrowing)
+        ]
+        duplicates = [
+            outcome for outcome in outcomes
+            if isinstance(outcome, BorrowingAlreadyReturned)
+        ]
+        self.assertEqual(len(returned), self.inventory)
+        self.assertEqual(len(duplicates), self.inventory)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.inventory, self.inventory)
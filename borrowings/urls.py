@@ -1,6 +1,10 @@
 from django.urls import path
 from borrowings.views import (
-    BorrowingListCreateView, BorrowingDetail, ReturnBorrowingView
+    BorrowingListCreateView,
+    BorrowingDetail,
+    BulkBorrowingView,
+    BulkReturnBorrowingView,
+    ReturnBorrowingView,
 )
 
 app_name = "borrowings"
@@ -11,6 +15,16 @@ urlpatterns = [
         BorrowingListCreateView.as_view(),
         name="borrowings-list-create"
     ),
+    path(
+        "borrowings/bulk/",
+        BulkBorrowingView.as_view(),
+        name="borrowings-bulk-create"
+    ),
+    path(
+        "borrowings/bulk-return/",
+        BulkReturnBorrowingView.as_view(),
+        name="borrowings-bulk-return"
+    ),
     path(
         "borrowings/<int:pk>/",
         BorrowingDetail.as_view(),
@@ -2,16 +2,45 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import generics, permissions, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from borrowings.models import Borrowing
+from borrowings.pagination import BorrowingCursorPagination
 from borrowings.serializers import (
     BorrowingSerializer,
+    BulkBorrowingSerializer,
+    BulkReturnBorrowingSerializer,
     CreateBorrowingSerializer,
     ReturnBorrowingSerializer
 )
+from borrowings.services import (
+    BORROWING_ALREADY_RETURNED,
+    BORROWING_NOT_FOUND,
+    BorrowingAlreadyReturned,
+    bulk_borrow_books,
+    bulk_return_borrowings,
+    return_borrowing,
+)
+from core.metrics import RETURN_SECONDS, RETURNS, track
+from core.mixins import ConditionalGetMixin, FastListMixin
+from core.renderers import StreamingJSONRenderer
 
 
-class BorrowingListCreateView(generics.ListCreateAPIView):
+class BorrowingListCreateView(
+    ConditionalGetMixin, FastListMixin, generics.ListCreateAPIView
+):
     permission_classes = [IsAuthenticated]
+    pagination_class = BorrowingCursorPagination
+    renderer_classes = [
+        *api_settings.DEFAULT_RENDERER_CLASSES, StreamingJSONRenderer
+    ]
+
+    def get_version_keys(self):
+        # The embedded book's inventory is not an input: every checkout
+        # would change every reader's ETag, so a 304 may keep old stock.
+        user = self.request.user
+        if user.is_staff:
+            return ("borrowings",)
+        return (f"borrowings:user:{user.id}",)
 
     def get_queryset(self):
         queryset = Borrowing.objects.select_related("book", "user")
@@ -59,9 +88,10 @@ class BorrowingListCreateView(generics.ListCreateAPIView):
         return super().list(request, *args, **kwargs)
 
 
-class BorrowingDetail(generics.RetrieveAPIView):
+class BorrowingDetail(ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = Borrowing.objects.select_related("book", "user")
     serializer_class = BorrowingSerializer
+    version_keys = ("borrowings",)
 
 
 class ReturnBorrowingView(generics.CreateAPIView):
@@ -69,27 +99,85 @@ class ReturnBorrowingView(generics.CreateAPIView):
     queryset = Borrowing.objects.select_related("book", "user")
 
     def post(self, request, pk):
-        try:
-            borrowing = Borrowing.objects.get(pk=pk)
-        except Borrowing.DoesNotExist:
-            return Response(
-                {
-                    "detail": "Borrowing not found."
-                },
-                status=status.HTTP_404_NOT_FOUND
-            )
-        if borrowing.is_returned:
-            return Response(
-                {"detail": "This borrowing has already been returned."},
-                status=status.HTTP_400_BAD_REQUEST,
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with track(RETURNS, RETURN_SECONDS) as outcome:
+            try:
+                borrowing = return_borrowing(
+                    pk, serializer.validated_data.get("actual_return_date")
+                )
+            except Borrowing.DoesNotExist:
+                outcome.value = "not_found"
+                return Response(
+                    {
+                        "detail": BORROWING_NOT_FOUND
+                    },
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            except BorrowingAlreadyReturned:
+                outcome.value = "already_returned"
+                return Response(
+                    {"detail": BORROWING_ALREADY_RETURNED},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        return Response(
+            BorrowingSerializer(borrowing).data, status=status.HTTP_200_OK
+        )
+
+
+def bulk_results(key, outcomes):
+    results = []
+    for item_id, borrowing, error in outcomes:
+        if error:
+            results.append(
+                {key: item_id, "status": "failed", "detail": error}
             )
-        borrowing.actual_return_date = request.data.get(
-            "actual_return_date"
+        else:
+            results.append({
+                key: item_id,
+                "status": "ok",
+                "borrowing": BorrowingSerializer(borrowing).data,
+            })
+    return results
+
+
+class BulkBorrowingView(generics.GenericAPIView):
+    serializer_class = BulkBorrowingSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        outcomes = bulk_borrow_books(
+            request.user,
+            serializer.validated_data["books"],
+            serializer.validated_data["expected_return_date"],
         )
-        borrowing.save()
-        book = borrowing.book
-        book.inventory += 1
-        book.save()
+        failed = any(error for _, _, error in outcomes)
         return Response(
-            BorrowingSerializer(borrowing).data, status=status.HTTP_200_OK
+            {"results": bulk_results("book", outcomes)},
+            status=(
+                status.HTTP_207_MULTI_STATUS
+                if failed else status.HTTP_201_CREATED
+            ),
+        )
+
+
+class BulkReturnBorrowingView(generics.GenericAPIView):
+    serializer_class = BulkReturnBorrowingSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        outcomes = bulk_return_borrowings(
+            serializer.validated_data["borrowings"],
+            serializer.validated_data.get("actual_return_date"),
+        )
+        failed = any(error for _, _, error in outcomes)
+        return Response(
+            {"results": bulk_results("borrowing", outcomes)},
+            status=(
+                status.HTTP_207_MULTI_STATUS
+                if failed else status.HTTP_200_OK
+            ),
         )
@@ -0,0 +1,384 @@
+import asyncio
+import copy
+import datetime
+import gc
+import itertools
+import socket
+import statistics
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+import httpx
+import uvicorn
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.http.request import validate_host
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from books.cache import catalogue_cache
+from books.models import Book
+from borrowings.models import Borrowing
+from core.testing import percentile
+from library_service.asgi import application
+from payments.models import Payment
+
+
+def server_name():
+    """
+    A host ``ALLOWED_HOSTS`` accepts for the test client's requests: its
+    own ``testserver`` under the test runner, else e.g. ``localhost``
+    from ``manage.py``.
+    """
+    allowed = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed:
+        # Django's own fallback for local development.
+        allowed = [".localhost", "127.0.0.1", "[::1]"]
+    for host in ("testserver", *(host.lstrip(".") for host in allowed)):
+        if validate_host(host, allowed):
+            return host
+    return "testserver"
+
+
+class Endpoint:
+    """
+    One request to benchmark. ``url`` and ``data`` may be callables taking
+    the iteration number, for paths that must not repeat, e.g. returning
+    a borrowing. ``before``, if given, runs ahead of every request and
+    outside its timing, e.g. to drop cached responses.
+    """
+
+    def __init__(self, name, method, url, user, data=None, status=200,
+                 before=None):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.user = user
+        self.data = data
+        self.status = status
+        self.before = before
+
+    def request(self, client, iteration):
+        url = self.url(iteration) if callable(self.url) else self.url
+        data = self.data(iteration) if callable(self.data) else self.data
+        client.force_authenticate(self.user)
+        return getattr(client, self.method)(url, data, format="json")
+
+
+def bench_fixtures(iterations):
+    """
+    Pick the users and rows the endpoints run against: the reader with
+    the most borrowings, a staff user, a book with stock, and one active
+    borrowing per return iteration.
+    """
+    reader = get_user_model().objects.get(
+        pk=Borrowing.objects.values("user")
+        .annotate(count=Count("id"))
+        .order_by("-count")
+        .values("user")[:1]
+    )
+    staff = get_user_model().objects.create_user(
+        email=f"bench-staff-{time.time_ns()}@library.local",
+        password="bench-password",
+        is_staff=True,
+    )
+    book = Book.objects.order_by("id").first()
+    Book.objects.filter(pk=book.pk).update(inventory=10 * iterations + 10)
+    expected = datetime.date.today() + datetime.timedelta(days=14)
+    to_return = Borrowing.objects.bulk_create(
+        Borrowing(user=reader, book=book, expected_return_date=expected)
+        for _ in range(iterations + 2)
+    )
+    return {
+        "reader": reader,
+        "staff": staff,
+        "book": book,
+        "borrowing": Borrowing.objects.filter(user=reader).first(),
+        "payment": Payment.objects.filter(borrowing__user=reader).first()
+        or Payment.objects.first(),
+        "to_return": to_return,
+        "expected": expected.isoformat(),
+    }
+
+
+def build_endpoints(fixtures):
+    reader = fixtures["reader"]
+    staff = fixtures["staff"]
+    to_return = fixtures["to_return"]
+    book_url = reverse("books:book-detail", args=[fixtures["book"].pk])
+
+    def drop_catalogue():
+        catalogue_cache.invalidate_books([fixtures["book"].pk])
+
+    endpoints = [
+        Endpoint(
+            "books-list", "get", reverse("books:book-list"), reader,
+            before=drop_catalogue,
+        ),
+        Endpoint(
+            "books-list-cached", "get", reverse("books:book-list"), reader
+        ),
+        Endpoint(
+            "books-detail", "get", book_url, reader, before=drop_catalogue
+        ),
+        Endpoint("books-detail-cached", "get", book_url, reader),
+        Endpoint(
+            "borrowings-list", "get",
+            reverse("borrowings:borrowings-list-create"), reader,
+        ),
+        Endpoint(
+            "borrowings-list-staff", "get",
+            reverse("borrowings:borrowings-list-create"), staff,
+        ),
+        Endpoint(
+            "borrowings-detail", "get",
+            reverse(
+                "borrowings:borrowing-detail",
+                args=[fixtures["borrowing"].pk],
+            ),
+            reader,
+        ),
+        Endpoint(
+            "borrowings-create", "post",
+            reverse("borrowings:borrowings-list-create"),
+            reader,
+            data={
+                "book": fixtures["book"].pk,
+                "expected_return_date": fixtures["expected"],
+            },
+            status=201,
+        ),
+        Endpoint(
+            "borrowings-return", "post",
+            lambda i: reverse(
+                "borrowings:return-borrowing", args=[to_return[i].pk]
+            ),
+            staff,
+        ),
+        Endpoint(
+            "payments-list", "get", reverse("payments:payments-list"), reader
+        ),
+        Endpoint(
+            "payments-list-staff", "get",
+            reverse("payments:payments-list"), staff,
+        ),
+        Endpoint("users-me", "get", reverse("users:manage"), reader),
+    ]
+    if fixtures["payment"] is not None:
+        endpoints.append(Endpoint(
+            "payments-detail", "get",
+            reverse(
+                "payments:payments-detail", args=[fixtures["payment"].pk]
+            ),
+            staff,
+        ))
+    return endpoints
+
+
+def measure(endpoint, iterations):
+    """
+    Time ``iterations`` requests, then repeat one under ``tracemalloc``
+    for its peak allocation, so tracing does not skew the latencies.
+    The first request warms caches and is not counted.
+    """
+    client = APIClient(SERVER_NAME=server_name())
+    latencies = []
+    queries = []
+    for iteration in range(iterations + 1):
+        if endpoint.before is not None:
+            endpoint.before()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = endpoint.request(client, iteration)
+            elapsed = time.perf_counter() - started
+        if response.status_code != endpoint.status:
+            raise AssertionError(
+                f"{endpoint.name}: expected {endpoint.status}, "
+                f"got {response.status_code}"
+            )
+        if iteration:
+            latencies.append(elapsed)
+            queries.append(len(captured))
+    latencies.sort()
+
+    if endpoint.before is not None:
+        endpoint.before()
+    tracemalloc.start()
+    try:
+        endpoint.request(client, iterations + 1)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "queries": max(queries),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(iterations=20):
+    """
+    Measure every endpoint against the rows already in the database and
+    return ``{endpoint name: metrics}``. Writes rows; run it inside a
+    transaction that is rolled back.
+    """
+    fixtures = bench_fixtures(iterations)
+    return {
+        endpoint.name: measure(endpoint, iterations)
+        for endpoint in build_endpoints(fixtures)
+    }
+
+
+def compare_results(old, new):
+    """
+    ``[(endpoint, metric, old, new, change)]`` for metrics present in
+    both runs, ``change`` as a fraction of ``old``.
+    """
+    rows = []
+    for name, metrics in new.items():
+        for metric, value in metrics.items():
+            previous = old.get(name, {}).get(metric)
+            if previous is None:
+                continue
+            change = (value - previous) / previous if previous else 0.0
+            rows.append((name, metric, previous, value, change))
+    return rows
+
+
+CONNECTION_MODES = ("none", "persistent", "pool")
+
+# Never repeats within the process, so neither do benchmark urls.
+_request_numbers = itertools.count()
+
+
+def pool_available():
+    """Whether the ``"pool"`` mode can run: psycopg 3 with psycopg_pool."""
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return is_psycopg3
+
+
+@contextmanager
+def connection_mode(mode, max_age=60):
+    """
+    Handle connections of the default database as ``mode`` for the
+    block: ``"none"`` opens one per request, ``"persistent"`` reuses it
+    for ``max_age`` seconds with health checks, ``"pool"`` borrows it
+    from the psycopg 3 pool. Settings are restored afterwards.
+    """
+    settings_dict = connection.settings_dict
+    saved = {
+        key: copy.deepcopy(settings_dict[key])
+        for key in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS", "OPTIONS")
+    }
+    options = {
+        key: value for key, value in saved["OPTIONS"].items()
+        if key != "pool"
+    }
+    if mode == "pool":
+        options["pool"] = saved["OPTIONS"].get("pool") or True
+    connections.close_all()
+    settings_dict.update(
+        CONN_MAX_AGE=max_age if mode == "persistent" else 0,
+        CONN_HEALTH_CHECKS=mode != "none",
+        OPTIONS=options,
+    )
+    try:
+        yield
+    finally:
+        connections.close_all()
+        if mode == "pool":
+            connection.close_pool()
+        settings_dict.update(saved)
+
+
+@contextmanager
+def asgi_server(application):
+    """
+    Serve ``application`` with uvicorn, as in production, from a thread
+    on a free local port and yield its base url.
+    """
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(
+        application, lifespan="on", log_level="warning"
+    ))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]})
+    thread.start()
+    try:
+        while not server.started:
+            if not thread.is_alive():
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.01)
+        host, port = sock.getsockname()
+        yield f"http://{host}:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+        sock.close()
+        # Request threads are gone; collecting closes the connections
+        # they kept.
+        gc.collect()
+
+
+def measure_throughput(url, requests, clients=1):
+    """
+    GET ``url`` ``requests`` times over ``clients`` concurrent HTTP
+    connections to the ASGI application served by uvicorn, and return
+    requests per second and database connections opened, by the pool if
+    there is one. Every request has its own ``?request=`` query string,
+    so response caches cannot answer it without the database.
+    """
+    opened = []
+
+    def count_connection(sender, connection, **kwargs):
+        opened.append(connection.alias)
+
+    async def send(base_url, count):
+        async with httpx.AsyncClient(
+            base_url=base_url, headers={"Host": server_name()}
+        ) as client:
+            for _ in range(count):
+                response = await client.get(
+                    url, params={"request": next(_request_numbers)}
+                )
+                if response.status_code != 200:
+                    raise AssertionError(
+                        f"{url}: expected 200, got {response.status_code}"
+                    )
+
+    async def send_all(base_url, shares):
+        await asyncio.gather(*(send(base_url, count) for count in shares))
+
+    shares = [
+        requests // clients + (index < requests % clients)
+        for index in range(clients)
+    ]
+    connections.close_all()
+    with asgi_server(application) as base_url:
+        # Warm up: open the pool, fill caches.
+        asyncio.run(send_all(base_url, [1] * clients))
+        connection_created.connect(count_connection)
+        try:
+            started = time.perf_counter()
+            asyncio.run(send_all(base_url, shares))
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count_connection)
+        if connection.settings_dict["OPTIONS"].get("pool"):
+            # connection_created also fires for connections taken from it.
+            opened = range(connection.pool.get_stats()["connections_num"])
+    return {
+        "requests_per_second": round(requests / elapsed, 1),
+        "mean_ms": round(elapsed / requests * clients * 1000, 2),
+        "connections": len(opened),
+    }
@@ -0,0 +1,163 @@
+import contextvars
+import re
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from threading import Lock
+
+# Upper bounds, in milliseconds, of the request time histogram buckets.
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+_current = contextvars.ContextVar("request_profile", default=None)
+
+_in_list = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_whitespace = re.compile(r"\s+")
+
+
+def query_signature(sql):
+    """
+    ``sql`` with ``IN (%s, %s, ...)`` lists of any length collapsed, so
+    the same statement run in a loop, an N+1, shares one signature.
+    """
+    return _whitespace.sub(" ", _in_list.sub("(%s...)", sql)).strip()
+
+
+class RequestProfile:
+    """Queries and timings of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.signatures = Counter()
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        self.signatures[query_signature(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """``{signature: count}`` of statements run more than once."""
+        return {
+            signature: count
+            for signature, count in self.signatures.items()
+            if count > 1
+        }
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    ``execute_wrapper`` installed on every connection, see
+    ``core.signals``. Only counts while a request is being profiled.
+    """
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - started)
+
+
+def start_profile():
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def stop_profile(token):
+    _current.reset(token)
+
+
+@contextmanager
+def resume_profile(profile):
+    """Profile queries into ``profile`` again for the block."""
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+class EndpointStats:
+    """
+    Per-endpoint aggregates of profiled requests, kept in memory for the
+    life of the worker process.
+    """
+
+    def __init__(self, top_duplicates=5):
+        self.top_duplicates = top_duplicates
+        self._endpoints = {}
+        self._lock = Lock()
+
+    def record(self, endpoint, profile, total):
+        total_ms = total * 1000
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {
+                    "requests": 0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "db_ms": 0.0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "buckets": [0] * len(BUCKETS),
+                    "duplicate_requests": 0,
+                    "duplicates": Counter(),
+                }
+            stats["requests"] += 1
+            stats["queries"] += profile.queries
+            stats["max_queries"] = max(stats["max_queries"], profile.queries)
+            stats["db_ms"] += profile.db_time * 1000
+            stats["total_ms"] += total_ms
+            stats["max_ms"] = max(stats["max_ms"], total_ms)
+            stats["buckets"][bisect_left(BUCKETS, total_ms)] += 1
+            duplicates = profile.duplicates
+            if duplicates:
+                stats["duplicate_requests"] += 1
+                stats["duplicates"].update(duplicates)
+
+    def snapshot(self):
+        """JSON-ready copy of every endpoint's aggregates."""
+        with self._lock:
+            endpoints = {
+                endpoint: {
+                    **stats,
+                    "buckets": list(stats["buckets"]),
+                    "duplicates": Counter(stats["duplicates"]),
+                }
+                for endpoint, stats in self._endpoints.items()
+            }
+        result = {}
+        for endpoint, stats in sorted(endpoints.items()):
+            requests = stats["requests"]
+            result[endpoint] = {
+                "requests": requests,
+                "avg_queries": round(stats["queries"] / requests, 2),
+                "max_queries": stats["max_queries"],
+                "avg_db_ms": round(stats["db_ms"] / requests, 2),
+                "avg_ms": round(stats["total_ms"] / requests, 2),
+                "max_ms": round(stats["max_ms"], 2),
+                "histogram_ms": {
+                    str(bound): count
+                    for bound, count in zip(BUCKETS, stats["buckets"])
+                },
+                "duplicate_requests": stats["duplicate_requests"],
+                "top_duplicates": [
+                    {"sql": signature, "count": count}
+                    for signature, count in stats["duplicates"].most_common(
+                        self.top_duplicates
+                    )
+                ],
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+endpoint_stats = EndpointStats()
@@ -0,0 +1,43 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+_shutdown = []
+
+
+def on_shutdown(callback):
+    """
+    Await ``callback()`` on the server's event loop when the ASGI server
+    stops, to close clients kept for that loop. Usable as a decorator.
+    """
+    _shutdown.append(callback)
+    return callback
+
+
+async def shutdown():
+    for callback in _shutdown:
+        try:
+            await callback()
+        except Exception:
+            logger.exception(f"Shutdown callback {callback.__name__} failed")
+
+
+def with_lifespan(application):
+    """
+    Wrap a Django ASGI ``application``, which rejects lifespan scopes, so
+    the server's shutdown runs the ``on_shutdown`` callbacks.
+    """
+
+    async def wrapper(scope, receive, send):
+        if scope["type"] != "lifespan":
+            return await application(scope, receive, send)
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    return wrapper
@@ -0,0 +1,78 @@
+import json
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from django.utils import timezone
+from books.models import Book
+from core.benchmarks import (
+    CONNECTION_MODES,
+    connection_mode,
+    measure_throughput,
+    pool_available,
+)
+from core.management.commands.bench_endpoints import current_commit
+
+
+class Command(BaseCommand):
+    help = (  # noqa: VNE003
+        "Measure requests/sec of the books list, served by uvicorn, with a "
+        "new database connection per request, persistent connections and "
+        "the psycopg pool. Reads the rows already in the database, e.g. "
+        "from seed_library."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument(
+            "--clients", type=int, default=1,
+            help="Concurrent HTTP connections to the server.",
+        )
+        parser.add_argument(
+            "--modes", nargs="+", choices=CONNECTION_MODES,
+            default=list(CONNECTION_MODES),
+        )
+        parser.add_argument(
+            "--max-age", type=int, default=60,
+            help="CONN_MAX_AGE of the persistent mode.",
+        )
+        parser.add_argument(
+            "--output", help="Write the results to this JSON file."
+        )
+
+    def handle(self, *args, **options):
+        if not Book.objects.exists():
+            self.stdout.write(self.style.WARNING(
+                "No books; run seed_library first for realistic numbers."
+            ))
+        url = reverse("books:book-list")
+        results = {}
+        for mode in options["modes"]:
+            if mode == "pool" and not pool_available():
+                self.stdout.write(self.style.WARNING(
+                    'Skipping pool: needs "psycopg[binary,pool]" installed.'
+                ))
+                continue
+            with connection_mode(mode, options["max_age"]):
+                results[mode] = measure_throughput(
+                    url, options["requests"], options["clients"]
+                )
+            metrics = results[mode]
+            self.stdout.write(
+                f"{mode}: {metrics['requests_per_second']} requests/s, "
+                f"{metrics['mean_ms']} ms per request, "
+                f"{metrics['connections']} connections"
+            )
+        if "none" in results:
+            baseline = results["none"]["requests_per_second"]
+            for mode, metrics in results.items():
+                if mode != "none":
+                    change = metrics["requests_per_second"] / baseline - 1
+                    self.stdout.write(f"{mode} vs none: {change:+.0%}")
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump({
+                    "commit": current_commit(),
+                    "created_at": timezone.now().isoformat(),
+                    "requests": options["requests"],
+                    "clients": options["clients"],
+                    "modes": results,
+                }, file, indent=2)
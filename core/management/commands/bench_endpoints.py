@@ -0,0 +1,100 @@
+import json
+import subprocess
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from core.benchmarks import compare_results, run_benchmarks
+from core.seeding import generate_library, scaled_volumes
+
+
+class Rollback(Exception):
+    pass
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (  # noqa: VNE003
+        "Seed realistic volumes, then record query count, p50/p95 latency "
+        "and peak allocation of every API endpoint as JSON. Everything "
+        "runs in a rolled back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale", type=float, default=1.0,
+            help="Multiplier for the default volumes, e.g. 0.01.",
+        )
+        for table in ("users", "books", "borrowings", "payments"):
+            parser.add_argument(f"--{table}", type=int)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument(
+            "--output", help="Write the results to this JSON file."
+        )
+        parser.add_argument(
+            "--compare", help="Print changes against an earlier output."
+        )
+
+    def handle(self, *args, **options):
+        volumes = scaled_volumes(
+            options["scale"],
+            **{
+                table: options[table]
+                for table in ("users", "books", "borrowings", "payments")
+            },
+        )
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                generate_library(volumes, seed=options["seed"])
+                seeded = time.perf_counter() - started
+                self.stdout.write(
+                    f"Seeded {volumes} in {seeded:.1f} s"
+                )
+                endpoints = run_benchmarks(options["iterations"])
+                raise Rollback
+        except Rollback:
+            pass
+
+        results = {
+            "commit": current_commit(),
+            "created_at": timezone.now().isoformat(),
+            "volumes": volumes,
+            "seed": options["seed"],
+            "iterations": options["iterations"],
+            "endpoints": endpoints,
+        }
+        for name, metrics in endpoints.items():
+            self.stdout.write(
+                f"{name}: {metrics['queries']} queries, "
+                f"p50 {metrics['p50_ms']} ms, p95 {metrics['p95_ms']} ms, "
+                f"peak {metrics['peak_kib']} KiB"
+            )
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(results, file, indent=2)
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                previous = json.load(file)
+            self.stdout.write(
+                f"Changes since {previous.get('commit') or 'previous run'}:"
+            )
+            for name, metric, old, new, change in compare_results(
+                previous["endpoints"], endpoints
+            ):
+                if old != new:
+                    self.stdout.write(
+                        f"  {name} {metric}: {old} -> {new} "
+                        f"({change:+.0%})"
+                    )
+        return None
@@ -0,0 +1,112 @@
+import datetime
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from books.models import Book
+from books.serializers import BookSerializer
+from borrowings.models import Borrowing
+from borrowings.serializers import BorrowingSerializer
+from payments.models import Payment
+from payments.serializers import PaymentSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (  # noqa: VNE003
+        "Compare ModelSerializer and fast_reader() output and timing on "
+        "generated rows. Everything runs in a rolled back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options["rows"])
+                for serializer_class, queryset in (
+                    (BookSerializer, Book.objects.all()),
+                    (
+                        BorrowingSerializer,
+                        Borrowing.objects.select_related("book", "user"),
+                    ),
+                    (
+                        PaymentSerializer,
+                        Payment.objects.select_related("borrowing"),
+                    ),
+                ):
+                    self.compare(
+                        serializer_class,
+                        queryset.order_by("id"),
+                        options["repeat"],
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, rows):
+        user = get_user_model().objects.create_user(
+            email="bench@library.local", password="bench-password"
+        )
+        books = Book.objects.bulk_create(
+            Book(
+                title=f"Book {i}",
+                author=f"Author {i % 100}",
+                cover=Book.CoverType.HARD,
+                inventory=i % 7,
+                daily_fee="1.50",
+            )
+            for i in range(rows)
+        )
+        borrowings = Borrowing.objects.bulk_create(
+            Borrowing(
+                user=user,
+                book=book,
+                expected_return_date=datetime.date(2025, 1, 20),
+            )
+            for book in books
+        )
+        Payment.objects.bulk_create(
+            Payment(
+                borrowing=borrowing,
+                type_field=Payment.TypeField.PAYMENT,
+                money_to_pay="4.50",
+            )
+            for borrowing in borrowings
+        )
+
+    def compare(self, serializer_class, queryset, repeat):
+        renderer = JSONRenderer()
+        reader = serializer_class.fast_reader()
+
+        def model_path():
+            return serializer_class(list(queryset), many=True).data
+
+        def fast_path():
+            return reader.to_representation(reader.values(queryset))
+
+        model_time, model_data = self.best_of(model_path, repeat)
+        fast_time, fast_data = self.best_of(fast_path, repeat)
+        identical = renderer.render(model_data) == renderer.render(fast_data)
+        self.stdout.write(
+            f"{serializer_class.__name__}: {len(model_data)} rows, "
+            f"ModelSerializer {model_time * 1000:.1f} ms, "
+            f"fast_reader {fast_time * 1000:.1f} ms, "
+            f"x{model_time / fast_time:.1f}, "
+            f"identical={identical}"
+        )
+
+    def best_of(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
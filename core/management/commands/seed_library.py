@@ -0,0 +1,61 @@
+import sys
+import time
+from django.core.management.base import BaseCommand
+from core.seeding import (
+    DEFAULT_VOLUMES,
+    generate_library,
+    load_records,
+    read_records,
+    scaled_volumes,
+)
+
+
+class Command(BaseCommand):
+    help = (  # noqa: VNE003
+        "Fill the database fast: generate users, books, borrowings and "
+        "payments in SQL, or stream a JSONL/JSON fixture in with COPY."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            help=(
+                "Import this file instead of generating rows: one object "
+                "per line as written by `dumpdata --format jsonl`, or a "
+                "JSON fixture. Use - for stdin."
+            ),
+        )
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--scale", type=float, default=1.0,
+            help="Multiplier for the default volumes, e.g. 0.01.",
+        )
+        for table, count in DEFAULT_VOLUMES.items():
+            parser.add_argument(
+                f"--{table}", type=int, help=f"Default {count} × scale."
+            )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options["file"]:
+            counts = self.load(options["file"], options["batch_size"])
+        else:
+            counts = generate_library(
+                scaled_volumes(
+                    options["scale"],
+                    **{table: options[table] for table in DEFAULT_VOLUMES},
+                ),
+                seed=options["seed"],
+            )
+        elapsed = time.perf_counter() - started
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(
+            self.style.SUCCESS(f"Seeded {summary} in {elapsed:.1f} s")
+        )
+
+    def load(self, path, batch_size):
+        if path == "-":
+            return load_records(read_records(sys.stdin), batch_size)
+        with open(path, encoding="utf-8") as file:
+            return load_records(read_records(file), batch_size)
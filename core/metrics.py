@@ -0,0 +1,380 @@
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from contextlib import contextmanager
+from threading import Lock
+from django.conf import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; the Prometheus client defaults.
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0,
+    7.5, 10.0, math.inf,
+)
+
+_header = struct.Struct("<q")
+_length = struct.Struct("<i")
+_value = struct.Struct("<d")
+
+
+def sample_key(name, labels):
+    return json.dumps([name, sorted(labels.items())])
+
+
+def read_entries(data):
+    """Yield ``(key, value, offset of value)`` from a ``FileValues`` file."""
+    if len(data) < _header.size:
+        return
+    used = _header.unpack_from(data, 0)[0]
+    position = _header.size
+    while position < used:
+        length = _length.unpack_from(data, position)[0]
+        start = position + _length.size
+        key = data[start:start + length].decode()
+        position += padded_size(length)
+        yield key, _value.unpack_from(data, position)[0], position
+        position += _value.size
+
+
+def padded_size(length):
+    """Key length prefix and key, padded so the value is 8-byte aligned."""
+    size = _length.size + length
+    return size + -size % 8
+
+
+class MemoryValues:
+    """Samples of this process, for a single-process server."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self):
+        with self._lock:
+            return dict(self._values)
+
+
+class FileValues:
+    """
+    Samples of this process in ``<directory>/<pid>.db``, memory-mapped so
+    an increment is a write to memory and every worker's ``/metrics``
+    can read all files at any time. The file is an 8-byte used length,
+    then one entry per sample: key length, UTF-8 key padded to 8 bytes,
+    float64 value. Entries are only appended, and the used length is
+    bumped after the entry is written, so readers need no lock.
+    """
+
+    initial_size = 64 * 1024
+
+    def __init__(self, directory):
+        self.pid = os.getpid()
+        self.directory = directory
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(os.path.join(directory, f"{self.pid}.db"), "a+b")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < self.initial_size:
+            self._file.truncate(self.initial_size)
+            size = self.initial_size
+        self._size = size
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._used = _header.unpack_from(self._map, 0)[0] or _header.size
+        self._positions = {
+            key: position for key, _, position in read_entries(self._map)
+        }
+
+    def inc(self, key, amount):
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._append(key)
+            value = _value.unpack_from(self._map, position)[0]
+            _value.pack_into(self._map, position, value + amount)
+
+    def _append(self, key):
+        encoded = key.encode()
+        size = padded_size(len(encoded))
+        while self._used + size + _value.size > self._size:
+            self._size *= 2
+            self._map.close()
+            self._file.truncate(self._size)
+            self._map = mmap.mmap(self._file.fileno(), self._size)
+        _length.pack_into(self._map, self._used, len(encoded))
+        start = self._used + _length.size
+        self._map[start:start + len(encoded)] = encoded
+        position = self._used + size
+        _value.pack_into(self._map, position, 0.0)
+        self._used = position + _value.size
+        _header.pack_into(self._map, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def collect(self):
+        """Sum of every process that wrote to the directory."""
+        values = {}
+        for path in glob.glob(os.path.join(self.directory, "*.db")):
+            with open(path, "rb") as file:
+                data = file.read()
+            for key, value, _ in read_entries(data):
+                values[key] = values.get(key, 0.0) + value
+        return values
+
+
+_values = None
+_values_lock = Lock()
+
+
+def current_values():
+    """
+    Sample storage of this process, from ``METRICS["DIR"]``. Recreated
+    after a fork, so preloading workers do not share the master's file.
+    """
+    global _values
+    pid = os.getpid()
+    if _values is None or _values.pid != pid:
+        with _values_lock:
+            if _values is None or _values.pid != pid:
+                directory = settings.METRICS["DIR"]
+                _values = (
+                    FileValues(directory) if directory else MemoryValues()
+                )
+    return _values
+
+
+class Metric:
+    # Prometheus ``# TYPE``.
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def check_labels(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} takes labels {self.labelnames}, "
+                f"got {tuple(labels)}"
+            )
+
+    def samples(self, values):
+        """``[(sample name, labels, value)]`` for the exposition."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        self.check_labels(labels)
+        current_values().inc(sample_key(self.name, labels), amount)
+
+    def samples(self, values):
+        return [
+            (name, dict(labels), value)
+            for name, labels, value in sorted(values)
+            if name == self.name
+        ]
+
+
+class Histogram(Metric):
+    """Buckets are stored cumulative, as they are exported."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        if self.buckets[-1] != math.inf:
+            self.buckets += (math.inf,)
+
+    def observe(self, value, **labels):
+        self.check_labels(labels)
+        values = current_values()
+        for bound in self.buckets:
+            if value <= bound:
+                bucket = {**labels, "le": bound_text(bound)}
+                values.inc(sample_key(f"{self.name}_bucket", bucket), 1)
+        values.inc(sample_key(f"{self.name}_sum", labels), value)
+        values.inc(sample_key(f"{self.name}_count", labels), 1)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self, values):
+        own = {
+            (name, labels): value
+            for name, labels, value in values
+            if name.startswith(self.name)
+        }
+        samples = []
+        for name, labels in sorted(own):
+            if name != f"{self.name}_count":
+                continue
+            # Buckets below the smallest observation were never written.
+            for bound in self.buckets:
+                bucket = labels + (("le", bound_text(bound)),)
+                samples.append((
+                    f"{self.name}_bucket",
+                    dict(bucket),
+                    own.get((f"{self.name}_bucket", tuple(sorted(bucket))), 0),
+                ))
+            samples.append(
+                (f"{self.name}_sum", dict(labels),
+                 own.get((f"{self.name}_sum", labels), 0))
+            )
+            samples.append((name, dict(labels), own[(name, labels)]))
+        return samples
+
+
+class Outcome:
+    value = None
+
+
+@contextmanager
+def track(counter, histogram):
+    """
+    Count and time the block by ``outcome`` label: what the block assigns
+    to ``outcome.value``, ``"ok"`` if nothing, or ``"error"`` if it
+    raises before assigning.
+    """
+    outcome = Outcome()
+    started = time.perf_counter()
+    try:
+        yield outcome
+    except BaseException:
+        outcome.value = outcome.value or "error"
+        raise
+    finally:
+        value = outcome.value or "ok"
+        counter.inc(outcome=value)
+        histogram.observe(time.perf_counter() - started, outcome=value)
+
+
+def bound_text(bound):
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+
+def value_text(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+def label_text(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{name}="{escape(str(value))}"'
+        for name, value in sorted(labels.items())
+    )
+    return f"{{{pairs}}}"
+
+
+def escape(value):
+    return (
+        value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    )
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+
+    def exposition(self):
+        """
+        Every metric in the Prometheus text format 0.0.4, summed over the
+        processes sharing ``METRICS["DIR"]``.
+        """
+        values = [
+            (name, tuple(tuple(pair) for pair in labels), value)
+            for (name, labels), value in (
+                (json.loads(key), value)
+                for key, value in current_values().collect().items()
+            )
+        ]
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {escape(metric.documentation)}")
+            lines.append(f"# TYPE {name} {metric.metric_type}")
+            for sample, labels, value in metric.samples(values):
+                lines.append(
+                    f"{sample}{label_text(labels)} {value_text(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+BORROWS = Counter(
+    "library_borrows_total",
+    "Borrow attempts by outcome; unavailable means the book ran out.",
+    ["outcome"],
+)
+BORROW_SECONDS = Histogram(
+    "library_borrow_seconds",
+    "Time to borrow a book, including the inventory row lock.",
+    ["outcome"],
+)
+RETURNS = Counter(
+    "library_returns_total", "Return attempts by outcome.", ["outcome"]
+)
+RETURN_SECONDS = Histogram(
+    "library_return_seconds", "Time to return a borrowing.", ["outcome"]
+)
+CHECKOUTS = Counter(
+    "library_checkouts_total",
+    "Stripe checkout requests by outcome.",
+    ["outcome"],
+)
+CHECKOUT_SECONDS = Histogram(
+    "library_checkout_seconds",
+    "Time to answer a Stripe checkout request.",
+    ["outcome"],
+)
+STRIPE_REQUESTS = Counter(
+    "library_stripe_requests_total",
+    "Checkout sessions requested from Stripe; reused ones are not.",
+    ["outcome"],
+)
+STRIPE_REQUEST_SECONDS = Histogram(
+    "library_stripe_request_seconds",
+    "Latency of Stripe checkout session requests.",
+    ["outcome"],
+)
+TELEGRAM_MESSAGES = Counter(
+    "library_telegram_messages_total",
+    "Telegram messages by outcome; coalesced ones count once each.",
+    ["outcome"],
+)
+TELEGRAM_RETRIES = Counter(
+    "library_telegram_retries_total", "Retried Telegram deliveries."
+)
+TELEGRAM_DELIVERY_SECONDS = Histogram(
+    "library_telegram_delivery_seconds",
+    "Time from queueing a Telegram message until it is sent or given up.",
+    ["outcome"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
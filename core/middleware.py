@@ -0,0 +1,129 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from core.instrumentation import (
+    endpoint_stats,
+    resume_profile,
+    start_profile,
+    stop_profile,
+)
+
+# Views reporting the aggregates, which would otherwise count themselves.
+UNRECORDED = {"instrumentation"}
+
+
+def endpoint_name(request):
+    """
+    ``"GET api/borrowings/<int:pk>/"``. Unresolved paths share one name
+    so scanners cannot grow the aggregates without bound.
+    """
+    match = getattr(request, "resolver_match", None)
+    route = match.route if match is not None else "<unmatched>"
+    return f"{request.method} {route}"
+
+
+class InstrumentationMiddleware:
+    """
+    Count queries, database time and repeated statements per request,
+    add them as a ``Server-Timing`` header and aggregate them per
+    endpoint in ``core.instrumentation.endpoint_stats``.
+
+    Place it first in ``MIDDLEWARE`` so ``total`` covers the whole
+    stack. Works for sync and async views; queries run through
+    ``sync_to_async`` still count, as the profile lives in a context
+    variable. Streaming responses are recorded once their body has been
+    sent, as it runs its queries; their ``Server-Timing`` header leaves
+    before the body and covers the time to the first byte only.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = settings.INSTRUMENTATION["ENABLED"]
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        profile, token = start_profile()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_profile(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        profile, token = start_profile()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_profile(token)
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        if not response.streaming:
+            self.record(request, profile)
+        elif response.is_async:
+            response.streaming_content = self.astream(
+                request, response.streaming_content, profile
+            )
+        else:
+            response.streaming_content = self.stream(
+                request, response.streaming_content, profile
+            )
+        if settings.INSTRUMENTATION["SERVER_TIMING"]:
+            total = time.perf_counter() - profile.started
+            db_ms = profile.db_time * 1000
+            total_ms = total * 1000
+            timings = [
+                f'db;dur={db_ms:.1f};desc="{profile.queries} queries"',
+                f"app;dur={total_ms - db_ms:.1f}",
+                f"total;dur={total_ms:.1f}",
+            ]
+            duplicates = sum(
+                count - 1 for count in profile.duplicates.values()
+            )
+            if duplicates:
+                timings.append(f'dup;desc="{duplicates} repeated queries"')
+            response["Server-Timing"] = ", ".join(timings)
+        return response
+
+    def record(self, request, profile):
+        total = time.perf_counter() - profile.started
+        match = getattr(request, "resolver_match", None)
+        if match is None or match.url_name not in UNRECORDED:
+            endpoint_stats.record(endpoint_name(request), profile, total)
+
+    def stream(self, request, content, profile):
+        """Iterate ``content`` under ``profile``, then record the request."""
+        try:
+            content = iter(content)
+            while True:
+                with resume_profile(profile):
+                    chunk = next(content, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self.record(request, profile)
+
+    async def astream(self, request, content, profile):
+        """``stream`` for async ``streaming_content``."""
+        try:
+            content = aiter(content)
+            while True:
+                with resume_profile(profile):
+                    chunk = await anext(content, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self.record(request, profile)
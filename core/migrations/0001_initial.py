@@ -0,0 +1,24 @@
+# Generated by Django 5.2.2 on 2026-10-17 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="ResourceVersion",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("version", models.PositiveBigIntegerField(default=1)),
+                ("modified_at", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,134 @@
+import hashlib
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.response import Response
+from core.renderers import StreamingJSONRenderer
+from core.versions import get_versions
+
+
+class ConditionalGetMixin:
+    """
+    Serve ``If-None-Match`` / ``If-Modified-Since`` from version counters.
+
+    The validators are derived from ``get_version_keys()``, so a matching
+    request is answered with 304 before the queryset or serializer runs.
+    Views that override ``list``/``retrieve`` themselves should call
+    ``get_not_modified_response`` first.
+    """
+
+    version_keys = ()
+
+    def get_version_keys(self):
+        return self.version_keys
+
+    def get_validators(self):
+        if not hasattr(self, "_validators"):
+            self.set_versions(*get_versions(self.get_version_keys()))
+        return self._validators
+
+    def set_versions(self, versions, last_modified):
+        """
+        Derive the validators from ``versions`` read earlier, e.g. stored
+        with a cached response, so the ETag always describes the body.
+        """
+        self.versions = (versions, last_modified)
+        fingerprint = repr((
+            self.request.get_full_path(),
+            self.request.accepted_renderer.format,
+            sorted(versions.items()),
+        ))
+        etag = hashlib.sha1(fingerprint.encode()).hexdigest()
+        self._validators = (f'"{etag}"', last_modified)
+
+    def get_not_modified_response(self, request):
+        etag, last_modified = self.get_validators()
+        return get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=(
+                int(last_modified.timestamp()) if last_modified else None
+            ),
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if hasattr(self, "_validators") and response.status_code in (
+            200, 304
+        ):
+            etag, last_modified = self._validators
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(
+                    last_modified.timestamp()
+                )
+            patch_vary_headers(response, ("Authorization", "Cookie"))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        not_modified = self.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        return super().retrieve(request, *args, **kwargs)
+
+
+class FastListMixin:
+    """
+    Render ``list`` through the serializer's ``fast_reader()``, building
+    the output from ``values()`` rows instead of model instances.
+
+    With ``StreamingJSONRenderer`` negotiated, staff get the whole
+    unpaginated list streamed from a server-side cursor. Under ASGI the
+    stream is asynchronous, as Django would otherwise read a synchronous
+    one into memory before sending it.
+    """
+
+    stream_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        reader = self.get_serializer_class().fast_reader()
+        queryset = reader.values(self.filter_queryset(self.get_queryset()))
+        if isinstance(request.accepted_renderer, StreamingJSONRenderer):
+            return self.stream_list(request, reader, queryset)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                reader.to_representation(page)
+            )
+        return Response(reader.to_representation(queryset))
+
+    def stream_list(self, request, reader, queryset):
+        if not request.user.is_staff:
+            raise PermissionDenied("Streaming exports are for staff only.")
+        if self.paginator is not None and not queryset.ordered:
+            queryset = queryset.order_by(*self.paginator.ordering)
+        renderer = request.accepted_renderer
+        if isinstance(request._request, ASGIRequest):
+            rows = abuild(
+                reader, queryset.aiterator(chunk_size=self.stream_chunk_size)
+            )
+            content = renderer.astream(rows)
+        else:
+            rows = map(
+                reader.build,
+                queryset.iterator(chunk_size=self.stream_chunk_size),
+            )
+            content = renderer.stream(rows)
+        return StreamingHttpResponse(
+            content, content_type=renderer.media_type
+        )
+
+
+async def abuild(reader, rows):
+    async for row in rows:
+        yield reader.build(row)
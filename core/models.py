@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class ResourceVersion(models.Model):
+    """
+    Monotonic change counter for a collection of API resources, e.g.
+    ``books`` or ``borrowings:user:42``. Used to build HTTP validators
+    without evaluating the collection itself.
+    """
+
+    key = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=1)
+    modified_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
@@ -0,0 +1,67 @@
+import json
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps(data):
+    """
+    Encode ``data`` as compact UTF-8 JSON, with ``orjson`` when installed.
+    ``data`` must only hold JSON-native values, as produced by
+    ``FastReader``.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return _encoder.encode(data).encode()
+
+
+class StreamingJSONRenderer(BaseRenderer):
+    """
+    Selected with ``?format=json-stream``. List views that support it
+    stream a bare JSON array through ``stream()``; anything else, e.g.
+    an error body, is rendered in one piece.
+    """
+
+    media_type = "application/json"
+    format = "json-stream"  # noqa: VNE003
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return dumps(data)
+
+    def stream(self, rows, batch_size=500):
+        """Yield ``rows`` as a JSON array, ``batch_size`` rows per chunk."""
+        yield b"["
+        batch = []
+        separator = b""
+        for row in rows:
+            batch.append(dumps(row))
+            if len(batch) >= batch_size:
+                yield separator + b",".join(batch)
+                separator = b","
+                batch = []
+        if batch:
+            yield separator + b",".join(batch)
+        yield b"]"
+
+    async def astream(self, rows, batch_size=500):
+        """``stream`` for an async iterable of ``rows``."""
+        yield b"["
+        batch = []
+        separator = b""
+        async for row in rows:
+            batch.append(dumps(row))
+            if len(batch) >= batch_size:
+                yield separator + b",".join(batch)
+                separator = b","
+                batch = []
+        if batch:
+            yield separator + b",".join(batch)
+        yield b"]"
@@ -0,0 +1,303 @@
+import io
+import json
+from collections import Counter
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from books.models import Book
+from borrowings.models import Borrowing
+from borrowings.stats import refresh_borrowing_stats
+from core.versions import bump_all_versions
+from payments.models import Payment
+
+# Rows per table for a realistic load-test database.
+DEFAULT_VOLUMES = {
+    "users": 20_000,
+    "books": 100_000,
+    "borrowings": 1_000_000,
+    "payments": 200_000,
+}
+
+
+def scaled_volumes(scale=1.0, **overrides):
+    """``DEFAULT_VOLUMES`` times ``scale``, at least one row each."""
+    volumes = {
+        table: max(1, int(count * scale))
+        for table, count in DEFAULT_VOLUMES.items()
+    }
+    volumes.update(
+        (table, count) for table, count in overrides.items()
+        if count is not None
+    )
+    return volumes
+
+
+def generate_library(volumes, seed=0):
+    """
+    Insert ``volumes`` of users, books, borrowings and payments with
+    ``generate_series``, so no row passes through Python. ``seed`` makes
+    the random choices repeatable.
+
+    Borrowings span the last two years; most are returned, the rest are
+    active or overdue. Payments pick random borrowings. Emails continue
+    from the highest user id, so repeated runs do not collide.
+    """
+    tables = {
+        "user": get_user_model()._meta.db_table,
+        "book": Book._meta.db_table,
+        "borrowing": Borrowing._meta.db_table,
+        "payment": Payment._meta.db_table,
+    }
+    params = {
+        **volumes,
+        "seed": (seed % 2_000_001) / 1_000_000 - 1,
+        "pending": Payment.Status.PENDING,
+        "paid": Payment.Status.PAID,
+        "rental": Payment.TypeField.PAYMENT,
+        "fine": Payment.TypeField.FINE,
+    }
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT setseed(%(seed)s)", params)
+        for name in ("user", "book", "borrowing"):
+            cursor.execute(f"DROP TABLE IF EXISTS seed_{name}")
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE seed_{name} "
+                "(n serial PRIMARY KEY, id bigint) ON COMMIT DROP"
+            )
+        cursor.execute(
+            f"""
+            WITH inserted AS (
+                INSERT INTO {tables["user"]} (
+                    password, is_superuser, first_name, last_name,
+                    is_staff, is_active, date_joined, email
+                )
+                SELECT
+                    '!', false, '', '', false, true, now(),
+                    'reader' || (existing.last + n) || '@seed.library.local'
+                FROM generate_series(1, %(users)s) AS n,
+                    (
+                        SELECT COALESCE(MAX(id), 0) AS last
+                        FROM {tables["user"]}
+                    ) AS existing
+                RETURNING id
+            )
+            INSERT INTO seed_user (id) SELECT id FROM inserted ORDER BY id
+            """,
+            params,
+        )
+        cursor.execute(
+            f"""
+            WITH inserted AS (
+                INSERT INTO {tables["book"]}
+                    (title, author, cover, inventory, daily_fee)
+                SELECT
+                    'Book ' || n,
+                    'Author ' || (n %% 5000),
+                    CASE WHEN random() < 0.6 THEN 'HARD' ELSE 'SOFT' END,
+                    floor(random() * 30)::int,
+                    round((0.5 + random() * 4.5)::numeric, 2)
+                FROM generate_series(1, %(books)s) AS n
+                RETURNING id
+            )
+            INSERT INTO seed_book (id) SELECT id FROM inserted ORDER BY id
+            """,
+            params,
+        )
+        cursor.execute(
+            f"""
+            WITH picked AS (
+                SELECT
+                    1 + floor(random() * %(users)s)::int AS user_n,
+                    1 + floor(random() * %(books)s)::int AS book_n,
+                    current_date - floor(random() * 730)::int AS borrowed,
+                    7 + floor(random() * 24)::int AS planned,
+                    floor(random() * 40)::int AS kept,
+                    random() < 0.8 AS returned
+                FROM generate_series(1, %(borrowings)s)
+            ), inserted AS (
+                INSERT INTO {tables["borrowing"]} (
+                    borrow_date, expected_return_date, actual_return_date,
+                    book_id, user_id
+                )
+                SELECT
+                    borrowed,
+                    borrowed + planned,
+                    CASE WHEN returned
+                        THEN least(borrowed + kept, current_date)
+                    END,
+                    b.id,
+                    u.id
+                FROM picked
+                JOIN seed_user AS u ON u.n = picked.user_n
+                JOIN seed_book AS b ON b.n = picked.book_n
+                RETURNING id
+            )
+            INSERT INTO seed_borrowing (id)
+            SELECT id FROM inserted ORDER BY id
+            """,
+            params,
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {tables["payment"]}
+                (status, type_field, borrowing_id, money_to_pay)
+            SELECT
+                CASE WHEN random() < 0.7
+                    THEN %(paid)s ELSE %(pending)s END,
+                CASE WHEN random() < 0.85
+                    THEN %(rental)s ELSE %(fine)s END,
+                b.id,
+                round((1 + random() * 60)::numeric, 2)
+            FROM (
+                SELECT 1 + floor(random() * %(borrowings)s)::int AS n
+                FROM generate_series(1, %(payments)s)
+            ) AS picked
+            JOIN seed_borrowing AS b ON b.n = picked.n
+            """,
+            params,
+        )
+        cursor.execute("SELECT id FROM seed_user")
+        refresh_borrowing_stats(row[0] for row in cursor.fetchall())
+        bump_all_versions("books", "borrowings", "payments")
+    return volumes
+
+
+def read_records(stream):
+    """
+    Yield serialized objects from ``stream``: one JSON object per line
+    (``dumpdata --format jsonl``) or, if it starts with ``[``, a regular
+    JSON fixture such as ``fixture.json``.
+    """
+    first = stream.read(1)
+    while first.isspace():
+        first = stream.read(1)
+    if first == "[":
+        yield from json.loads(first + stream.read())
+        return
+    pending = first
+    for line in stream:
+        line = pending + line
+        pending = ""
+        if line.strip():
+            yield json.loads(line)
+
+
+def copy_value(field, value):
+    """``value`` in Postgres ``COPY ... FORMAT text`` notation."""
+    if value is None:
+        return "\\N"
+    if isinstance(field, models.JSONField):
+        value = json.dumps(value, cls=field.encoder)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class CopyLoader:
+    """
+    Buffer deserialized objects per model and table layout, and write
+    each buffer with one ``COPY``. Objects keep their primary key when
+    the record has one.
+    """
+
+    def __init__(self, cursor, batch_size):
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.buffers = {}
+        self.counts = Counter()
+
+    def add(self, obj):
+        fields = [
+            field for field in obj._meta.concrete_fields
+            if not (field.primary_key and obj.pk is None)
+        ]
+        key = (type(obj), tuple(fields))
+        rows = self.buffers.setdefault(key, [])
+        rows.append("\t".join(
+            copy_value(field, self.value(obj, field)) for field in fields
+        ))
+        if len(rows) >= self.batch_size:
+            self.flush(key)
+
+    @staticmethod
+    def value(obj, field):
+        value = getattr(obj, field.attname)
+        if value is None and (
+            getattr(field, "auto_now", False)
+            or getattr(field, "auto_now_add", False)
+        ):
+            value = field.pre_save(obj, add=True)
+        return value
+
+    def flush(self, key):
+        model, fields = key
+        rows = self.buffers.pop(key, [])
+        if not rows:
+            return
+        columns = ", ".join(
+            connection.ops.quote_name(field.column) for field in fields
+        )
+        self.copy(
+            f"COPY {connection.ops.quote_name(model._meta.db_table)} "
+            f"({columns}) FROM STDIN",
+            "\n".join(rows) + "\n",
+        )
+        self.counts[model._meta.label] += len(rows)
+
+    def copy(self, sql, data):
+        if hasattr(self.cursor, "copy_expert"):  # psycopg2
+            self.cursor.copy_expert(sql, io.StringIO(data))
+        else:  # psycopg 3, e.g. with the connection pool
+            with self.cursor.copy(sql) as copy:
+                copy.write(data)
+
+    def close(self):
+        for key in list(self.buffers):
+            self.flush(key)
+
+
+def load_records(records, batch_size=10_000):
+    """
+    Import serialized ``records`` with ``COPY`` in batches of
+    ``batch_size`` rows per model, in one transaction. Foreign keys are
+    checked at commit, so records may come in any order. Returns
+    ``{model label: rows}``.
+    """
+    loaded = set()
+    m2m = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        loader = CopyLoader(cursor, batch_size)
+        for deserialized in serializers.deserialize(
+            "python", records, ignorenonexistent=True
+        ):
+            obj = deserialized.object
+            loader.add(obj)
+            loaded.add(type(obj))
+            for name, ids in (deserialized.m2m_data or {}).items():
+                field = obj._meta.get_field(name)
+                through = field.remote_field.through
+                m2m.extend(
+                    through(**{
+                        f"{field.m2m_field_name()}_id": obj.pk,
+                        f"{field.m2m_reverse_field_name()}_id": related_id,
+                    })
+                    for related_id in ids
+                )
+        loader.close()
+        for through in {type(row) for row in m2m}:
+            through.objects.bulk_create(
+                [row for row in m2m if type(row) is through],
+                batch_size=batch_size,
+            )
+        for sql in connection.ops.sequence_reset_sql(no_style(), loaded):
+            cursor.execute(sql)
+        if loaded & {Borrowing, Payment, get_user_model()}:
+            refresh_borrowing_stats()
+        bump_all_versions("books", "borrowings", "payments")
+    return dict(loader.counts)
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+
+class FakeHTTPServer:
+    """
+    Minimal HTTP/1.1 server on asyncio streams for stubbing external APIs
+    in tests and benchmarks.
+
+    Subclasses implement ``respond(method, path, headers, body)`` and
+    return ``(status_line, json_payload)``. ``latency`` delays every
+    answer to imitate a remote round trip.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self.server = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self._handle, "127.0.0.1", 0
+        )
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def respond(self, method, path, headers, body):
+        raise NotImplementedError
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(
+                    int(headers.get("content-length", 0))
+                )
+                self.calls += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, payload = await self.respond(
+                    method, path, headers, body
+                )
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted ``values``."""
+    index = max(0, min(len(values) - 1, round(fraction * len(values)) - 1))
+    return values[index]
@@ -0,0 +1,330 @@
+import json
+import os
+import re
+import tempfile
+from io import StringIO
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from books.models import Book
+from books.serializers import BookSerializer
+from borrowings.models import Borrowing, UserBorrowingStats
+from borrowings.serializers import BorrowingSerializer
+from borrowings.tests import sample_borrowing
+from core.benchmarks import connection_mode, measure_throughput
+from core.instrumentation import endpoint_stats, query_signature
+from core.metrics import FileValues, sample_key
+from core.seeding import generate_library, load_records, read_records
+from payments.models import Payment
+from payments.serializers import PaymentSerializer
+from payments.tests import sample_payment
+
+
+class FastReaderTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        self.borrowing = sample_borrowing(user=user)
+        sample_borrowing(user=user, actual_return_date="2025-01-15")
+        sample_payment(borrowing=self.borrowing, session_url=None)
+        sample_payment(borrowing=self.borrowing, money_to_pay="12.5")
+
+    def assertSameJson(self, serializer_class, queryset):
+        renderer = JSONRenderer()
+        reader = serializer_class.fast_reader()
+        self.assertEqual(
+            renderer.render(
+                reader.to_representation(reader.values(queryset))
+            ),
+            renderer.render(serializer_class(queryset, many=True).data),
+        )
+
+    def test_book_output_identical(self):
+        self.assertSameJson(BookSerializer, Book.objects.order_by("id"))
+
+    def test_borrowing_output_identical(self):
+        self.assertSameJson(
+            BorrowingSerializer, Borrowing.objects.order_by("id")
+        )
+
+    def test_payment_output_identical(self):
+        self.assertSameJson(PaymentSerializer, Payment.objects.order_by("id"))
+
+    def test_nested_book_read_in_one_query(self):
+        reader = BorrowingSerializer.fast_reader()
+        with self.assertNumQueries(1):
+            reader.to_representation(reader.values(Borrowing.objects.all()))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("bench_serializers", rows=20, repeat=1, stdout=out)
+        self.assertEqual(out.getvalue().count("identical=True"), 3)
+        self.assertFalse(Book.objects.filter(title="Book 0").exists())
+
+
+class EndpointBenchmarkTests(TestCase):
+    volumes = {"users": 5, "books": 10, "borrowings": 60, "payments": 20}
+
+    def test_generate_library(self):
+        generate_library(self.volumes, seed=1)
+        self.assertEqual(Book.objects.count(), 10)
+        self.assertEqual(Borrowing.objects.count(), 60)
+        self.assertEqual(Payment.objects.count(), 20)
+        self.assertEqual(
+            UserBorrowingStats.objects.aggregate(
+                total=Sum("total_borrowings")
+            )["total"],
+            60,
+        )
+
+    def test_benchmark_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+            call_command(
+                "bench_endpoints", iterations=2, output=output,
+                stdout=StringIO(), **self.volumes,
+            )
+            out = StringIO()
+            call_command(
+                "bench_endpoints", iterations=2, compare=output,
+                stdout=out, **self.volumes,
+            )
+            with open(output) as file:
+                results = json.load(file)
+        self.assertEqual(results["volumes"], self.volumes)
+        self.assertIn("borrowings-return", results["endpoints"])
+        for name, metrics in results["endpoints"].items():
+            if name.endswith("-cached"):
+                # Answered from the catalogue cache after the warm-up.
+                self.assertEqual(metrics["queries"], 0)
+            else:
+                self.assertGreater(metrics["queries"], 0)
+            self.assertLessEqual(metrics["p50_ms"], metrics["p95_ms"])
+        self.assertIn("Changes since", out.getvalue())
+        self.assertFalse(Borrowing.objects.exists())
+
+
+class SeedLibraryTests(TestCase):
+    def test_load_json_fixture(self):
+        out = StringIO()
+        call_command(
+            "seed_library",
+            file=str(settings.BASE_DIR / "fixture.json"),
+            stdout=out,
+        )
+        self.assertIn("7 borrowings.Borrowing", out.getvalue())
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertEqual(Book.objects.count(), 6)
+        self.assertEqual(Payment.objects.count(), 1)
+        # Sequences continue after the imported primary keys.
+        book = Book.objects.create(
+            title="New", author="Author", cover="HARD",
+            inventory=1, daily_fee=1,
+        )
+        self.assertGreater(
+            book.pk,
+            Book.objects.exclude(pk=book.pk).order_by("-pk")[0].pk,
+        )
+
+    def test_stream_jsonl_without_primary_keys(self):
+        lines = [
+            {
+                "model": "books.book",
+                "fields": {
+                    "title": "Tabs\tand\nnew lines \\ kept",
+                    "author": "Author",
+                    "cover": "SOFT",
+                    "inventory": 3,
+                    "daily_fee": "2.50",
+                },
+            }
+            for _ in range(5)
+        ]
+        stream = StringIO("\n".join(json.dumps(line) for line in lines))
+        counts = load_records(read_records(stream), batch_size=2)
+        self.assertEqual(counts, {"books.Book": 5})
+        self.assertEqual(
+            set(Book.objects.values_list("title", flat=True)),
+            {"Tabs\tand\nnew lines \\ kept"},
+        )
+
+    def test_generate(self):
+        out = StringIO()
+        call_command(
+            "seed_library", users=3, books=4, borrowings=10, payments=2,
+            seed=7, stdout=out,
+        )
+        self.assertEqual(Borrowing.objects.count(), 10)
+        self.assertIn("10 borrowings", out.getvalue())
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        endpoint_stats.reset()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        Book.objects.create(
+            title="Book", author="Author", cover="HARD",
+            inventory=1, daily_fee=1,
+        )
+
+    @override_settings(INSTRUMENTATION={"ENABLED": True, "SERVER_TIMING": True})
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("books:book-list"))
+        timing = response["Server-Timing"]
+        self.assertIn("db;dur=", timing)
+        self.assertIn("total;dur=", timing)
+        self.assertRegex(timing, r'desc="\d+ queries"')
+
+    def test_server_timing_off_by_default(self):
+        response = self.client.get(reverse("books:book-list"))
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    def test_query_signature_collapses_in_lists(self):
+        self.assertEqual(
+            query_signature('SELECT * FROM "t" WHERE id IN (%s, %s)'),
+            query_signature('SELECT * FROM "t"  WHERE id IN (%s,%s,%s)'),
+        )
+
+    def test_aggregates_per_endpoint(self):
+        for _ in range(3):
+            self.client.get(reverse("books:book-list"))
+        [(endpoint, stats)] = endpoint_stats.snapshot().items()
+        self.assertTrue(endpoint.startswith("GET api/books/"))
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(sum(stats["histogram_ms"].values()), 3)
+
+    @override_settings(INSTRUMENTATION={"ENABLED": True, "SERVER_TIMING": True})
+    def test_streaming_response_recorded_after_body(self):
+        self.user.is_staff = True
+        self.user.save()
+        sample_borrowing(user=self.user)
+        response = self.client.get(
+            reverse("borrowings:borrowings-list-create"),
+            {"format": "json-stream"},
+        )
+        self.assertEqual(endpoint_stats.snapshot(), {})
+        before_body = int(
+            re.search(r'"(\d+) queries"', response["Server-Timing"])[1]
+        )
+        b"".join(response.streaming_content)
+        [stats] = endpoint_stats.snapshot().values()
+        self.assertGreater(stats["max_queries"], before_body)
+
+    async def test_async_streaming_response_recorded_after_body(self):
+        self.user.is_staff = True
+        await self.user.asave()
+        await sync_to_async(sample_borrowing)(user=self.user)
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(
+            reverse("borrowings:borrowings-list-create"),
+            {"format": "json-stream"},
+        )
+        self.assertTrue(response.is_async)
+        self.assertEqual(endpoint_stats.snapshot(), {})
+        [part async for part in response.streaming_content]
+        [stats] = endpoint_stats.snapshot().values()
+        self.assertGreater(stats["max_queries"], 0)
+
+    def test_stats_view_staff_only(self):
+        url = reverse("instrumentation")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(reverse("books:book-list"))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any(
+            endpoint.startswith("GET api/books/")
+            for endpoint in response.data["endpoints"]
+        ))
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(endpoint_stats.snapshot(), {})
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="staff@test.test", password="testpassword", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_files_of_all_processes_are_summed(self):
+        key = sample_key("library_borrows_total", {"outcome": "ok"})
+        with tempfile.TemporaryDirectory() as directory:
+            FileValues(directory).inc(key, 2)
+            os.rename(
+                os.path.join(directory, f"{os.getpid()}.db"),
+                os.path.join(directory, "exited-worker.db"),
+            )
+            values = FileValues(directory)
+            for index in range(2000):
+                values.inc(sample_key("test", {"n": str(index)}), 1)
+            values.inc(key, 3)
+            collected = values.collect()
+        self.assertEqual(collected[key], 5)
+        self.assertEqual(collected[sample_key("test", {"n": "1999"})], 1)
+
+    def test_exposition(self):
+        self.client.post(
+            reverse("borrowings:return-borrowing", args=[999999]), {}
+        )
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn("# TYPE library_returns_total counter", body)
+        self.assertIn('library_returns_total{outcome="not_found"}', body)
+        self.assertIn(
+            'library_return_seconds_bucket{le="+Inf",outcome="not_found"}',
+            body,
+        )
+
+    @override_settings(METRICS={"DIR": None, "TOKEN": "scrape-token"})
+    def test_token(self):
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        response = self.client.get(
+            url, HTTP_AUTHORIZATION="Bearer scrape-token"
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class ConnectionBenchmarkTests(TransactionTestCase):
+    def setUp(self):
+        Book.objects.create(
+            title="Book", author="Author", cover="HARD",
+            inventory=1, daily_fee=1,
+        )
+
+    def test_persistent_connections_not_reused_under_asgi(self):
+        url = reverse("books:book-list")
+        with connection_mode("none"):
+            fresh = measure_throughput(url, 6, clients=2)
+        with connection_mode("persistent"):
+            kept = measure_throughput(url, 6, clients=2)
+        self.assertEqual(fresh["connections"], 6)
+        # Every request runs in a new thread with a new connection.
+        self.assertEqual(kept["connections"], 6)
+
+    def test_command(self):
+        out = StringIO()
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            call_command(
+                "bench_connections", requests=4,
+                modes=["none", "persistent"], output=output.name, stdout=out,
+            )
+            results = json.load(output)
+        self.assertEqual(set(results["modes"]), {"none", "persistent"})
+        self.assertIn("persistent vs none", out.getvalue())
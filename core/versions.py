@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from core.models import ResourceVersion
+
+
+def get_versions(keys):
+    """
+    Return ``({key: version}, last_modified)`` for ``keys`` in one query.
+    Keys that were never bumped have version 0.
+    """
+    versions = dict.fromkeys(keys, 0)
+    last_modified = None
+    for key, version, modified_at in ResourceVersion.objects.filter(
+        key__in=keys
+    ).values_list("key", "version", "modified_at"):
+        versions[key] = version
+        if last_modified is None or modified_at > last_modified:
+            last_modified = modified_at
+    return versions, last_modified
+
+
+def bump_versions(*keys):
+    """
+    Increment ``keys`` once the surrounding transaction commits.
+
+    Bumping after commit keeps the counter rows out of the writer's
+    transaction, so they never become a lock hot spot, and guarantees a
+    reader never sees a new version paired with old data.
+    """
+    transaction.on_commit(lambda: _apply(keys))
+
+
+def _apply(keys):
+    now = timezone.now()
+    updated = ResourceVersion.objects.filter(key__in=keys).update(
+        version=F("version") + 1, modified_at=now
+    )
+    if updated < len(set(keys)):
+        ResourceVersion.objects.bulk_create(
+            [ResourceVersion(key=key, modified_at=now) for key in set(keys)],
+            ignore_conflicts=True,
+        )
+
+
+def bump_all_versions(*names):
+    """
+    Increment ``names`` and every ``name:...`` key under them, e.g. each
+    per-user key, once the transaction commits. For bulk loads that do
+    not know which users they touched.
+    """
+    transaction.on_commit(lambda: _apply_all(names))
+
+
+def _apply_all(names):
+    query = Q()
+    for name in names:
+        query |= Q(key__startswith=f"{name}:")
+    ResourceVersion.objects.filter(query).update(
+        version=F("version") + 1, modified_at=timezone.now()
+    )
+    _apply(names)
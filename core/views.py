@@ -0,0 +1,41 @@
+import os
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from core.instrumentation import endpoint_stats
+from core.metrics import CONTENT_TYPE, registry
+
+
+class InstrumentationView(APIView):
+    """
+    Request profiles aggregated by ``InstrumentationMiddleware`` in this
+    worker process; ``DELETE`` starts over.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            "pid": os.getpid(),
+            "endpoints": endpoint_stats.snapshot(),
+        })
+
+    def delete(self, request):
+        endpoint_stats.reset()
+        return Response(status=204)
+
+
+def metrics(request):
+    """
+    Prometheus scrape target. With ``METRICS_TOKEN`` set, scrapers must
+    send it as ``Authorization: Bearer <token>``.
+    """
+    token = settings.METRICS["TOKEN"]
+    if token and not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.exposition(), content_type=CONTENT_TYPE)
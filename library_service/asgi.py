@@ -2,6 +2,9 @@
 ASGI config for library_service project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Besides the API it serves the Telegram webhook (``/telegram/webhook/``), so
+bot updates are spread over however many ASGI workers are running. Clients
+kept per event loop are closed when the server shuts down.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +14,8 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from core.lifespan import with_lifespan
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "library_service.settings")
 
-application = get_asgi_application()
+application = with_lifespan(get_asgi_application())
@@ -11,8 +11,10 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
 from datetime import timedelta
+from decimal import Decimal
 from os import getenv
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -44,9 +46,12 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "drf_spectacular",
+    "django_q",
+    "core",
     "books",
     "users",
     "borrowings",
@@ -55,6 +60,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -95,9 +101,37 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST"),
         "PORT": os.getenv("POSTGRES_PORT"),
+        # Seconds a connection is reused across requests; 0 opens one per
+        # request. Under ASGI (uvicorn) each request runs its queries in
+        # a new thread, so kept connections are never reused and only pile
+        # up: leave it at 0 there and use POSTGRES_POOL, raise it for WSGI.
+        # Health checks replace connections the server dropped.
+        "CONN_MAX_AGE": int(os.getenv("POSTGRES_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": (
+            os.getenv("POSTGRES_CONN_HEALTH_CHECKS", "true").lower() == "true"
+        ),
+        "OPTIONS": {},
     }
 }
 
+# A connection pool shared by the threads of each process, the better
+# fit under ASGI. Needs psycopg 3 (pip install "psycopg[binary,pool]")
+# and replaces persistent connections.
+if os.getenv("POSTGRES_POOL", "false").lower() == "true":
+    try:
+        import psycopg  # noqa: F401
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured(
+            'POSTGRES_POOL needs psycopg 3: pip install "psycopg[binary,pool]"'
+        )
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("POSTGRES_POOL_MIN_SIZE", 2)),
+        "max_size": int(os.getenv("POSTGRES_POOL_MAX_SIZE", 10)),
+        "timeout": float(os.getenv("POSTGRES_POOL_TIMEOUT", 10)),
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -173,5 +207,96 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Authorize",),
 }
 
+BOOK_CATALOGUE_CACHE = {
+    # "locmem" keeps a per-process LRU; "django" uses CACHES[CACHE_ALIAS]
+    # so that every worker shares entries and invalidations.
+    "BACKEND": os.getenv("BOOK_CACHE_BACKEND", "locmem"),
+    "CACHE_ALIAS": os.getenv("BOOK_CACHE_ALIAS", "default"),
+    "TIMEOUT": int(os.getenv("BOOK_CACHE_TIMEOUT", 60)),
+    "MAX_ENTRIES": int(os.getenv("BOOK_CACHE_MAX_ENTRIES", 1024)),
+}
+
+Q_CLUSTER = {
+    "name": "library",
+    "orm": "default",
+    "workers": int(os.getenv("Q_WORKERS", 4)),
+    "timeout": 600,
+    "retry": 900,
+}
+
+OVERDUE_SCAN = {
+    "CRON": os.getenv("OVERDUE_SCAN_CRON", "0 8 * * *"),
+    # Borrowing ids per queued shard task.
+    "SHARD_SIZE": int(os.getenv("OVERDUE_SCAN_SHARD_SIZE", 5000)),
+    # Run shards inline instead of on the cluster, to debug without a
+    # qcluster. django-q closes the database connection afterwards.
+    "SYNC": os.getenv("OVERDUE_SCAN_SYNC", "false").lower() == "true",
+}
+
+# Fine per overdue day, as a multiple of the book's daily fee.
+FINE_MULTIPLIER = Decimal(os.getenv("FINE_MULTIPLIER", "2"))
+FINE_ACCRUAL_CRON = os.getenv("FINE_ACCRUAL_CRON", "0 1 * * *")
+
+TELEGRAM_BOT = {
+    "TOKEN": os.getenv("BOT_TOKEN"),
+    "API_URL": os.getenv("BOT_API_URL", "https://api.telegram.org"),
+    # Sent back by Telegram in X-Telegram-Bot-Api-Secret-Token; the
+    # webhook rejects every update while this is unset.
+    "WEBHOOK_SECRET": os.getenv("BOT_WEBHOOK_SECRET"),
+    "CHAT_ID": os.getenv("CHAT_ID"),
+}
+
+TELEGRAM_USER_CACHE = {
+    # "locmem" checks every hit against the database, since another
+    # process may have rebound the id. "django" with a CACHES backend all
+    # webhook workers share sees their invalidations and skips the check.
+    "BACKEND": os.getenv("TELEGRAM_USER_CACHE_BACKEND", "locmem"),
+    "CACHE_ALIAS": os.getenv("TELEGRAM_USER_CACHE_ALIAS", "default"),
+    "TIMEOUT": int(os.getenv("TELEGRAM_USER_CACHE_TIMEOUT", 300)),
+    "MAX_ENTRIES": int(os.getenv("TELEGRAM_USER_CACHE_MAX_ENTRIES", 10000)),
+}
+
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY")
+
+STRIPE_CLIENT = {
+    # Optional Stripe API base url, e.g. a local fake server.
+    "API_URL": os.getenv("STRIPE_API_URL"),
+    # Seconds per request, including connect.
+    "TIMEOUT": float(os.getenv("STRIPE_TIMEOUT", 10)),
+    "MAX_NETWORK_RETRIES": int(os.getenv("STRIPE_MAX_NETWORK_RETRIES", 2)),
+}
+
+STRIPE_CHECKOUT = {
+    # Seconds until a checkout session expires, 1800 to 86400.
+    "SESSION_TTL": int(os.getenv("STRIPE_SESSION_TTL", 3600)),
+    # Sessions expiring sooner than this are replaced instead of reused.
+    "REUSE_MARGIN": int(os.getenv("STRIPE_SESSION_REUSE_MARGIN", 300)),
+}
+
+STRIPE_WEBHOOK = {
+    # Signing secret of the webhook endpoint; every event is rejected
+    # while this is unset.
+    "SECRET": os.getenv("STRIPE_WEBHOOK_SECRET"),
+    "CRON": os.getenv("STRIPE_EVENTS_CRON", "* * * * *"),
+    # Events applied per transaction.
+    "BATCH_SIZE": int(os.getenv("STRIPE_EVENTS_BATCH_SIZE", 500)),
+}
+
+INSTRUMENTATION = {
+    # Per-request query and timing profile, see core.middleware.
+    "ENABLED": os.getenv("INSTRUMENTATION_ENABLED", "true").lower() == "true",
+    # The header shows every client query counts and timings, so it is
+    # meant for development only.
+    "SERVER_TIMING": (
+        os.getenv("INSTRUMENTATION_SERVER_TIMING", "false").lower() == "true"
+    ),
+}
+
+METRICS = {
+    # Shared by every worker process, e.g. gunicorn workers, so /metrics
+    # reports their sum. Unset keeps each process's metrics in memory.
+    "DIR": os.getenv("METRICS_DIR") or None,
+    # Bearer token scrapers must send; unset leaves /metrics open.
+    "TOKEN": os.getenv("METRICS_TOKEN") or None,
+}
@@ -22,6 +22,8 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
     SpectacularRedocView
 )
+from core.views import InstrumentationView, metrics
+from telegram.webhook import telegram_webhook
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -30,6 +32,13 @@ urlpatterns = [
     path("api/", include("payments.urls", namespace="payments")),
     path("api/users/", include("users.urls", namespace="users")),
     path("api-auth/", include("rest_framework.urls")),
+    path("telegram/webhook/", telegram_webhook, name="telegram-webhook"),
+    path(
+        "api/instrumentation/",
+        InstrumentationView.as_view(),
+        name="instrumentation",
+    ),
+    path("metrics", metrics, name="metrics"),
     path("api/doc/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/doc/swagger/",
@@ -1,5 +1,13 @@
 from django.contrib import admin
-from payments.models import Payment
+from payments.models import Payment, StripeEvent
 
 
 admin.site.register(Payment)
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ("event_id", "type", "received_at", "processed_at")
+    list_filter = ("type",)
+    search_fields = ("event_id",)
+    readonly_fields = [field.name for field in StripeEvent._meta.fields]
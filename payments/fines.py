@@ -0,0 +1,197 @@
+from decimal import Decimal
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from books.models import Book
+from borrowings.models import Borrowing
+from borrowings.stats import refresh_borrowing_stats
+from core.versions import bump_versions
+from payments.models import Payment
+
+CENT = Decimal("0.01")
+
+
+def bump_payment_versions(user_ids):
+    bump_versions(
+        "payments",
+        *(f"payments:user:{user_id}" for user_id in set(user_ids)),
+    )
+
+
+def rental_amount(borrowing, actual_return_date):
+    """``daily_fee`` for every planned day the book was out, at least one."""
+    last_day = min(actual_return_date, borrowing.expected_return_date)
+    days = max((last_day - borrowing.borrow_date).days, 1)
+    return (borrowing.book.daily_fee * days).quantize(CENT)
+
+
+def fine_amount(borrowing, actual_return_date):
+    """``days_overdue × daily_fee × FINE_MULTIPLIER``, zero when on time."""
+    days = (actual_return_date - borrowing.expected_return_date).days
+    if days <= 0:
+        return Decimal("0.00")
+    return (
+        borrowing.book.daily_fee * days * settings.FINE_MULTIPLIER
+    ).quantize(CENT)
+
+
+def charge_returns(borrowings, actual_return_date):
+    """
+    Settle the pending ``PAYMENT`` and ``FINE`` of each returned borrowing.
+
+    Must run in the transaction that marks them returned. Pending rows,
+    e.g. a fine accrued by ``accrue_fines``, are updated in place, or
+    deleted when nothing is owed any more, such as after a backdated
+    return; paid rows are left alone. A paid rental is not charged again,
+    while fines already paid are subtracted and the rest is charged as a
+    new fine. ``borrowings`` need their book loaded.
+    """
+    borrowings = {borrowing.pk: borrowing for borrowing in borrowings}
+    if not borrowings:
+        return []
+    amounts = {}
+    for borrowing in borrowings.values():
+        amounts[borrowing.pk, Payment.TypeField.PAYMENT] = rental_amount(
+            borrowing, actual_return_date
+        )
+        fine = fine_amount(borrowing, actual_return_date)
+        if fine:
+            amounts[borrowing.pk, Payment.TypeField.FINE] = fine
+
+    pending = {}
+    paid = {}
+    for payment in Payment.objects.select_for_update().filter(
+        borrowing_id__in=borrowings
+    ):
+        key = payment.borrowing_id, payment.type_field
+        if payment.status == Payment.Status.PENDING:
+            pending.setdefault(key, payment)
+        else:
+            paid[key] = paid.get(key, 0) + payment.money_to_pay
+
+    to_update = []
+    to_create = []
+    to_delete = []
+    for key in amounts.keys() | pending.keys():
+        amount = amounts.get(key, 0)
+        if key in paid:
+            if key[1] == Payment.TypeField.PAYMENT:
+                continue
+            amount -= paid[key]
+        payment = pending.get(key)
+        if amount <= 0:
+            if payment is not None:
+                to_delete.append(payment.pk)
+        elif payment is not None:
+            payment.money_to_pay = amount
+            to_update.append(payment)
+        else:
+            to_create.append(Payment(
+                borrowing_id=key[0], type_field=key[1], money_to_pay=amount
+            ))
+    Payment.objects.filter(pk__in=to_delete).delete()
+    Payment.objects.bulk_update(to_update, ["money_to_pay"])
+    created = Payment.objects.bulk_create(to_create)
+    bump_payment_versions(
+        borrowing.user_id for borrowing in borrowings.values()
+    )
+    return to_update + created
+
+
+def accrue_fines(today=None):
+    """
+    Bring the pending ``FINE`` of every open overdue borrowing up to
+    ``today`` with one ``INSERT ... SELECT`` for new fines and one
+    ``UPDATE ... FROM`` for existing ones. Fines already paid are
+    subtracted, so days accrued after a payment get a new pending fine,
+    and a pending fine already covered by paid ones is deleted. Returns
+    the number of fines written or deleted.
+    """
+    if today is None:
+        today = timezone.localdate()
+    params = {
+        "today": today,
+        "multiplier": settings.FINE_MULTIPLIER,
+        "fine": Payment.TypeField.FINE,
+        "pending": Payment.Status.PENDING,
+        "paid": Payment.Status.PAID,
+    }
+    tables = {
+        "payment": Payment._meta.db_table,
+        "borrowing": Borrowing._meta.db_table,
+        "book": Book._meta.db_table,
+    }
+    overdue = (
+        "b.actual_return_date IS NULL "
+        "AND b.expected_return_date < %(today)s"
+    )
+    amount = (
+        "ROUND((%(today)s::date - b.expected_return_date) "
+        "* bk.daily_fee * %(multiplier)s, 2)"
+    )
+    paid = (
+        f"COALESCE((SELECT SUM(q.money_to_pay) FROM {tables['payment']} AS q "
+        "WHERE q.borrowing_id = b.id AND q.type_field = %(fine)s "
+        "AND q.status = %(paid)s), 0)"
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {tables["payment"]} AS p
+            SET money_to_pay = {amount} - {paid}
+            FROM {tables["borrowing"]} AS b
+            JOIN {tables["book"]} AS bk ON bk.id = b.book_id
+            WHERE p.borrowing_id = b.id
+              AND p.type_field = %(fine)s
+              AND p.status = %(pending)s
+              AND {overdue}
+              AND {amount} > {paid}
+            RETURNING b.user_id
+            """,
+            params,
+        )
+        user_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            f"""
+            DELETE FROM {tables["payment"]} AS p
+            USING {tables["borrowing"]} AS b
+            JOIN {tables["book"]} AS bk ON bk.id = b.book_id
+            WHERE p.borrowing_id = b.id
+              AND p.type_field = %(fine)s
+              AND p.status = %(pending)s
+              AND {overdue}
+              AND {amount} <= {paid}
+            RETURNING b.user_id
+            """,
+            params,
+        )
+        user_ids += [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            f"""
+            WITH inserted AS (
+                INSERT INTO {tables["payment"]}
+                    (status, type_field, borrowing_id, money_to_pay)
+                SELECT %(pending)s, %(fine)s, b.id, {amount} - {paid}
+                FROM {tables["borrowing"]} AS b
+                JOIN {tables["book"]} AS bk ON bk.id = b.book_id
+                WHERE {overdue}
+                  AND {amount} > {paid}
+                  AND NOT EXISTS (
+                    SELECT 1 FROM {tables["payment"]} AS p
+                    WHERE p.borrowing_id = b.id
+                      AND p.type_field = %(fine)s
+                      AND p.status = %(pending)s
+                  )
+                RETURNING borrowing_id
+            )
+            SELECT b.user_id
+            FROM inserted
+            JOIN {tables["borrowing"]} AS b ON b.id = inserted.borrowing_id
+            """,
+            params,
+        )
+        user_ids += [row[0] for row in cursor.fetchall()]
+        if user_ids:
+            bump_payment_versions(user_ids)
+            refresh_borrowing_stats(user_ids)
+    return len(user_ids)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-17 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0003_alter_payment_session_url"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="session_key",
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="session_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -16,7 +16,34 @@ class Payment(models.Model):
     borrowing = models.ForeignKey(Borrowing, on_delete=models.CASCADE)
     session_url = models.URLField(max_length=500, blank=True, null=True)
     session_id = models.CharField(max_length=255, blank=True, null=True)
+    # Which payments and amounts the session charges, see
+    # ``payments.services.session_key``.
+    session_key = models.CharField(max_length=100, blank=True, null=True)
+    session_expires_at = models.DateTimeField(blank=True, null=True)
     money_to_pay = models.DecimalField(max_digits=10, decimal_places=2)
 
     def __str__(self):
         return f"{self.borrowing.user}, {self.type_field} - {self.status} - {self.money_to_pay}"
+
+
+class StripeEvent(models.Model):
+    """A verified Stripe webhook event waiting for, or done with, apply."""
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)  # noqa: VNE003
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-received_at"]
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(processed_at__isnull=True),
+                name="stripe_event_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.event_id}"
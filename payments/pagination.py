@@ -0,0 +1,7 @@
+from library_service.pagination import KeysetCursorPagination
+
+
+class PaymentCursorPagination(KeysetCursorPagination):
+    ordering = ("-id",)
+    page_size = 50
+    max_page_size = 500
@@ -1,8 +1,11 @@
 from rest_framework import serializers
 from payments.models import Payment
+from core.serializers import FastReadSerializerMixin
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(
+    FastReadSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Payment
         fields = [
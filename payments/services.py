@@ -1,27 +1,221 @@
+import asyncio
+import datetime
+import hashlib
+import weakref
 import stripe
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.utils import timezone
+from core.lifespan import on_shutdown
+from core.metrics import STRIPE_REQUEST_SECONDS, STRIPE_REQUESTS, track
+from payments.fines import bump_payment_versions
+from payments.models import Payment
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
+_clients = weakref.WeakKeyDictionary()
 
-def create_stripe_checkout_session(payment):
-    session = stripe.checkout.Session.create(
-        payment_method_types=["card"],
-        line_items=[{
-            "price_data": {
-                "currency": "usd",
-                "unit_amount": int(payment.money_to_pay * 100),
-                "product_data": {
-                    "name": f"Fine for {payment.borrowing.book.title}",
-                },
-            },
-            "quantity": 1,
-        }],
-        mode="payment",
-        success_url="http://localhost:8000/success/",
-        cancel_url="http://localhost:8000/cancel/",
-        metadata={
-            "payment_id": payment.id,
-        }
+
+def cents(payment):
+    return int(payment.money_to_pay * 100)
+
+
+def session_key(payments):
+    """
+    Identify the payments and amounts a session charges. A single payment
+    keeps the readable ``checkout:<id>:<cents>``; batches are hashed to
+    fit ``Payment.session_key``.
+    """
+    key = "checkout:" + ",".join(
+        f"{payment.id}:{cents(payment)}"
+        for payment in sorted(payments, key=lambda payment: payment.id)
     )
-    return session
+    if len(key) > 100:
+        key = "checkout:" + hashlib.sha256(key.encode()).hexdigest()[:40]
+    return key
+
+
+def idempotency_key(payments):
+    """
+    ``session_key`` for the first session of these payments, so a retried
+    request gets the session Stripe already created. Replacing an expired
+    session with the same key appends its id, as Stripe would replay it.
+    """
+    key = session_key(payments)
+    replaced = sorted({
+        payment.session_id for payment in payments
+        if payment.session_key == key and payment.session_id
+    })
+    if replaced:
+        digest = hashlib.sha256(",".join(replaced).encode()).hexdigest()
+        key = f"{key}:{digest[:16]}"
+    return key
+
+
+def reusable_session_url(payments, now=None):
+    """
+    Return the url of the session covering exactly ``payments`` at their
+    current amounts, unless it expires within ``REUSE_MARGIN``.
+    """
+    if now is None:
+        now = timezone.now()
+    margin = datetime.timedelta(
+        seconds=settings.STRIPE_CHECKOUT["REUSE_MARGIN"]
+    )
+    key = session_key(payments)
+    first = payments[0]
+    if first.session_url and all(
+        payment.session_id == first.session_id
+        and payment.session_key == key
+        and payment.session_expires_at is not None
+        and payment.session_expires_at > now + margin
+        for payment in payments
+    ):
+        return first.session_url
+    return None
+
+
+def superseded_session_ids(payments, now=None):
+    """
+    Ids of the sessions ``payments`` were last sent to that are still
+    open. They are expired before a new session is created, so an old
+    checkout page cannot charge the payments a second time.
+    """
+    if now is None:
+        now = timezone.now()
+    return sorted({
+        payment.session_id for payment in payments
+        if payment.session_id
+        and payment.session_expires_at is not None
+        and payment.session_expires_at > now
+    })
+
+
+def checkout_session_params(payments, now=None):
+    """
+    ``checkout.Session.create`` params with one line item per payment;
+    needs ``borrowing.book`` loaded.
+    """
+    if now is None:
+        now = timezone.now()
+    expires_at = now + datetime.timedelta(
+        seconds=settings.STRIPE_CHECKOUT["SESSION_TTL"]
+    )
+    return {
+        "payment_method_types": ["card"],
+        "line_items": [
+            {
+                "price_data": {
+                    "currency": "usd",
+                    "unit_amount": cents(payment),
+                    "product_data": {
+                        "name": (
+                            f"{payment.type_field} for "
+                            f"{payment.borrowing.book.title}"
+                        ),
+                    },
+                },
+                "quantity": 1,
+            }
+            for payment in payments
+        ],
+        "mode": "payment",
+        "success_url": "https://your-site.com/success",
+        "cancel_url": "https://your-site.com/cancel",
+        "expires_at": int(expires_at.timestamp()),
+        "metadata": {
+            "payment_ids": ",".join(str(payment.id) for payment in payments),
+        },
+    }
+
+
+def save_session(payments, session, params):
+    """Store ``session`` on every payment it charges."""
+    fields = {
+        "session_id": session.id,
+        "session_url": session.url,
+        "session_key": session_key(payments),
+        "session_expires_at": datetime.datetime.fromtimestamp(
+            session.get("expires_at") or params["expires_at"],
+            tz=datetime.timezone.utc,
+        ),
+    }
+    Payment.objects.filter(
+        id__in=[payment.id for payment in payments]
+    ).update(**fields)
+    for payment in payments:
+        for name, value in fields.items():
+            setattr(payment, name, value)
+    bump_payment_versions(payment.borrowing.user_id for payment in payments)
+
+
+def get_stripe_client():
+    """
+    Return the ``StripeClient`` of the running event loop. Under ASGI
+    that is the worker's one loop, so every request shares its pooled
+    httpx connection to Stripe until the server shuts down.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _clients:
+        options = settings.STRIPE_CLIENT
+        base_addresses = {}
+        if options["API_URL"]:
+            base_addresses["api"] = options["API_URL"]
+        http_client = stripe.HTTPXClient(timeout=options["TIMEOUT"])
+        _clients[loop] = http_client, stripe.StripeClient(
+            settings.STRIPE_SECRET_KEY,
+            http_client=http_client,
+            base_addresses=base_addresses,
+            max_network_retries=options["MAX_NETWORK_RETRIES"],
+        )
+    return _clients[loop][1]
+
+
+@on_shutdown
+async def close_stripe_client():
+    """Close the connection pool of the running event loop, if any."""
+    http_client, _ = _clients.pop(asyncio.get_running_loop(), (None, None))
+    if http_client is not None:
+        await http_client.close_async()
+
+
+def checkout_url(payments):
+    """
+    Return a checkout url charging all ``payments`` together, reusing
+    their current session while it is valid, else expiring it first.
+    Stripe refuses to expire a session that was paid in the meantime,
+    and its ``InvalidRequestError`` is raised. ``payments`` need
+    ``borrowing.book`` loaded.
+    """
+    url = reusable_session_url(payments)
+    if url is not None:
+        return url
+    for session_id in superseded_session_ids(payments):
+        with track(STRIPE_REQUESTS, STRIPE_REQUEST_SECONDS):
+            stripe.checkout.Session.expire(session_id)
+    params = checkout_session_params(payments)
+    with track(STRIPE_REQUESTS, STRIPE_REQUEST_SECONDS):
+        session = stripe.checkout.Session.create(
+            **params, idempotency_key=idempotency_key(payments)
+        )
+    save_session(payments, session, params)
+    return session.url
+
+
+async def acheckout_url(payments):
+    """``checkout_url`` without blocking the event loop."""
+    url = reusable_session_url(payments)
+    if url is not None:
+        return url
+    client = get_stripe_client()
+    for session_id in superseded_session_ids(payments):
+        with track(STRIPE_REQUESTS, STRIPE_REQUEST_SECONDS):
+            await client.checkout.sessions.expire_async(session_id)
+    params = checkout_session_params(payments)
+    with track(STRIPE_REQUESTS, STRIPE_REQUEST_SECONDS):
+        session = await client.checkout.sessions.create_async(
+            params=params,
+            options={"idempotency_key": idempotency_key(payments)},
+        )
+    await sync_to_async(save_session)(payments, session, params)
+    return session.url
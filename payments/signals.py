@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from borrowings.stats import deleted_with_user, refresh_borrowing_stats
+from payments.fines import bump_payment_versions
+from payments.models import Payment
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def payment_changed(sender, instance, origin=None, **kwargs):
+    bump_payment_versions([instance.borrowing.user_id])
+    if not deleted_with_user(origin):
+        refresh_borrowing_stats([instance.borrowing.user_id])
@@ -0,0 +1,131 @@
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from borrowings.stats import refresh_borrowing_stats
+from payments.fines import bump_payment_versions
+from payments.models import Payment, StripeEvent
+from payments.services import cents
+
+logger = logging.getLogger(__name__)
+
+PAID_EVENTS = {
+    "checkout.session.completed",
+    "checkout.session.async_payment_succeeded",
+}
+EXPIRED_EVENT = "checkout.session.expired"
+HANDLED_EVENTS = PAID_EVENTS | {EXPIRED_EVENT}
+
+
+def session_payment_ids(session):
+    ids = session.get("metadata", {}).get("payment_ids", "")
+    return {int(payment_id) for payment_id in ids.split(",") if payment_id}
+
+
+def covered_payment_ids(pending, sessions):
+    """
+    Ids of the ``pending`` payments a paid session settles: those it was
+    created for, by ``session_id`` or its metadata, as long as its
+    ``amount_total`` covers their current amounts. A session opened
+    before a fine grew, or replaced by a larger batch, pays nothing.
+    """
+    sessions = list(sessions)
+    if not sessions:
+        return set()
+    listed = {
+        session["id"]: session_payment_ids(session) for session in sessions
+    }
+    candidates = list(pending.filter(
+        Q(session_id__in=listed)
+        | Q(id__in=set().union(*listed.values()))
+    ).only("id", "session_id", "money_to_pay"))
+    covered = set()
+    for session in sessions:
+        payments = [
+            payment for payment in candidates
+            if payment.session_id == session["id"]
+            or payment.id in listed[session["id"]]
+        ]
+        amount = sum(cents(payment) for payment in payments)
+        if amount <= (session.get("amount_total") or 0):
+            covered.update(payment.id for payment in payments)
+        else:
+            logger.warning(
+                f"Stripe session {session['id']} paid "
+                f"{session.get('amount_total')} of {amount} cents due"
+            )
+    return covered
+
+
+def apply_event_batch(batch_size):
+    """
+    Apply up to ``batch_size`` pending events in one transaction and
+    return how many there were. Rows locked by another worker are
+    skipped, so several workers can drain the table together.
+    """
+    with transaction.atomic():
+        events = list(
+            StripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True)
+            .order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0
+        paid_sessions = {}
+        expired_sessions = set()
+        for event in events:
+            session = event.payload["data"]["object"]
+            if event.type in PAID_EVENTS:
+                # Delayed methods send "completed" unpaid and
+                # "async_payment_succeeded" once the money arrives.
+                if session.get("payment_status") == "paid":
+                    paid_sessions[session["id"]] = session
+            elif event.type == EXPIRED_EVENT:
+                expired_sessions.add(session["id"])
+
+        pending = Payment.objects.filter(status=Payment.Status.PENDING)
+        paid_ids = covered_payment_ids(pending, paid_sessions.values())
+        user_ids = set(
+            pending.filter(id__in=paid_ids).values_list(
+                "borrowing__user_id", flat=True
+            )
+        )
+        pending.filter(id__in=paid_ids).update(status=Payment.Status.PAID)
+        # The next checkout opens a fresh session instead of this one.
+        user_ids.update(
+            pending.filter(session_id__in=expired_sessions).values_list(
+                "borrowing__user_id", flat=True
+            )
+        )
+        pending.filter(session_id__in=expired_sessions).update(
+            session_id=None,
+            session_url=None,
+            session_key=None,
+            session_expires_at=None,
+        )
+        StripeEvent.objects.filter(
+            id__in=[event.id for event in events]
+        ).update(processed_at=timezone.now())
+        if user_ids:
+            bump_payment_versions(user_ids)
+            refresh_borrowing_stats(user_ids)
+    return len(events)
+
+
+def apply_stripe_events(batch_size=None):
+    """
+    Scheduled entry point: apply stored webhook events in batches until
+    none are left. Returns the number of events applied.
+    """
+    if batch_size is None:
+        batch_size = settings.STRIPE_WEBHOOK["BATCH_SIZE"]
+    applied = 0
+    while True:
+        count = apply_event_batch(batch_size)
+        if not count:
+            break
+        applied += count
+    if applied:
+        logger.info(f"Applied {applied} Stripe events")
+    return applied
@@ -0,0 +1,104 @@
+import hashlib
+import hmac
+import time
+from urllib.parse import parse_qs
+from core.testing import FakeHTTPServer
+
+
+class FakeStripeAPI(FakeHTTPServer):
+    """
+    Local stand-in for ``POST /v1/checkout/sessions`` and
+    ``POST /v1/checkout/sessions/<id>/expire``.
+
+    Like Stripe, a repeated ``Idempotency-Key`` gets the session created
+    for its first use, and only open sessions can be expired or paid.
+    Every call is recorded in ``requests`` with its path, form params,
+    idempotency key and arrival time.
+    """
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency=latency)
+        self.requests = []
+        self.sessions = {}
+
+    def session(self, session_id):
+        for session in self.sessions.values():
+            if session["id"] == session_id:
+                return session
+        return None
+
+    def created(self):
+        """The recorded session creation requests."""
+        return [
+            request for request in self.requests
+            if request["path"] == "/v1/checkout/sessions"
+        ]
+
+    def complete(self, session_id):
+        """Pay an open session, as the customer would on its page."""
+        session = self.session(session_id)
+        if session is None or session["status"] != "open":
+            return False
+        session["status"] = "complete"
+        return True
+
+    async def respond(self, method, path, headers, body):
+        key = headers.get("idempotency-key")
+        params = parse_qs(body.decode())
+        self.requests.append({
+            "path": path,
+            "params": params,
+            "idempotency_key": key,
+            "received_at": time.monotonic(),
+        })
+        if path.endswith("/expire"):
+            session = self.session(path.split("/")[-2])
+            if session is None or session["status"] != "open":
+                return "400 Bad Request", {"error": {
+                    "type": "invalid_request_error",
+                    "message": "Only open sessions can be expired.",
+                }}
+            session["status"] = "expired"
+            return "200 OK", session
+        key = key or f"request:{self.calls}"
+        if key not in self.sessions:
+            session_id = f"cs_test_{len(self.sessions) + 1}"
+            self.sessions[key] = {
+                "id": session_id,
+                "object": "checkout.session",
+                "status": "open",
+                "url": f"https://checkout.stripe.test/pay/{session_id}",
+                "expires_at": int(params.get("expires_at", [0])[0]) or None,
+            }
+        return "200 OK", self.sessions[key]
+
+
+def checkout_event(event_id, session_id, payment_ids=(), event_type=None,
+                   payment_status="paid", amount_total=0):
+    """A ``checkout.session.*`` webhook event as Stripe sends it."""
+    return {
+        "id": event_id,
+        "object": "event",
+        "type": event_type or "checkout.session.completed",
+        "data": {"object": {
+            "id": session_id,
+            "object": "checkout.session",
+            "payment_status": payment_status,
+            "amount_total": amount_total,
+            "metadata": {
+                "payment_ids": ",".join(
+                    str(payment_id) for payment_id in payment_ids
+                ),
+            },
+        }},
+    }
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """``Stripe-Signature`` header value for ``payload``."""
+    if timestamp is None:
+        timestamp = int(time.time())
+    signature = hmac.new(
+        secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={signature}"
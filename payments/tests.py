@@ -1,13 +1,31 @@
+import asyncio
+import datetime
+import json
+import logging
+import time
+from decimal import Decimal
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from borrowings.tests import sample_borrowing
-from payments.models import Payment
+from borrowings.services import return_borrowing
+from borrowings.tests import return_url, sample_borrowing
+from core.lifespan import shutdown
+from payments.fines import accrue_fines
+from payments.models import Payment, StripeEvent
 from payments.serializers import PaymentSerializer
+from payments.services import close_stripe_client, get_stripe_client
+from payments.tasks import apply_stripe_events
+from payments.testing import FakeStripeAPI, checkout_event, sign_payload
+
+logger = logging.getLogger(__name__)
 
 PAYMENT_URL = reverse("payments:payments-list")
+CHECKOUT_URL = reverse("payments:create-checkout-session")
+WEBHOOK_URL = reverse("payments:stripe-webhook")
 
 
 def sample_payment(**params) -> Payment:
@@ -79,11 +97,11 @@ class AuthenticatedPaymentAPITests(TestCase):
         self.client.force_login(self.user)
         res = self.client.get(PAYMENT_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data["results"]), 2)
 
     def test_other_user_payments_not_accessible(self):
         res = self.client.get(PAYMENT_URL)
-        self.assertFalse(any(payment["id"] == self.payment3.id for payment in res.data))
+        self.assertFalse(any(payment["id"] == self.payment3.id for payment in res.data["results"]))
 
 
 class AdminBorrowingTests(TestCase):
@@ -108,4 +126,433 @@ class AdminBorrowingTests(TestCase):
     def test_admin_can_see_all_payments(self):
         res = self.client.get(PAYMENT_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 3)
+        self.assertEqual(len(res.data["results"]), 3)
+
+
+class FineEngineTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            email="admin@admin.test", password="testpassword", is_staff=True,
+        )
+        self.client.force_authenticate(self.admin)
+        self.borrowing = sample_borrowing(user=self.admin)
+        self.borrowing.borrow_date = datetime.date(2025, 1, 10)
+        self.borrowing.save()
+        self.borrowing.refresh_from_db()
+
+    def payments(self, borrowing):
+        return dict(
+            Payment.objects.filter(borrowing=borrowing).values_list(
+                "type_field", "money_to_pay"
+            )
+        )
+
+    def test_on_time_return_charges_rental_only(self):
+        return_borrowing(self.borrowing.id, datetime.date(2025, 1, 15))
+        self.assertEqual(
+            self.payments(self.borrowing), {"PAYMENT": Decimal("5.00")}
+        )
+
+    @override_settings(FINE_MULTIPLIER=Decimal("2"))
+    def test_late_return_charges_fine(self):
+        res = self.client.post(
+            return_url(self.borrowing.id),
+            {"actual_return_date": "2025-01-23"},
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.payments(self.borrowing),
+            {"PAYMENT": Decimal("10.00"), "FINE": Decimal("6.00")},
+        )
+
+    @override_settings(FINE_MULTIPLIER=Decimal("2"))
+    def test_accrue_fines_then_return(self):
+        returned = sample_borrowing(
+            user=self.admin, actual_return_date="2025-01-12"
+        )
+        self.assertEqual(accrue_fines(datetime.date(2025, 1, 22)), 1)
+        self.assertEqual(
+            self.payments(self.borrowing), {"FINE": Decimal("4.00")}
+        )
+        self.assertEqual(self.payments(returned), {})
+        self.assertEqual(accrue_fines(datetime.date(2025, 1, 25)), 1)
+        self.assertEqual(
+            self.payments(self.borrowing), {"FINE": Decimal("10.00")}
+        )
+        return_borrowing(self.borrowing.id, datetime.date(2025, 1, 26))
+        self.assertEqual(
+            self.payments(self.borrowing),
+            {"PAYMENT": Decimal("10.00"), "FINE": Decimal("12.00")},
+        )
+        self.assertEqual(Payment.objects.filter(type_field="FINE").count(), 1)
+
+    @override_settings(FINE_MULTIPLIER=Decimal("2"))
+    def test_days_after_a_paid_fine_are_charged(self):
+        accrue_fines(datetime.date(2025, 1, 22))
+        Payment.objects.filter(borrowing=self.borrowing).update(status="PAID")
+        self.assertEqual(accrue_fines(datetime.date(2025, 1, 22)), 0)
+        self.assertEqual(accrue_fines(datetime.date(2025, 1, 25)), 1)
+        fines = Payment.objects.filter(borrowing=self.borrowing, type_field="FINE")
+        self.assertEqual(
+            sorted(fines.values_list("status", "money_to_pay")),
+            [("PAID", Decimal("4.00")), ("PENDING", Decimal("6.00"))],
+        )
+        return_borrowing(self.borrowing.id, datetime.date(2025, 1, 26))
+        self.assertEqual(
+            sorted(fines.values_list("status", "money_to_pay")),
+            [("PAID", Decimal("4.00")), ("PENDING", Decimal("8.00"))],
+        )
+
+    @override_settings(FINE_MULTIPLIER=Decimal("2"))
+    def test_backdated_return_drops_accrued_fine(self):
+        accrue_fines(datetime.date(2025, 1, 22))
+        return_borrowing(self.borrowing.id, datetime.date(2025, 1, 18))
+        self.assertEqual(
+            self.payments(self.borrowing), {"PAYMENT": Decimal("8.00")}
+        )
+
+    @override_settings(FINE_MULTIPLIER=Decimal("2"))
+    def test_overpaid_fine_leaves_nothing_pending(self):
+        accrue_fines(datetime.date(2025, 1, 22))
+        Payment.objects.filter(borrowing=self.borrowing).update(status="PAID")
+        accrue_fines(datetime.date(2025, 1, 25))
+        fines = Payment.objects.filter(borrowing=self.borrowing, type_field="FINE")
+        self.assertEqual(accrue_fines(datetime.date(2025, 1, 22)), 1)
+        self.assertEqual(
+            list(fines.values_list("status", "money_to_pay")),
+            [("PAID", Decimal("4.00"))],
+        )
+        accrue_fines(datetime.date(2025, 1, 25))
+        return_borrowing(self.borrowing.id, datetime.date(2025, 1, 21))
+        self.assertEqual(
+            list(fines.values_list("status", "money_to_pay")),
+            [("PAID", Decimal("4.00"))],
+        )
+
+    def test_paid_payment_is_not_charged_again(self):
+        sample_payment(
+            borrowing=self.borrowing,
+            type_field="PAYMENT",
+            status="PAID",
+            money_to_pay=1,
+        )
+        return_borrowing(self.borrowing.id, datetime.date(2025, 1, 15))
+        self.assertEqual(
+            self.payments(self.borrowing), {"PAYMENT": Decimal("1.00")}
+        )
+
+
+@override_settings(STRIPE_SECRET_KEY="sk_test_123")
+class CheckoutSessionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        cls.payments = [
+            sample_payment(
+                borrowing=sample_borrowing(user=user),
+                status="PENDING",
+                type_field="FINE",
+                money_to_pay=Decimal("12.50"),
+            )
+            for _ in range(20)
+        ]
+
+    async def create_sessions(self, api, payments):
+        with override_settings(STRIPE_CLIENT={
+            "API_URL": api.base_url, "TIMEOUT": 5, "MAX_NETWORK_RETRIES": 0,
+        }):
+            try:
+                return await asyncio.gather(*(
+                    self.async_client.post(
+                        CHECKOUT_URL, {"borrowing_id": payment.borrowing_id}
+                    )
+                    for payment in payments
+                ))
+            finally:
+                await close_stripe_client()
+
+    async def checkout(self, api, data):
+        with override_settings(STRIPE_CLIENT={
+            "API_URL": api.base_url, "TIMEOUT": 5, "MAX_NETWORK_RETRIES": 0,
+        }):
+            try:
+                return await self.async_client.post(CHECKOUT_URL, data)
+            finally:
+                await close_stripe_client()
+
+    async def test_client_shared_until_server_shutdown(self):
+        client = get_stripe_client()
+        self.assertIs(get_stripe_client(), client)
+        await shutdown()
+        self.assertIsNot(get_stripe_client(), client)
+        await close_stripe_client()
+
+    async def test_session_saved_on_payment(self):
+        payment = self.payments[0]
+        async with FakeStripeAPI() as api:
+            [res] = await self.create_sessions(api, [payment])
+        self.assertEqual(res.status_code, 200)
+        await payment.arefresh_from_db()
+        self.assertEqual(res.json()["checkout_url"], payment.session_url)
+        self.assertEqual(payment.session_id, "cs_test_1")
+        params = api.requests[0]["params"]
+        self.assertEqual(
+            params["line_items[0][price_data][unit_amount]"], ["1250"]
+        )
+        self.assertEqual(params["metadata[payment_ids]"], [str(payment.id)])
+
+    async def test_idempotency_key_derived_from_payment(self):
+        payment = self.payments[0]
+        async with FakeStripeAPI() as api:
+            first, second = await self.create_sessions(api, [payment] * 2)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(
+            {request["idempotency_key"] for request in api.requests},
+            {f"checkout:{payment.id}:1250"},
+        )
+
+    async def test_valid_session_reused_without_stripe_call(self):
+        data = {"borrowing_id": self.payments[0].borrowing_id}
+        async with FakeStripeAPI() as api:
+            first = await self.checkout(api, data)
+            second = await self.checkout(api, data)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(api.calls, 1)
+
+    async def test_expiring_session_replaced(self):
+        payment = self.payments[0]
+        data = {"borrowing_id": payment.borrowing_id}
+        async with FakeStripeAPI() as api:
+            first = await self.checkout(api, data)
+            await Payment.objects.filter(id=payment.id).aupdate(
+                session_expires_at=timezone.now() + datetime.timedelta(
+                    minutes=1
+                )
+            )
+            second = await self.checkout(api, data)
+        self.assertNotEqual(first.json(), second.json())
+        keys = [request["idempotency_key"] for request in api.created()]
+        self.assertEqual(len(set(keys)), 2)
+        self.assertTrue(keys[1].startswith(keys[0]))
+
+    async def test_changed_amount_gets_new_session(self):
+        payment = self.payments[0]
+        data = {"borrowing_id": payment.borrowing_id}
+        async with FakeStripeAPI() as api:
+            first = await self.checkout(api, data)
+            await Payment.objects.filter(id=payment.id).aupdate(
+                money_to_pay=Decimal("15.00")
+            )
+            second = await self.checkout(api, data)
+        self.assertNotEqual(first.json(), second.json())
+        self.assertEqual(
+            api.created()[1]["idempotency_key"], f"checkout:{payment.id}:1500"
+        )
+
+    async def test_superseded_session_cannot_be_paid(self):
+        payment = self.payments[0]
+        data = {"borrowing_id": payment.borrowing_id}
+        async with FakeStripeAPI() as api:
+            await self.checkout(api, data)
+            await Payment.objects.filter(id=payment.id).aupdate(
+                money_to_pay=Decimal("15.00")
+            )
+            await self.checkout(api, data)
+        self.assertEqual(
+            [request["path"] for request in api.requests],
+            [
+                "/v1/checkout/sessions",
+                "/v1/checkout/sessions/cs_test_1/expire",
+                "/v1/checkout/sessions",
+            ],
+        )
+        self.assertFalse(api.complete("cs_test_1"))
+        self.assertTrue(api.complete("cs_test_2"))
+
+    async def test_session_paid_before_replacement_is_not_replaced(self):
+        payment = self.payments[0]
+        data = {"borrowing_id": payment.borrowing_id}
+        async with FakeStripeAPI() as api:
+            await self.checkout(api, data)
+            api.complete("cs_test_1")
+            await Payment.objects.filter(id=payment.id).aupdate(
+                money_to_pay=Decimal("15.00")
+            )
+            res = await self.checkout(api, data)
+        self.assertEqual(res.status_code, 502)
+        self.assertEqual(len(api.created()), 1)
+        await payment.arefresh_from_db()
+        self.assertEqual(payment.session_id, "cs_test_1")
+
+    async def test_pending_payments_of_user_batched(self):
+        user = await get_user_model().objects.acreate(email="batch@test.test")
+        borrowing = await sync_to_async(sample_borrowing)(user=user)
+        for type_field in ("PAYMENT", "FINE"):
+            await Payment.objects.acreate(
+                borrowing=borrowing, type_field=type_field, money_to_pay=3
+            )
+        await Payment.objects.acreate(
+            borrowing=borrowing, type_field="FINE", money_to_pay=9,
+            status="PAID",
+        )
+        await self.async_client.aforce_login(user)
+        async with FakeStripeAPI() as api:
+            res = await self.checkout(api, {})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(api.calls, 1)
+        self.assertIn(
+            "line_items[1][price_data][unit_amount]", api.requests[0]["params"]
+        )
+        self.assertNotIn(
+            "line_items[2][price_data][unit_amount]", api.requests[0]["params"]
+        )
+        session_ids = {
+            payment.session_id async for payment in Payment.objects.filter(
+                borrowing=borrowing, status="PENDING"
+            )
+        }
+        self.assertEqual(session_ids, {"cs_test_1"})
+
+    async def test_borrowing_required_for_anonymous_users(self):
+        res = await self.async_client.post(CHECKOUT_URL, {})
+        self.assertEqual(res.status_code, 400)
+
+    async def test_unknown_borrowing(self):
+        res = await self.async_client.post(CHECKOUT_URL, {"borrowing_id": 0})
+        self.assertEqual(res.status_code, 404)
+
+    async def test_concurrent_sessions_do_not_block(self):
+        latency = 0.2
+        async with FakeStripeAPI(latency=latency) as api:
+            started = time.monotonic()
+            responses = await self.create_sessions(api, self.payments)
+            elapsed = time.monotonic() - started
+        self.assertTrue(all(res.status_code == 200 for res in responses))
+        self.assertEqual(len(api.sessions), len(self.payments))
+        logger.info(
+            f"{len(self.payments)} checkout sessions in {elapsed:.2f} s, "
+            f"{latency:.2f} s Stripe latency each"
+        )
+        # Sequential calls would take len(payments) × latency = 4 s.
+        self.assertLess(elapsed, len(self.payments) * latency / 4)
+
+
+@override_settings(STRIPE_WEBHOOK={
+    "SECRET": "whsec_test", "CRON": "* * * * *", "BATCH_SIZE": 2,
+})
+class StripeWebhookTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        borrowing = sample_borrowing(user=self.user)
+        self.payments = [
+            sample_payment(
+                borrowing=borrowing,
+                status="PENDING",
+                type_field=type_field,
+                session_id="cs_test_1",
+                session_key="checkout:key",
+            )
+            for type_field in ("PAYMENT", "FINE")
+        ]
+
+    def post_event(self, event, secret="whsec_test"):
+        payload = json.dumps(event)
+        return self.client.post(
+            WEBHOOK_URL,
+            data=payload,
+            content_type="application/json",
+            headers={"Stripe-Signature": sign_payload(payload, secret)},
+        )
+
+    def statuses(self):
+        return [
+            payment.status
+            for payment in Payment.objects.order_by("id")
+        ]
+
+    def test_bad_signature_rejected(self):
+        res = self.post_event(
+            checkout_event("evt_1", "cs_test_1"), secret="guess"
+        )
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_event_stored_not_applied(self):
+        res = self.post_event(checkout_event("evt_1", "cs_test_1"))
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(StripeEvent.objects.count(), 1)
+        self.assertEqual(self.statuses(), ["PENDING", "PENDING"])
+
+    def test_unhandled_event_ignored(self):
+        res = self.post_event(
+            checkout_event("evt_1", "cs_test_1", event_type="charge.refunded")
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_completed_session_marks_payments_paid(self):
+        self.post_event(checkout_event("evt_1", "cs_test_1", amount_total=800))
+        self.assertEqual(apply_stripe_events(), 1)
+        self.assertEqual(self.statuses(), ["PAID", "PAID"])
+        self.assertEqual(apply_stripe_events(), 0)
+
+    def test_redelivered_event_applied_once(self):
+        event = checkout_event("evt_1", "cs_test_1")
+        for _ in range(3):
+            self.assertEqual(self.post_event(event).status_code, 200)
+        self.assertEqual(StripeEvent.objects.count(), 1)
+        self.assertEqual(apply_stripe_events(), 1)
+
+    def test_unpaid_completion_waits_for_async_payment(self):
+        self.post_event(checkout_event(
+            "evt_1", "cs_test_1", payment_status="unpaid"
+        ))
+        apply_stripe_events()
+        self.assertEqual(self.statuses(), ["PENDING", "PENDING"])
+        self.post_event(checkout_event(
+            "evt_2", "cs_test_1",
+            event_type="checkout.session.async_payment_succeeded",
+            amount_total=800,
+        ))
+        apply_stripe_events()
+        self.assertEqual(self.statuses(), ["PAID", "PAID"])
+
+    def test_underpaid_session_pays_nothing(self):
+        Payment.objects.filter(type_field="FINE").update(money_to_pay=10)
+        self.post_event(checkout_event(
+            "evt_1", "cs_old", payment_ids=[self.payments[1].id],
+            amount_total=400,
+        ))
+        self.post_event(checkout_event("evt_2", "cs_test_1", amount_total=800))
+        with self.assertLogs("payments.tasks", "WARNING"):
+            self.assertEqual(apply_stripe_events(), 2)
+        self.assertEqual(self.statuses(), ["PENDING", "PENDING"])
+
+    def test_expired_session_cleared(self):
+        self.post_event(checkout_event(
+            "evt_1", "cs_test_1", event_type="checkout.session.expired",
+            payment_status="unpaid",
+        ))
+        apply_stripe_events()
+        self.assertEqual(self.statuses(), ["PENDING", "PENDING"])
+        self.assertFalse(
+            Payment.objects.filter(session_id__isnull=False).exists()
+        )
+
+    def test_burst_applied_in_batches(self):
+        payment_ids = [payment.id for payment in self.payments]
+        for i in range(5):
+            self.post_event(checkout_event(
+                f"evt_{i}", f"cs_burst_{i}", payment_ids=payment_ids[:1],
+                amount_total=400,
+            ))
+        self.assertEqual(apply_stripe_events(), 5)
+        self.assertFalse(
+            StripeEvent.objects.filter(processed_at__isnull=True).exists()
+        )
+        self.assertEqual(self.statuses(), ["PAID", "PENDING"])
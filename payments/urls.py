@@ -2,6 +2,7 @@ from rest_framework import routers
 from django.urls import path, include
 from payments.views import PaymentViewSet
 from .views import CreateStripeSessionView
+from payments.webhook import stripe_webhook
 
 app_name = "payments"
 
@@ -11,4 +12,5 @@ router.register("payments", PaymentViewSet, basename="payments")
 urlpatterns = [
     path("", include(router.urls)),
     path("create-checkout-session/", CreateStripeSessionView.as_view(), name="create-checkout-session"),
+    path("stripe/webhook/", stripe_webhook, name="stripe-webhook"),
 ]
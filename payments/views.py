@@ -1,20 +1,29 @@
 import stripe
-from django.conf import settings
 from django.views import View
 from django.http import JsonResponse
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
 from payments.models import Payment
 from borrowings.models import Borrowing
+from core.metrics import CHECKOUT_SECONDS, CHECKOUTS, track
+from core.mixins import ConditionalGetMixin, FastListMixin
+from core.renderers import StreamingJSONRenderer
+from payments.pagination import PaymentCursorPagination
 from payments.serializers import PaymentSerializer
+from payments.services import acheckout_url
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
 
-
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(
+    ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet
+):
     serializer_class = PaymentSerializer
     queryset = Payment.objects.select_related("borrowing")
     permission_classes = [IsAuthenticated]
+    pagination_class = PaymentCursorPagination
+    renderer_classes = [
+        *api_settings.DEFAULT_RENDERER_CLASSES, StreamingJSONRenderer
+    ]
 
     def get_queryset(self):
         queryset = self.queryset
@@ -22,32 +31,53 @@ class PaymentViewSet(viewsets.ModelViewSet):
             return queryset
         return queryset.filter(borrowing__user=self.request.user)
 
+    def get_version_keys(self):
+        user = self.request.user
+        if user.is_staff:
+            return ("payments",)
+        return (f"payments:user:{user.id}",)
+
 
 class CreateStripeSessionView(View):
-    def post(self, request, *args, **kwargs):
+    """
+    Check out every pending payment of ``borrowing_id``, or of the logged
+    in user when it is omitted, in one Stripe session.
+    """
+
+    outcomes = {400: "invalid", 404: "not_found", 502: "stripe_error"}
+
+    async def post(self, request, *args, **kwargs):
+        with track(CHECKOUTS, CHECKOUT_SECONDS) as outcome:
+            response = await self.checkout(request)
+            outcome.value = self.outcomes.get(response.status_code)
+        return response
+
+    async def checkout(self, request):
         borrowing_id = request.POST.get("borrowing_id")
+        payments = Payment.objects.select_related("borrowing__book").filter(
+            status=Payment.Status.PENDING
+        ).order_by("id")
+        if borrowing_id:
+            if not await Borrowing.objects.filter(id=borrowing_id).aexists():
+                return JsonResponse(
+                    {"error": "Borrowing not found"}, status=404
+                )
+            payments = payments.filter(borrowing_id=borrowing_id)
+        else:
+            user = await request.auser()
+            if not user.is_authenticated:
+                return JsonResponse(
+                    {"error": "borrowing_id is required"}, status=400
+                )
+            payments = payments.filter(borrowing__user=user)
+        payments = [payment async for payment in payments]
+        if not payments:
+            return JsonResponse({"error": "No pending payments"}, status=404)
         try:
-            borrowing = Borrowing.objects.get(id=borrowing_id)
-        except Borrowing.DoesNotExist:
-            return JsonResponse({"error": "Borrowing not found"}, status=404)
-        payment = Payment.objects.filter(borrowing=borrowing).first()
-        session = stripe.checkout.Session.create(
-            payment_method_types=["card"],
-            line_items=[{
-                "price_data": {
-                    "currency": "usd",
-                    "unit_amount": int(payment.money_to_pay * 100),
-                    "product_data": {
-                        "name": f"{payment.type_field} for {borrowing.book.title}",
-                    },
-                },
-                "quantity": 1,
-            }],
-            mode="payment",
-            success_url="https://your-site.com/success",
-            cancel_url="https://your-site.com/cancel",
-        )
-        payment.session_id = session.id
-        payment.session_url = session.url
-        payment.save()
-        return JsonResponse({"checkout_url": session.url})
+            url = await acheckout_url(payments)
+        except stripe.StripeError as error:
+            return JsonResponse(
+                {"error": error.user_message or "Stripe is unavailable"},
+                status=502,
+            )
+        return JsonResponse({"checkout_url": url})
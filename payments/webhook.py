@@ -0,0 +1,42 @@
+import json
+import stripe
+from django.conf import settings
+from django.http import (
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+)
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from payments.models import StripeEvent
+from payments.tasks import HANDLED_EVENTS
+
+SIGNATURE_HEADER = "Stripe-Signature"
+
+
+@csrf_exempt
+@require_POST
+async def stripe_webhook(request):
+    """
+    Verify an event pushed by Stripe and store it for
+    ``apply_stripe_events``. Redelivered events are dropped by their id.
+    """
+    secret = settings.STRIPE_WEBHOOK["SECRET"]
+    if not secret:
+        return HttpResponseForbidden()
+    try:
+        event = stripe.Webhook.construct_event(
+            request.body, request.headers.get(SIGNATURE_HEADER, ""), secret
+        )
+    except (ValueError, stripe.SignatureVerificationError):
+        return HttpResponseBadRequest()
+    if event.type in HANDLED_EVENTS:
+        await StripeEvent.objects.abulk_create(
+            [StripeEvent(
+                event_id=event.id,
+                type=event.type,
+                payload=json.loads(request.body),
+            )],
+            ignore_conflicts=True,
+        )
+    return HttpResponse()
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import time
+from collections import deque
+import httpx
+from core.metrics import (
+    TELEGRAM_DELIVERY_SECONDS,
+    TELEGRAM_MESSAGES,
+    TELEGRAM_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 4096
+# https://core.telegram.org/bots/faq#my-bot-is-hitting-limits-how-do-i-avoid-this
+GLOBAL_RATE = 30
+PER_CHAT_RATE = 1
+
+
+class DeliveryError(Exception):
+    def __init__(self, description, retryable=False, retry_after=None):
+        super().__init__(description)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class BotAPISender:
+    """
+    Minimal async client for the Bot API ``sendMessage`` method.
+
+    ``base_url`` can point at a local ``FakeBotAPI`` to run without
+    network access.
+    """
+
+    def __init__(self, token, base_url="https://api.telegram.org", timeout=10):
+        self.url = f"{base_url}/bot{token}/sendMessage"
+        self.client = httpx.AsyncClient(timeout=timeout)
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        payload = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        try:
+            response = await self.client.post(self.url, json=payload)
+        except httpx.HTTPError as e:
+            raise DeliveryError(str(e), retryable=True)
+        body = response.json()
+        if body.get("ok"):
+            return body["result"]
+        retry_after = body.get("parameters", {}).get("retry_after")
+        raise DeliveryError(
+            body.get("description", f"HTTP {response.status_code}"),
+            retryable=retry_after is not None or response.status_code >= 500,
+            retry_after=retry_after,
+        )
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class TokenBucket:
+    """Allow ``rate`` acquisitions per second with bursts of ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated_at) * self.rate,
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DeliveryQueue:
+    """
+    Deliver messages through ``sender`` from a pool of asyncio workers.
+
+    Messages are queued per chat, so each chat is served by one worker at
+    a time and keeps its order. A worker joins everything already queued
+    for its chat into as few messages as fit ``MESSAGE_LIMIT``, waits for
+    both the chat's and the global token bucket, and retries failures
+    marked retryable with exponential backoff (or the server's
+    ``retry_after``). ``put`` blocks while ``maxsize`` messages are
+    pending, which pushes back on producers.
+    """
+
+    def __init__(
+        self,
+        sender,
+        workers=4,
+        maxsize=1000,
+        global_rate=GLOBAL_RATE,
+        per_chat_rate=PER_CHAT_RATE,
+        max_attempts=5,
+        backoff=0.5,
+        coalesce=True,
+    ):
+        self.sender = sender
+        self.workers = workers
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.coalesce = coalesce
+        self.stats = {
+            "queued": 0, "sent": 0, "failed": 0, "retries": 0, "coalesced": 0
+        }
+        self._slots = asyncio.Semaphore(maxsize)
+        self._pending = {}
+        self._buckets = {}
+        self._ready = asyncio.Queue()
+        self._unfinished = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker())
+                for _ in range(self.workers)
+            ]
+
+    async def put(self, chat_id, text, parse_mode=None):
+        await self._slots.acquire()
+        self.start()
+        self.stats["queued"] += 1
+        self._unfinished += 1
+        self._idle.clear()
+        messages = self._pending.get(chat_id)
+        if messages is None:
+            messages = self._pending[chat_id] = deque()
+            self._ready.put_nowait(chat_id)
+        messages.append((text, parse_mode, time.monotonic()))
+
+    async def join(self):
+        await self._idle.wait()
+
+    async def close(self):
+        await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _take(self, messages):
+        text, parse_mode, queued_at = messages.popleft()
+        taken = 1
+        while (
+            self.coalesce
+            and messages
+            and messages[0][1] == parse_mode
+            and len(text) + len(messages[0][0]) + 2 <= MESSAGE_LIMIT
+        ):
+            text += "\n\n" + messages.popleft()[0]
+            taken += 1
+        self.stats["coalesced"] += taken - 1
+        return text, parse_mode, taken, queued_at
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._ready.get()
+            messages = self._pending[chat_id]
+            text, parse_mode, taken, queued_at = self._take(messages)
+            try:
+                outcome = await self._deliver(chat_id, text, parse_mode)
+                TELEGRAM_MESSAGES.inc(taken, outcome=outcome)
+                TELEGRAM_DELIVERY_SECONDS.observe(
+                    time.monotonic() - queued_at, outcome=outcome
+                )
+            finally:
+                if messages:
+                    self._ready.put_nowait(chat_id)
+                else:
+                    del self._pending[chat_id]
+                for _ in range(taken):
+                    self._slots.release()
+                self._unfinished -= taken
+                if not self._unfinished:
+                    self._idle.set()
+
+    async def _deliver(self, chat_id, text, parse_mode):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self.per_chat_rate)
+        for attempt in range(1, self.max_attempts + 1):
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                await self.sender.send_message(
+                    chat_id=chat_id, text=text, parse_mode=parse_mode
+                )
+                self.stats["sent"] += 1
+                return "sent"
+            except Exception as e:
+                retryable = getattr(e, "retryable", False)
+                if not retryable or attempt == self.max_attempts:
+                    self.stats["failed"] += 1
+                    logger.error(f"Failed to send Telegram message: {e}")
+                    return "failed"
+                self.stats["retries"] += 1
+                TELEGRAM_RETRIES.inc()
+                await asyncio.sleep(
+                    getattr(e, "retry_after", None)
+                    or self.backoff * 2 ** (attempt - 1)
+                )
+
+
+async def deliver(sender, chat_id, messages, parse_mode=None, **options):
+    """Send ``messages`` to ``chat_id`` and wait until all are handled."""
+    queue = DeliveryQueue(sender, **options)
+    for message in messages:
+        await queue.put(chat_id, message, parse_mode=parse_mode)
+    await queue.close()
+    return queue.stats
@@ -0,0 +1,117 @@
+import asyncio
+import functools
+import os
+import weakref
+from asgiref.sync import sync_to_async
+from borrowings.history import aborrowing_history, build_history_messages
+from borrowings.stats import aborrowing_stats
+from payments.models import Payment
+from users.services import telegram_users
+
+# Upper bound on updates doing database work at the same time.
+CONCURRENCY = int(os.getenv("BOT_CONCURRENCY", 64))
+
+_slots = weakref.WeakKeyDictionary()
+
+
+def limited(handler):
+    """
+    Run ``handler`` under a semaphore shared by every limited handler on
+    the running event loop, allowing ``CONCURRENCY`` at a time.
+    """
+
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        loop = asyncio.get_running_loop()
+        slots = _slots.get(loop)
+        if slots is None:
+            slots = _slots[loop] = asyncio.Semaphore(CONCURRENCY)
+        async with slots:
+            return await handler(update, context)
+
+    return wrapper
+
+
+@limited
+async def start(update, context):
+    telegram_user = update.message.from_user
+    telegram_id = telegram_user.id
+
+    if not context.args:
+        await update.message.reply_text(
+            "👋 Welcome! To log in, use:\n/start your_email@example.com"
+        )
+        return
+
+    email = context.args[0]
+
+    # bind() locks rows in a transaction, which the async ORM cannot do.
+    user = await sync_to_async(telegram_users.bind)(email, telegram_id)
+    if user is None:
+        await update.message.reply_text(
+            f"❌ No user found with email {email}. Please contact the administrator."
+        )
+        return
+    await update.message.reply_text(f"✅ Login successful! Welcome, {user.email}.")
+
+
+async def resolve_user(update):
+    """Return the ``TelegramUser`` behind ``update`` or ask them to log in."""
+    user = await telegram_users.aresolve(update.message.from_user.id)
+    if user is None:
+        await update.message.reply_text(
+            "❌ You are not logged in. Please use /start your_email"
+        )
+    return user
+
+
+@limited
+async def borrowings(update, context):
+    user = await resolve_user(update)
+    if user is None:
+        return
+
+    history = await aborrowing_history(user.id)
+
+    if not history:
+        await update.message.reply_text("📚 You have no borrowings.")
+        return
+
+    for message in build_history_messages(history):
+        await update.message.reply_text(message, parse_mode="HTML")
+
+
+@limited
+async def payments(update, context):
+    user = await resolve_user(update)
+    if user is None:
+        return
+
+    payments = [
+        payment
+        async for payment in Payment.objects.filter(
+            borrowing__user_id=user.id,
+            type_field="PAYMENT",
+            status="PAID"
+        ).select_related("borrowing__book")
+    ]
+
+    stats = await aborrowing_stats(user.id)
+    pending = ""
+    if stats.pending_payments:
+        pending = (
+            f"\n⏳ Pending: {stats.pending_payments} payment(s), "
+            f"{stats.pending_amount} USD"
+        )
+
+    if not payments:
+        await update.message.reply_text(
+            "💸 You have no successful payments." + pending
+        )
+        return
+
+    response_text = "✅ Your successful payments:\n"
+    for payment in payments:
+        response_text += f"- {payment.borrowing.book.title}: {payment.money_to_pay} USD\n"
+
+    await update.message.reply_text(response_text + pending)
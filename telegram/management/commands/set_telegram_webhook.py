@@ -0,0 +1,36 @@
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Point the bot's Telegram webhook at URL, or delete it."  # noqa: VNE003
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "url", nargs="?", help="e.g. https://library.example/telegram/webhook/"
+        )
+        parser.add_argument("--delete", action="store_true")
+
+    def handle(self, *args, **options):
+        config = settings.TELEGRAM_BOT
+        base = f"{config['API_URL']}/bot{config['TOKEN']}"
+        if options["delete"]:
+            response = httpx.post(f"{base}/deleteWebhook")
+        else:
+            if not options["url"]:
+                raise CommandError("Pass the webhook URL or --delete.")
+            if not config["WEBHOOK_SECRET"]:
+                raise CommandError("BOT_WEBHOOK_SECRET is not set.")
+            response = httpx.post(
+                f"{base}/setWebhook",
+                json={
+                    "url": options["url"],
+                    "secret_token": config["WEBHOOK_SECRET"],
+                    "allowed_updates": ["message"],
+                },
+            )
+        body = response.json()
+        if not body.get("ok"):
+            raise CommandError(body.get("description", response.text))
+        self.stdout.write(self.style.SUCCESS(body.get("description", "OK")))
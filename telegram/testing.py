@@ -0,0 +1,76 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from core.testing import FakeHTTPServer
+
+
+class FakeBotAPI(FakeHTTPServer):
+    """
+    Local stand-in for the Telegram Bot API.
+
+    Every ``sendMessage`` call is recorded in ``messages`` together with
+    its arrival time. The first ``rate_limited`` calls are answered with
+    429 and ``retry_after``.
+    """
+
+    def __init__(self, latency=0.0, rate_limited=0, retry_after=0.01):
+        super().__init__(latency=latency)
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+        self.messages = []
+
+    async def respond(self, method, path, headers, body):
+        payload = json.loads(body or "{}")
+        if self.calls <= self.rate_limited:
+            return "429 Too Many Requests", {
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry later",
+                "parameters": {"retry_after": self.retry_after},
+            }
+        self.messages.append({**payload, "received_at": time.monotonic()})
+        return "200 OK", {
+            "ok": True,
+            "result": {"message_id": len(self.messages), **payload},
+        }
+
+
+class FakeMessage:
+    def __init__(self, telegram_id, text, latency=0.0):
+        self.from_user = SimpleNamespace(id=telegram_id)
+        self.text = text
+        self.latency = latency
+        self.replies = []
+        self.created_at = time.monotonic()
+        self.replied_at = None
+
+    async def reply_text(self, text, parse_mode=None):
+        await asyncio.sleep(self.latency)
+        self.replies.append(text)
+        self.replied_at = time.monotonic()
+
+
+def fake_update(telegram_id, text="/borrowings", latency=0.0):
+    """
+    Build the parts of an ``Update`` and ``CallbackContext`` we use.
+    Replies take ``latency`` seconds, like a Bot API round trip.
+    """
+    command, *args = text.split()
+    update = SimpleNamespace(message=FakeMessage(telegram_id, text, latency))
+    return update, SimpleNamespace(args=args)
+
+
+async def drive(handler, updates):
+    """
+    Feed ``updates`` to ``handler`` all at once, as python-telegram-bot
+    does with ``concurrent_updates``, and return per-update latencies in
+    seconds, sorted.
+    """
+    await asyncio.gather(
+        *(handler(update, context) for update, context in updates)
+    )
+    return sorted(
+        update.message.replied_at - update.message.created_at
+        for update, _ in updates
+    )
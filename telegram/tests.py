@@ -0,0 +1,318 @@
+import asyncio
+import datetime
+import json
+import logging
+import time
+from unittest import IsolatedAsyncioTestCase, mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from books.models import Book
+from borrowings.models import Borrowing
+from library_service.asgi import application
+from telegram import handlers, webhook
+from telegram.delivery import BotAPISender, DeliveryQueue, deliver
+from core.testing import percentile
+from telegram.testing import FakeBotAPI, drive, fake_update
+from users.services import telegram_users
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryQueueTests(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.api = await FakeBotAPI().start()
+        self.sender = BotAPISender("token", base_url=self.api.base_url)
+
+    async def asyncTearDown(self):
+        await self.sender.close()
+        await self.api.stop()
+
+    async def test_delivers_in_order_per_chat(self):
+        queue = DeliveryQueue(self.sender, coalesce=False, per_chat_rate=1000)
+        for i in range(5):
+            await queue.put(1, f"first {i}")
+            await queue.put(2, f"second {i}")
+        await queue.close()
+        self.assertEqual(queue.stats["sent"], 10)
+        for chat_id, prefix in ((1, "first"), (2, "second")):
+            self.assertEqual(
+                [m["text"] for m in self.api.messages if m["chat_id"] == chat_id],
+                [f"{prefix} {i}" for i in range(5)],
+            )
+
+    async def test_queued_messages_for_a_chat_are_coalesced(self):
+        stats = await deliver(
+            self.sender, 1, [f"alert {i}" for i in range(10)], parse_mode="HTML"
+        )
+        self.assertEqual(stats["sent"], 1)
+        self.assertEqual(stats["coalesced"], 9)
+        self.assertEqual(self.api.messages[0]["text"].count("alert"), 10)
+        self.assertEqual(self.api.messages[0]["parse_mode"], "HTML")
+
+    async def test_rate_limited_calls_are_retried(self):
+        self.api.rate_limited = 2
+        stats = await deliver(self.sender, 1, ["hello"], backoff=0.01)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["sent"], 1)
+        self.assertEqual(self.api.calls, 3)
+
+    async def test_gives_up_after_max_attempts(self):
+        self.api.rate_limited = 10
+        stats = await deliver(self.sender, 1, ["hello"], max_attempts=3)
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual(self.api.calls, 3)
+
+    async def test_global_rate_limit(self):
+        started = time.monotonic()
+        stats = await deliver_to_chats(
+            self.sender, range(150), global_rate=100, workers=8
+        )
+        elapsed = time.monotonic() - started
+        self.assertEqual(stats["sent"], 150)
+        # 100 tokens are available at once, the other 50 need 0.5 s.
+        self.assertGreaterEqual(elapsed, 0.45)
+
+    async def test_per_chat_rate_limit(self):
+        queue = DeliveryQueue(self.sender, coalesce=False, per_chat_rate=20)
+        for i in range(30):
+            await queue.put(1, str(i))
+        await queue.close()
+        arrivals = [m["received_at"] for m in self.api.messages]
+        self.assertGreaterEqual(arrivals[-1] - arrivals[0], 0.45)
+
+    async def test_put_blocks_when_full(self):
+        self.api.latency = 0.02
+        queue = DeliveryQueue(
+            self.sender, workers=1, maxsize=3, coalesce=False,
+            per_chat_rate=1000,
+        )
+        peak = 0
+        for i in range(10):
+            await queue.put(i, "hello")
+            peak = max(peak, queue._unfinished)
+        await queue.close()
+        self.assertEqual(peak, 3)
+        self.assertEqual(len(self.api.messages), 10)
+
+
+async def deliver_to_chats(sender, chat_ids, **options):
+    queue = DeliveryQueue(sender, **options)
+    for chat_id in chat_ids:
+        await queue.put(chat_id, "hello")
+    await asyncio.wait_for(queue.close(), timeout=10)
+    return queue.stats
+
+
+class BotHandlerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = get_user_model().objects.bulk_create(
+            get_user_model()(
+                email=f"user{i}@test.test", telegram_id=1000 + i
+            )
+            for i in range(200)
+        )
+        book = Book.objects.create(
+            title="Dune", author="Frank Herbert", cover="HARD",
+            inventory=100, daily_fee=1,
+        )
+        Borrowing.objects.bulk_create(
+            Borrowing(
+                user=user,
+                book=book,
+                expected_return_date=datetime.date(2025, 1, 20),
+            )
+            for user in cls.users
+            for _ in range(3)
+        )
+
+    def setUp(self):
+        telegram_users.clear()
+
+    async def test_borrowings_reply(self):
+        update, context = fake_update(1000)
+        await handlers.borrowings(update, context)
+        self.assertEqual(len(update.message.replies), 1)
+        self.assertEqual(update.message.replies[0].count("Dune"), 6)
+
+    async def test_unknown_user_asked_to_log_in(self):
+        update, context = fake_update(1)
+        await handlers.payments(update, context)
+        self.assertIn("not logged in", update.message.replies[0])
+
+    async def test_start_binds_telegram_id(self):
+        update, context = fake_update(1, "/start user5@test.test")
+        await handlers.start(update, context)
+        self.assertIn("Login successful", update.message.replies[0])
+        user = await telegram_users.aresolve(1)
+        self.assertEqual(user.email, "user5@test.test")
+
+    async def test_concurrency_is_limited(self):
+        running = peak = 0
+
+        @handlers.limited
+        async def handler(update, context):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001)
+            running -= 1
+            await update.message.reply_text("ok")
+
+        await drive(handler, [fake_update(i) for i in range(300)])
+        self.assertEqual(peak, handlers.CONCURRENCY)
+
+    async def test_load_many_concurrent_users(self):
+        latency = 0.05
+        updates = [
+            fake_update(1000 + i % 200, command, latency)
+            for i in range(400)
+            for command in ("/borrowings", "/payments")
+        ]
+
+        async def dispatch(update, context):
+            if update.message.text == "/borrowings":
+                await handlers.borrowings(update, context)
+            else:
+                await handlers.payments(update, context)
+
+        started = time.monotonic()
+        latencies = await drive(dispatch, updates)
+        elapsed = time.monotonic() - started
+        self.assertTrue(all(update.message.replies for update, _ in updates))
+        logger.info(
+            f"{len(updates)} updates in {elapsed:.2f} s, "
+            f"p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+            f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms"
+        )
+        # Handled one at a time, the replies alone would take
+        # len(updates) × latency = 40 s.
+        self.assertLess(elapsed, len(updates) * latency / 4)
+
+
+@override_settings(TELEGRAM_BOT={
+    "TOKEN": "token", "API_URL": None, "WEBHOOK_SECRET": "s3cret"
+})
+class WebhookTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword", telegram_id=42
+        )
+
+    def setUp(self):
+        telegram_users.clear()
+
+    async def post_update(self, text, update_id=1, secret="s3cret"):
+        update = {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "from": {"id": 42},
+                "chat": {"id": 4242},
+                "text": text,
+            },
+        }
+        return await self.async_client.post(
+            reverse("telegram-webhook"),
+            data=json.dumps(update),
+            content_type="application/json",
+            headers={webhook.SECRET_HEADER: secret},
+        )
+
+    async def run_with_api(self, coroutine):
+        async with FakeBotAPI() as api:
+            with override_settings(TELEGRAM_BOT={
+                "TOKEN": "token",
+                "API_URL": api.base_url,
+                "WEBHOOK_SECRET": "s3cret",
+            }):
+                try:
+                    result = await coroutine()
+                finally:
+                    await webhook.close_queue()
+        return api, result
+
+    async def test_wrong_secret_rejected(self):
+        res = await self.post_update("/payments", secret="guess")
+        self.assertEqual(res.status_code, 403)
+
+    async def test_non_command_ignored(self):
+        api, res = await self.run_with_api(
+            lambda: self.post_update("hello")
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(api.messages, [])
+
+    async def test_command_replies_to_chat(self):
+        api, res = await self.run_with_api(
+            lambda: self.post_update("/borrowings@library_bot")
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(api.messages[0]["chat_id"], 4242)
+        self.assertEqual(api.messages[0]["text"], "📚 You have no borrowings.")
+
+    async def test_server_shutdown_delivers_queued_replies(self):
+        messages = [
+            {"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        async with FakeBotAPI() as api:
+            with override_settings(TELEGRAM_BOT={
+                "TOKEN": "token",
+                "API_URL": api.base_url,
+                "WEBHOOK_SECRET": "s3cret",
+            }):
+                await self.post_update("/payments")
+                await application({"type": "lifespan"}, receive, send)
+        self.assertEqual(
+            sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        )
+        self.assertEqual(len(api.messages), 1)
+        self.assertNotIn(asyncio.get_running_loop(), webhook._queues)
+
+    async def test_handler_error_answered_with_200(self):
+        async def broken(update, context):
+            raise RuntimeError("boom")
+
+        with mock.patch.dict(webhook.COMMANDS, {"payments": broken}):
+            with self.assertLogs("telegram.webhook", "ERROR"):
+                api, res = await self.run_with_api(
+                    lambda: self.post_update("/payments")
+                )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(api.messages, [])
+
+    async def test_end_to_end_latency(self):
+        async def post_many():
+            started = time.monotonic()
+            responses = await asyncio.gather(*(
+                self.post_update("/payments", update_id=i) for i in range(100)
+            ))
+            return started, responses
+
+        api, (started, responses) = await self.run_with_api(post_many)
+        self.assertTrue(all(res.status_code == 200 for res in responses))
+        # Replies queued for the chat while it is rate limited are joined.
+        self.assertEqual(
+            sum(
+                message["text"].count("no successful payments")
+                for message in api.messages
+            ),
+            100,
+        )
+        latencies = sorted(
+            message["received_at"] - started for message in api.messages
+        )
+        logger.info(
+            f"webhook p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+            f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms"
+        )
@@ -0,0 +1,115 @@
+import asyncio
+import hmac
+import json
+import logging
+import weakref
+from types import SimpleNamespace
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.http import HttpResponseForbidden
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from core.lifespan import on_shutdown
+from telegram import handlers
+from telegram.delivery import BotAPISender, DeliveryQueue
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+COMMANDS = {
+    "start": handlers.start,
+    "borrowings": handlers.borrowings,
+    "payments": handlers.payments,
+}
+
+_queues = weakref.WeakKeyDictionary()
+
+
+def get_queue():
+    """
+    Return the ``DeliveryQueue`` of the running event loop, the server's
+    one loop under ASGI, so replies share its rate limits and connection
+    pool.
+    """
+    loop = asyncio.get_running_loop()
+    queue = _queues.get(loop)
+    if queue is None:
+        queue = _queues[loop] = DeliveryQueue(BotAPISender(
+            settings.TELEGRAM_BOT["TOKEN"],
+            base_url=settings.TELEGRAM_BOT["API_URL"],
+        ))
+    return queue
+
+
+@on_shutdown
+async def close_queue():
+    """Deliver the running loop's queued replies and close its sender."""
+    queue = _queues.pop(asyncio.get_running_loop(), None)
+    if queue is not None:
+        await queue.close()
+        await queue.sender.close()
+
+
+class WebhookMessage:
+    """The part of ``telegram.Message`` the command handlers use."""
+
+    def __init__(self, data, queue):
+        self.from_user = SimpleNamespace(id=data["from"]["id"])
+        self.chat_id = data["chat"]["id"]
+        self.text = data.get("text", "")
+        self.queue = queue
+
+    async def reply_text(self, text, parse_mode=None):
+        await self.queue.put(self.chat_id, text, parse_mode=parse_mode)
+
+
+def parse_command(data, queue):
+    """
+    Return ``(handler, update, context)`` for a command update, or
+    ``None`` for anything the bot does not handle.
+    """
+    message = data.get("message")
+    if not message or "from" not in message:
+        return None
+    words = message.get("text", "").split()
+    if not words or not words[0].startswith("/"):
+        return None
+    # "/start@library_bot" addresses the bot explicitly in group chats.
+    command = words[0][1:].split("@")[0]
+    handler = COMMANDS.get(command)
+    if handler is None:
+        return None
+    update = SimpleNamespace(
+        update_id=data.get("update_id"),
+        message=WebhookMessage(message, queue),
+    )
+    return handler, update, SimpleNamespace(args=words[1:])
+
+
+@csrf_exempt
+@require_POST
+async def telegram_webhook(request):
+    """
+    Receive Bot API updates pushed by Telegram and run the matching
+    command handler in this worker's event loop. Handler errors are
+    logged and still answered with 200, as Telegram would otherwise
+    redeliver the update.
+    """
+    secret = settings.TELEGRAM_BOT["WEBHOOK_SECRET"]
+    if not secret or not hmac.compare_digest(
+        request.headers.get(SECRET_HEADER, ""), secret
+    ):
+        return HttpResponseForbidden()
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest()
+    command = parse_command(data, get_queue())
+    if command is not None:
+        handler, update, context = command
+        try:
+            await handler(update, context)
+        except Exception:
+            logger.exception(f"Telegram update {update.update_id} failed")
+    return HttpResponse()
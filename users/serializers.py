@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model, authenticate
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from django.utils.translation import gettext as _
+from borrowings.models import UserBorrowingStats
+from borrowings.stats import borrowing_stats
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -24,6 +27,28 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
+class UserBorrowingStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserBorrowingStats
+        fields = (
+            "active_borrowings",
+            "total_borrowings",
+            "pending_payments",
+            "pending_amount",
+        )
+
+
+class ManageUserSerializer(UserSerializer):
+    borrowing_stats = serializers.SerializerMethodField()
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ("borrowing_stats",)
+
+    @extend_schema_field(UserBorrowingStatsSerializer)
+    def get_borrowing_stats(self, user):
+        return UserBorrowingStatsSerializer(borrowing_stats(user.id)).data
+
+
 class AuthTokenSerializer(serializers.Serializer):
     email = serializers.CharField(label=_("Email"))
     password = serializers.CharField(
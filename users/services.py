@@ -0,0 +1,135 @@
+from typing import NamedTuple
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from library_service.cache import DjangoCache, LRUCache
+
+
+class TelegramUser(NamedTuple):
+    id: int  # noqa: VNE003
+    email: str
+
+
+class TelegramUserResolver:
+    """
+    Resolve Telegram ids to ``TelegramUser`` through a cache.
+
+    Only known ids are cached: a miss cached by one worker would keep
+    answering "not logged in" after ``/start`` on another. ``bind`` and
+    the ``User`` signals drop affected keys. With a per-process cache
+    that reaches only the process that made the change, so ``verify``
+    checks each hit against the database: another worker may have
+    rebound the id, and its new owner must not see the old one's data.
+    """
+
+    def __init__(self, cache, verify=False):
+        self.cache = cache
+        self.verify = verify
+
+    def key(self, telegram_id):
+        return f"telegram:{telegram_id}"
+
+    def cached(self, telegram_id):
+        """Return ``(found, user)`` without touching the database."""
+        user = self.cache.get(self.key(telegram_id))
+        return user is not None, user
+
+    def resolve(self, telegram_id):
+        found, user = self.cached(telegram_id)
+        if found and (not self.verify or self.still_bound(user, telegram_id)):
+            return user
+        return self.load(telegram_id)
+
+    def still_bound(self, user, telegram_id):
+        return get_user_model().objects.filter(
+            pk=user.id, telegram_id=telegram_id
+        ).exists()
+
+    def load(self, telegram_id):
+        """Read ``telegram_id`` from the database and cache the result."""
+        row = get_user_model().objects.filter(
+            telegram_id=telegram_id
+        ).values_list("id", "email").first()
+        return self.store(telegram_id, row)
+
+    async def aresolve(self, telegram_id):
+        found, user = self.cached(telegram_id)
+        if found and (
+            not self.verify or await self.astill_bound(user, telegram_id)
+        ):
+            return user
+        return await self.aload(telegram_id)
+
+    async def astill_bound(self, user, telegram_id):
+        return await get_user_model().objects.filter(
+            pk=user.id, telegram_id=telegram_id
+        ).aexists()
+
+    async def aload(self, telegram_id):
+        row = await get_user_model().objects.filter(
+            telegram_id=telegram_id
+        ).values_list("id", "email").afirst()
+        return self.store(telegram_id, row)
+
+    def store(self, telegram_id, row):
+        if row is None:
+            self.cache.delete(self.key(telegram_id))
+            return None
+        user = TelegramUser(*row)
+        self.cache.set(self.key(telegram_id), user)
+        return user
+
+    def bind(self, email, telegram_id):
+        """
+        Attach ``telegram_id`` to the user with ``email``, detaching it
+        from whoever had it before. Returns ``None`` for an unknown email.
+        """
+        User = get_user_model()
+        with transaction.atomic():
+            user = User.objects.select_for_update().filter(email=email).first()
+            if user is None:
+                return None
+            stale = [telegram_id, user.telegram_id]
+            User.objects.filter(telegram_id=telegram_id).exclude(
+                pk=user.pk
+            ).update(telegram_id=None)
+            user.telegram_id = telegram_id
+            user.save(update_fields=["telegram_id"])
+            self.invalidate(*stale)
+        return TelegramUser(user.id, user.email)
+
+    def invalidate(self, *telegram_ids):
+        """Drop ``telegram_ids`` now and again once the transaction commits."""
+        telegram_ids = [tid for tid in telegram_ids if tid is not None]
+        self._invalidate(telegram_ids)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._invalidate(telegram_ids))
+
+    def _invalidate(self, telegram_ids):
+        for telegram_id in telegram_ids:
+            self.cache.delete(self.key(telegram_id))
+
+    def clear(self):
+        self.cache.clear()
+        self.cache.hits = 0
+        self.cache.misses = 0
+
+    def stats(self):
+        return self.cache.stats()
+
+
+def build_telegram_user_resolver():
+    config = settings.TELEGRAM_USER_CACHE
+    if config["BACKEND"] == "django":
+        return TelegramUserResolver(DjangoCache(
+            alias=config["CACHE_ALIAS"],
+            timeout=config["TIMEOUT"],
+            key_prefix="library:",
+        ))
+    return TelegramUserResolver(
+        LRUCache(max_entries=config["MAX_ENTRIES"], timeout=config["TIMEOUT"]),
+        verify=True,
+    )
+
+
+telegram_users = build_telegram_user_resolver()
@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from users.services import telegram_users
+
+User = get_user_model()
+
+
+@receiver(post_init, sender=User)
+def remember_telegram_id(sender, instance, **kwargs):
+    instance._loaded_telegram_id = instance.__dict__.get("telegram_id")
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_telegram_id(sender, instance, **kwargs):
+    telegram_users.invalidate(
+        instance.telegram_id, instance._loaded_telegram_id
+    )
+    instance._loaded_telegram_id = instance.telegram_id
@@ -1,3 +1,89 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from borrowings.tests import sample_borrowing
+from library_service.cache import DjangoCache, LRUCache
+from users.services import TelegramUser, TelegramUserResolver, telegram_users
 
-# Create your tests here.
+
+class TelegramUserResolverTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword", telegram_id=111
+        )
+        telegram_users.clear()
+
+    def test_second_lookup_is_cached(self):
+        resolver = TelegramUserResolver(DjangoCache(key_prefix="test:"))
+        resolver.clear()
+        with self.assertNumQueries(1):
+            first = resolver.resolve(111)
+        with self.assertNumQueries(0):
+            second = resolver.resolve(111)
+        self.assertEqual(first, TelegramUser(self.user.id, self.user.email))
+        self.assertEqual(second, first)
+        self.assertEqual(resolver.stats()["hit_rate"], 0.5)
+
+    def test_per_process_hits_are_verified(self):
+        other = get_user_model().objects.create_user(
+            email="other@test.test", password="otherpassword"
+        )
+        worker = TelegramUserResolver(LRUCache(), verify=True)
+        self.assertEqual(worker.resolve(111).id, self.user.id)
+        # Another worker rebinds the id; this one's cache never hears it.
+        TelegramUserResolver(LRUCache()).bind(other.email, 111)
+        self.assertEqual(worker.resolve(111).id, other.id)
+        self.assertEqual(worker.resolve(111).id, other.id)
+
+    def test_unknown_id_is_not_cached(self):
+        self.assertIsNone(telegram_users.resolve(999))
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            telegram_id=999
+        )
+        self.assertEqual(telegram_users.resolve(999).id, self.user.id)
+
+    def test_bind_invalidates_old_and_new_ids(self):
+        other = get_user_model().objects.create_user(
+            email="other@test.test", password="otherpassword", telegram_id=222
+        )
+        telegram_users.resolve(111)
+        telegram_users.resolve(222)
+        self.assertEqual(
+            telegram_users.bind(self.user.email, 222),
+            TelegramUser(self.user.id, self.user.email),
+        )
+        self.assertIsNone(telegram_users.resolve(111))
+        self.assertEqual(telegram_users.resolve(222).id, self.user.id)
+        other.refresh_from_db()
+        self.assertIsNone(other.telegram_id)
+
+    def test_bind_unknown_email(self):
+        self.assertIsNone(telegram_users.bind("nobody@test.test", 333))
+
+    def test_user_save_invalidates(self):
+        telegram_users.resolve(111)
+        telegram_users.resolve(444)
+        self.user.telegram_id = 444
+        self.user.save()
+        self.assertIsNone(telegram_users.resolve(111))
+        self.assertEqual(telegram_users.resolve(444).id, self.user.id)
+
+
+class ManageUserTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test@test.test", password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_me_includes_borrowing_stats(self):
+        sample_borrowing(user=self.user)
+        res = self.client.get(reverse("users:manage"))
+        self.assertEqual(res.data["borrowing_stats"]["active_borrowings"], 1)
+        self.assertEqual(res.data["borrowing_stats"]["pending_payments"], 0)
+
+    def test_me_without_borrowings(self):
+        res = self.client.get(reverse("users:manage"))
+        self.assertEqual(res.data["borrowing_stats"]["total_borrowings"], 0)
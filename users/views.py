@@ -2,7 +2,11 @@ from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
-from users.serializers import UserSerializer, AuthTokenSerializer
+from users.serializers import (
+    AuthTokenSerializer,
+    ManageUserSerializer,
+    UserSerializer,
+)
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -16,7 +20,7 @@ class CreateTokenView(ObtainAuthToken):
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
-    serializer_class = UserSerializer
+    serializer_class = ManageUserSerializer
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):